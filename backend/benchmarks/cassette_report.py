@@ -0,0 +1,107 @@
+"""
+Cassette report - recorded provider traffic and how the current build parses it
+
+Reads an LLM cassette (services/llm_cassette.py) and reports, per model, call counts,
+recorded latency percentiles, token usage and error types, then runs every recorded
+response through parse_ai_response and reports how many parse (directly, embedded in
+text, or repaired after truncation) and how long it takes. Running it on two builds with the same cassette compares parsing deterministically.
+
+To replay the recorded latencies and responses under load against a build:
+    LLM_CASSETTE_MODE=replay LLM_CASSETTE_MATCH=prompt LLM_CASSETTE_PATH=... uvicorn main:app
+(or python -m benchmarks.load_test --cassette ... --model <recorded model id>)
+
+Usage (from backend/):
+    python -m benchmarks.cassette_report data/llm_cassette.db --output parse.json
+"""
+
+import json
+import time
+import logging
+import argparse
+from collections import Counter, defaultdict
+from typing import Any, Dict, List
+
+from services.llm_cassette import LLMCassette, REPLAY
+from services.ai_service import parse_ai_response
+from benchmarks.load_test import git_commit, percentile
+
+
+def summarize(entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    by_model: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for entry in entries:
+        by_model[entry["model"]].append(entry)
+
+    models = {}
+    for model, group in by_model.items():
+        latencies = sorted(entry["latency"] for entry in group if not entry["error_type"])
+        models[model] = {
+            "calls": len(group),
+            "errors": dict(Counter(entry["error_type"] for entry in group if entry["error_type"])),
+            "latency_seconds": {
+                "p50": percentile(latencies, 0.50),
+                "p95": percentile(latencies, 0.95),
+                "p99": percentile(latencies, 0.99)
+            },
+            "prompt_tokens": sum(entry["usage"].get("prompt_tokens") or 0 for entry in group),
+            "completion_tokens": sum(entry["usage"].get("completion_tokens") or 0 for entry in group),
+            "distinct_prompts": len({entry["prompt_hash"] for entry in group})
+        }
+    return models
+
+
+def check_parsing(entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Parse every recorded response with the current parse_ai_response"""
+    parsed, failed, durations, methods = 0, [], [], Counter()
+    for entry in entries:
+        if entry["response"] is None:
+            continue
+        start = time.perf_counter()
+        result = parse_ai_response(entry["response"])
+        durations.append(time.perf_counter() - start)
+        methods[result.method] += 1
+        if result.data is not None:
+            parsed += 1
+        else:
+            failed.append({"seq": entry["seq"], "model": entry["model"], "preview": entry["response"][:200]})
+    durations.sort()
+    return {
+        "responses": len(durations),
+        "parsed": parsed,
+        "failed": len(failed),
+        "methods": dict(methods),
+        "mean_ms": round(1000 * sum(durations) / len(durations), 3) if durations else None,
+        "p99_ms": round(1000 * percentile(durations, 0.99), 3) if durations else None,
+        "failures": failed
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("cassette", help="Cassette file")
+    parser.add_argument("--output", help="Save the report as JSON")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    entries = list(LLMCassette(args.cassette, mode=REPLAY).iter_entries())
+    report = {"commit": git_commit(), "cassette": args.cassette, "models": summarize(entries), "parsing": check_parsing(entries)}
+
+    for model, stats in report["models"].items():
+        latency = stats["latency_seconds"]
+        print(f"{model}: {stats['calls']} calls, {stats['distinct_prompts']} distinct prompts, "
+              f"latency p50/p95/p99 {latency['p50'] or 0:.2f}/{latency['p95'] or 0:.2f}/{latency['p99'] or 0:.2f}s, "
+              f"tokens {stats['prompt_tokens']} in / {stats['completion_tokens']} out, errors {stats['errors'] or 'none'}")
+    parsing = report["parsing"]
+    print(f"parse_ai_response: {parsing['parsed']}/{parsing['responses']} parsed {parsing['methods']}, "
+          f"mean {parsing['mean_ms'] or 0:.3f} ms, p99 {parsing['p99_ms'] or 0:.3f} ms")
+    for failure in parsing["failures"][:10]:
+        print(f"  failed #{failure['seq']} ({failure['model']}): {failure['preview']!r}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Synthetic document corpus - deterministic PDFs and images for benchmarks
+
+Every file is generated from a seed, so two runs with the same arguments produce
+byte-identical corpora and results can be compared across commits. Page content is
+either "text" (dense printed lines, compresses well), "photo" (smooth blobs plus sensor
+noise, compresses badly) or "mixed" (a text block over a photo).
+
+Usage (from backend/):
+    python -m benchmarks.corpus --profile full --out /tmp/corpus
+"""
+
+import io
+import os
+import random
+import argparse
+from typing import Dict, Iterator, List, NamedTuple, Tuple
+
+import fitz  # PyMuPDF
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+from config import settings
+
+# Page sizes in PDF points (1/72 inch)
+PAGE_SIZES: Dict[str, Tuple[int, int]] = {
+    "a4": (595, 842),
+    "letter": (612, 792),
+    "a3": (842, 1191),
+    "receipt": (226, 600)
+}
+
+# Image sizes in pixels
+IMAGE_SIZES: Dict[str, Tuple[int, int]] = {
+    "small": (800, 600),
+    "medium": (1654, 2339),    # A4 at 200 dpi
+    "large": (2480, 3508)      # A4 at 300 dpi
+}
+
+IMAGE_FORMATS: Dict[str, Tuple[str, str, str]] = {
+    "jpeg": ("JPEG", "jpg", "image/jpeg"),
+    "png": ("PNG", "png", "image/png"),
+    "tiff": ("TIFF", "tiff", "image/tiff"),
+    "bmp": ("BMP", "bmp", "image/bmp")
+}
+
+CONTENT_KINDS = ("text", "photo", "mixed")
+
+WORDS = (
+    "name surname date birth place issue expiry number nationality address document "
+    "authority signature holder passport licence invoice total amount tax account "
+    "reference registration certificate valid republic ministry office code class"
+).split()
+
+
+class CorpusFile(NamedTuple):
+    name: str
+    data: bytes
+    content_type: str
+    kind: str
+
+
+def _text_lines(rng: random.Random, count: int) -> List[str]:
+    lines = []
+    for _ in range(count):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(3, 9))]
+        if rng.random() < 0.5:
+            words.append(str(rng.randint(10000, 99999999)))
+        lines.append(" ".join(words).capitalize() + ":")
+    return lines
+
+
+def photo_image(rng: random.Random, size: Tuple[int, int]) -> Image.Image:
+    """Photo-like content: upscaled random blobs with fine noise on top"""
+    width, height = size
+    coarse_width, coarse_height = max(1, width // 64), max(1, height // 64)
+    coarse = Image.frombytes("RGB", (coarse_width, coarse_height), rng.randbytes(coarse_width * coarse_height * 3))
+    image = coarse.resize(size, Image.Resampling.BICUBIC).filter(ImageFilter.GaussianBlur(2))
+    noise = Image.frombytes("RGB", size, rng.randbytes(width * height * 3))
+    return Image.blend(image, noise, 0.12)
+
+
+def text_image(rng: random.Random, size: Tuple[int, int]) -> Image.Image:
+    """Printed page content: dark text lines on a white background"""
+    width, height = size
+    image = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(image)
+    font_size = max(10, height // 80)
+    font = ImageFont.load_default(size=font_size)
+    margin = width // 12
+    y = margin
+    for line in _text_lines(rng, (height - 2 * margin) // int(font_size * 1.6)):
+        draw.text((margin, y), line, fill=(20, 20, 20), font=font)
+        y += int(font_size * 1.6)
+    return image
+
+
+def render_image(rng: random.Random, kind: str, size: Tuple[int, int]) -> Image.Image:
+    """Draw page content of the given kind"""
+    if kind == "photo":
+        return photo_image(rng, size)
+    image = text_image(rng, size)
+    if kind == "mixed":
+        width, height = size
+        photo = photo_image(rng, (width // 2, height // 3))
+        image.paste(photo, (width - photo.width - width // 12, height // 12))
+    return image
+
+
+def encode_image(image: Image.Image, image_format: str) -> bytes:
+    """Encode an image the way a scanner or phone would save it"""
+    pil_format = IMAGE_FORMATS[image_format][0]
+    buffer = io.BytesIO()
+    if pil_format == "JPEG":
+        image.save(buffer, format="JPEG", quality=90)
+    elif pil_format == "TIFF":
+        image.save(buffer, format="TIFF", compression="tiff_deflate")
+    else:
+        image.save(buffer, format=pil_format)
+    return buffer.getvalue()
+
+
+def make_image(seed: int, kind: str, size_name: str, image_format: str) -> CorpusFile:
+    """One image file"""
+    rng = random.Random(f"image:{seed}:{kind}:{size_name}:{image_format}")
+    _, extension, content_type = IMAGE_FORMATS[image_format]
+    data = encode_image(render_image(rng, kind, IMAGE_SIZES[size_name]), image_format)
+    return CorpusFile(f"{kind}_{size_name}.{extension}", data, content_type, kind)
+
+
+def make_pdf(seed: int, kind: str, page_size: str, pages: int) -> CorpusFile:
+    """A PDF with vector text pages, embedded photos, or both"""
+    rng = random.Random(f"pdf:{seed}:{kind}:{page_size}:{pages}")
+    width, height = PAGE_SIZES[page_size]
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page(width=width, height=height)
+        margin = width / 12
+        if kind in ("photo", "mixed"):
+            # Embedded scans are stored at 150 dpi, like a typical office scanner
+            box = fitz.Rect(margin, margin, width - margin, height / 2 if kind == "mixed" else height - margin)
+            photo = photo_image(rng, (int(box.width * 150 / 72), int(box.height * 150 / 72)))
+            page.insert_image(box, stream=encode_image(photo, "jpeg"))
+        if kind in ("text", "mixed"):
+            top = height / 2 + margin / 2 if kind == "mixed" else margin
+            text = "\n".join(_text_lines(rng, int((height - top - margin) / 13)))
+            page.insert_textbox(fitz.Rect(margin, top, width - margin, height - margin), text, fontsize=9)
+    # Fixed metadata and file ID so the bytes only depend on the arguments
+    doc.set_metadata({"producer": "benchmarks.corpus", "creationDate": "D:20240101000000", "modDate": "D:20240101000000"})
+    data = doc.tobytes(garbage=3, deflate=True, no_new_id=True)
+    doc.close()
+    return CorpusFile(f"{kind}_{page_size}_{pages}p.pdf", data, "application/pdf", kind)
+
+
+def iter_corpus(seed: int = 0, profile: str = "standard") -> Iterator[CorpusFile]:
+    """
+    Generate the files of a corpus profile:
+      small    - one small image and one single-page PDF per content kind
+      standard - typical uploads: phone photos and scans, short PDFs
+      full     - every content kind, image size/format and PDF page size/length
+    """
+    if profile == "small":
+        for kind in CONTENT_KINDS:
+            yield make_image(seed, kind, "small", "jpeg")
+            yield make_pdf(seed, kind, "a4", 1)
+    elif profile == "standard":
+        for kind in CONTENT_KINDS:
+            yield make_image(seed, kind, "medium", "jpeg")
+            yield make_image(seed, kind, "small", "png")
+            yield make_pdf(seed, kind, "a4", 1)
+            yield make_pdf(seed, kind, "letter", 3)
+    elif profile == "full":
+        for kind in CONTENT_KINDS:
+            for size_name in IMAGE_SIZES:
+                for image_format in IMAGE_FORMATS:
+                    yield make_image(seed, kind, size_name, image_format)
+            for page_size in PAGE_SIZES:
+                for pages in (1, 3, 10):
+                    yield make_pdf(seed, kind, page_size, pages)
+    else:
+        raise ValueError(f"Unknown corpus profile: {profile}")
+
+
+def generate_corpus(seed: int = 0, profile: str = "standard", include_oversized: bool = False) -> List[CorpusFile]:
+    """Generate a corpus, leaving out files over the upload size limit unless asked for"""
+    max_bytes = settings.security.max_file_size_mb * 1024 * 1024
+    return [
+        corpus_file for corpus_file in iter_corpus(seed, profile)
+        if include_oversized or len(corpus_file.data) <= max_bytes
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic document corpus to a directory")
+    parser.add_argument("--out", required=True, help="Output directory")
+    parser.add_argument("--profile", default="standard", choices=["small", "standard", "full"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--include-oversized", action="store_true", help="Keep files over MAX_FILE_SIZE_MB")
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    for corpus_file in generate_corpus(args.seed, args.profile, args.include_oversized):
+        with open(os.path.join(args.out, corpus_file.name), "wb") as f:
+            f.write(corpus_file.data)
+        print(f"{corpus_file.name:<28} {len(corpus_file.data) / 1024:>10.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
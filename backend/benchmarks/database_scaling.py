@@ -0,0 +1,295 @@
+"""
+Database scaling benchmark - schema library operations as the library grows
+
+Fills a temporary SQLite database with generated schemas (realistic field names,
+types and hints) up to each requested size, then measures at that size:
+
+  list       get_all_schemas
+  get        get_schema
+  save       save_schema (a new version of an existing schema)
+  delete     delete_schema
+  category   get_schemas_by_category
+  search     find_schemas_by_field and find_similar_schemas
+  stats      get_database_stats
+
+and mixed read/write traffic from several processes sharing the file, as uvicorn
+workers do, counting failed operations and "database is locked" errors. Database
+file size is reported after each fill.
+
+Usage (from backend/):
+    python -m benchmarks.database_scaling --sizes 1000,10000 --fields 100
+    python -m benchmarks.database_scaling --sizes 100000 --fields 200 --workers 1,4,8 --output db.json
+"""
+
+import os
+import json
+import time
+import random
+import logging
+import argparse
+import tempfile
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+
+from services.database import DatabaseService
+from benchmarks.load_test import git_commit, percentile
+
+CATEGORIES = ["Government ID", "Travel", "Financial", "Business", "Medical", "Legal", "Education", "Other"]
+FIELD_TYPES = ["text", "text", "text", "date", "number", "email", "phone", "boolean"]
+FIELD_PREFIXES = [
+    "", "holder", "issuer", "applicant", "account", "invoice", "vehicle", "employer",
+    "patient", "billing", "shipping", "primary", "secondary", "emergency", "tax"
+]
+FIELD_NOUNS = [
+    "name", "surname", "number", "date", "address", "city", "country", "postal_code",
+    "phone", "email", "amount", "total", "currency", "reference", "signature", "status",
+    "issue_date", "expiry_date", "birth_date", "nationality", "gender", "height", "id",
+    "registration", "description", "quantity", "unit_price", "discount", "balance", "code"
+]
+
+
+class LockErrorCounter(logging.Handler):
+    """Counts database errors logged by the database service, and lock errors among them"""
+
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.errors = 0
+        self.locked = 0
+
+    def emit(self, record: logging.LogRecord):
+        self.errors += 1
+        if "locked" in record.getMessage() or "busy" in record.getMessage():
+            self.locked += 1
+
+
+def install_error_counter() -> LockErrorCounter:
+    counter = LockErrorCounter()
+    database_logger = logging.getLogger("services.database")
+    database_logger.addHandler(counter)
+    database_logger.propagate = False
+    return counter
+
+
+def generate_schema(rng: random.Random, index: int, field_count: int) -> Dict[str, Any]:
+    """A schema shaped like the output of schema generation"""
+    fields = {}
+    while len(fields) < field_count:
+        prefix, noun = rng.choice(FIELD_PREFIXES), rng.choice(FIELD_NOUNS)
+        name = f"{prefix}_{noun}" if prefix else noun
+        if name in fields:
+            name = f"{name}_{len(fields)}"
+        field_type = rng.choice(FIELD_TYPES)
+        fields[name] = {
+            "type": field_type,
+            "required": rng.random() < 0.4,
+            "description": f"The {name.replace('_', ' ')} printed on the document",
+            "extraction_hints": [f"Look for the label '{name.replace('_', ' ').title()}'"],
+            "validation_pattern": r"^\d{4}-\d{2}-\d{2}$" if field_type == "date" else "",
+            "positioning_hints": rng.choice(["top left", "header", "body", "footer", "next to photo"])
+        }
+    return {
+        "name": f"Generated Document {index}",
+        "description": f"Benchmark schema {index} with {field_count} fields",
+        "category": rng.choice(CATEGORIES),
+        "fields": fields,
+        "overall_confidence": rng.randint(60, 99),
+        "document_quality": "high",
+        "document_specific_notes": ["Generated for benchmarking"]
+    }
+
+
+def schema_id(index: int) -> str:
+    return f"bench_schema_{index:07d}"
+
+
+def fill(db: DatabaseService, start: int, end: int, field_count: int, seed: int, batch_size: int = 500) -> float:
+    """Insert schemas start..end-1 in import batches; returns the elapsed seconds"""
+    began = time.perf_counter()
+    for batch_start in range(start, end, batch_size):
+        records = []
+        for index in range(batch_start, min(end, batch_start + batch_size)):
+            rng = random.Random(f"{seed}:{index}")
+            records.append((index, schema_id(index), generate_schema(rng, index, field_count)))
+        db.import_schemas(records)
+    return time.perf_counter() - began
+
+
+def file_size(path: str) -> int:
+    return sum(os.path.getsize(p) for p in (path, path + "-wal", path + "-journal") if os.path.exists(p))
+
+
+def timed(operation: Callable[[], Any], repeats: int) -> Dict[str, Any]:
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        operation()
+        durations.append(time.perf_counter() - start)
+    durations.sort()
+    total = sum(durations)
+    return {
+        "runs": repeats,
+        "mean_ms": round(1000 * statistics.fmean(durations), 3),
+        "p50_ms": round(1000 * percentile(durations, 0.50), 3),
+        "p95_ms": round(1000 * percentile(durations, 0.95), 3),
+        "p99_ms": round(1000 * percentile(durations, 0.99), 3),
+        "ops_per_second": round(repeats / total, 1) if total else None
+    }
+
+
+def measure_operations(db: DatabaseService, size: int, field_count: int, seed: int, repeats: int) -> Dict[str, Any]:
+    """Single-process latency of each operation at the current library size"""
+    rng = random.Random(f"ops:{seed}:{size}")
+    next_index = iter(range(size, size * 2))
+
+    def save():
+        index = rng.randrange(size)
+        db.save_schema(schema_id(index), generate_schema(rng, index, field_count))
+
+    def delete_and_restore():
+        # Only the delete is timed by the caller's clock; restoring keeps the size constant
+        index = next(next_index)
+        db.save_schema(schema_id(index), generate_schema(rng, index, field_count))
+        start = time.perf_counter()
+        db.delete_schema(schema_id(index))
+        return time.perf_counter() - start
+
+    def field_query() -> List[str]:
+        return [f"{rng.choice(FIELD_PREFIXES)}_{rng.choice(FIELD_NOUNS)}".strip("_") for _ in range(10)]
+
+    delete_durations = sorted(delete_and_restore() for _ in range(max(5, repeats // 4)))
+    return {
+        "list": timed(db.get_all_schemas, max(3, repeats // 20)),
+        "get": timed(lambda: db.get_schema(schema_id(rng.randrange(size))), repeats),
+        "save": timed(save, max(5, repeats // 4)),
+        "delete": {
+            "runs": len(delete_durations),
+            "mean_ms": round(1000 * statistics.fmean(delete_durations), 3),
+            "p95_ms": round(1000 * percentile(delete_durations, 0.95), 3)
+        },
+        "category": timed(lambda: db.get_schemas_by_category(rng.choice(CATEGORIES)), max(3, repeats // 20)),
+        "search_field": timed(lambda: db.find_schemas_by_field(rng.choice(FIELD_NOUNS)), repeats),
+        "search_similar": timed(lambda: db.find_similar_schemas(field_query()), max(5, repeats // 10)),
+        "stats": timed(db.get_database_stats, max(5, repeats // 10))
+    }
+
+
+def concurrent_worker(db_path: str, size: int, field_count: int, duration: float, write_ratio: float,
+                      seed: int) -> Dict[str, Any]:
+    """One worker process: mixed get/save traffic until the deadline"""
+    logging.getLogger().setLevel(logging.WARNING)
+    counter = install_error_counter()
+    db = DatabaseService(db_path)
+    rng = random.Random(seed)
+    reads, writes, failures = [], [], 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        index = rng.randrange(size)
+        start = time.perf_counter()
+        if rng.random() < write_ratio:
+            ok = db.save_schema(schema_id(index), generate_schema(rng, index, field_count)) is not None
+            writes.append(time.perf_counter() - start)
+        else:
+            ok = db.get_schema(schema_id(index)) is not None
+            reads.append(time.perf_counter() - start)
+        failures += 0 if ok else 1
+    return {"reads": reads, "writes": writes, "failures": failures,
+            "errors": counter.errors, "lock_errors": counter.locked}
+
+
+def measure_concurrency(db_path: str, size: int, field_count: int, workers: int, duration: float,
+                        write_ratio: float, seed: int) -> Dict[str, Any]:
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(concurrent_worker, db_path, size, field_count, duration, write_ratio, seed * 1000 + worker)
+            for worker in range(workers)
+        ]
+        results = [future.result() for future in futures]
+
+    reads = sorted(d for r in results for d in r["reads"])
+    writes = sorted(d for r in results for d in r["writes"])
+    return {
+        "workers": workers,
+        "write_ratio": write_ratio,
+        "operations": len(reads) + len(writes),
+        "ops_per_second": round((len(reads) + len(writes)) / duration, 1),
+        "read_p50_ms": round(1000 * (percentile(reads, 0.50) or 0), 3),
+        "read_p99_ms": round(1000 * (percentile(reads, 0.99) or 0), 3),
+        "write_p50_ms": round(1000 * (percentile(writes, 0.50) or 0), 3),
+        "write_p99_ms": round(1000 * (percentile(writes, 0.99) or 0), 3),
+        "failed_operations": sum(r["failures"] for r in results),
+        "database_errors": sum(r["errors"] for r in results),
+        "lock_errors": sum(r["lock_errors"] for r in results)
+    }
+
+
+def parse_ints(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=parse_ints, default=[1000, 10000], help="Library sizes, comma separated")
+    parser.add_argument("--fields", type=int, default=100, help="Fields per schema")
+    parser.add_argument("--repeats", type=int, default=200, help="Runs of the cheap operations per size")
+    parser.add_argument("--workers", type=parse_ints, default=[1, 4, 8], help="Concurrent worker processes, comma separated")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds of concurrent traffic per worker count")
+    parser.add_argument("--write-ratio", type=float, default=0.2, help="Fraction of saves in concurrent traffic")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--db", help="Database file (default: a temporary file, removed afterwards)")
+    parser.add_argument("--output", help="Save results as JSON")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    counter = install_error_counter()
+
+    with tempfile.TemporaryDirectory(prefix="db-scaling-") as workdir:
+        db_path = args.db or os.path.join(workdir, "schemas.db")
+        db = DatabaseService(db_path)
+        results: Dict[str, Any] = {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "config": {key: value for key, value in vars(args).items() if key != "output"},
+            "sizes": []
+        }
+
+        filled = 0
+        for size in sorted(args.sizes):
+            fill_seconds = fill(db, filled, size, args.fields, args.seed)
+            inserted, filled = size - filled, size
+            print(f"\n{size} schemas x {args.fields} fields: filled {inserted} in {fill_seconds:.1f}s "
+                  f"({inserted / fill_seconds if fill_seconds else 0:.0f}/s), file {file_size(db_path) / 1024 / 1024:.1f} MiB")
+
+            errors_before = counter.errors
+            operations = measure_operations(db, size, args.fields, args.seed, args.repeats)
+            print(f"  {'operation':<15} {'mean ms':>10} {'p95 ms':>10} {'ops/s':>10}")
+            for name, stats in operations.items():
+                print(f"  {name:<15} {stats['mean_ms']:>10.2f} {stats['p95_ms']:>10.2f} {stats.get('ops_per_second') or '-':>10}")
+
+            concurrency = []
+            for workers in args.workers:
+                row = measure_concurrency(db_path, size, args.fields, workers, args.duration, args.write_ratio, args.seed)
+                concurrency.append(row)
+                print(f"  {workers} workers: {row['ops_per_second']:.0f} ops/s, read p99 {row['read_p99_ms']:.1f} ms, "
+                      f"write p99 {row['write_p99_ms']:.1f} ms, {row['failed_operations']} failed, "
+                      f"{row['lock_errors']} lock errors")
+
+            results["sizes"].append({
+                "schemas": size,
+                "fields_per_schema": args.fields,
+                "fill_seconds": round(fill_seconds, 3),
+                "file_bytes": file_size(db_path),
+                "operations": operations,
+                "operation_errors": counter.errors - errors_before,
+                "concurrency": concurrency
+            })
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,507 @@
+"""
+Load test - end-to-end throughput and latency of the extraction endpoints
+
+Starts the API (uvicorn, one worker) with the offline mock provider, or against the
+OpenAI-compatible stand-in server with --provider server, then drives it with a
+generated corpus (benchmarks/corpus.py). Each load level runs for a fixed time:
+
+  --concurrency 1,4,16   closed loop: N clients sending back to back
+  --rate 2,5,10          open loop: Poisson arrivals at N requests per second
+
+For every level the report has throughput, latency percentiles, status counts (429s
+from the rate limiter, 502/503/504 from the provider path), the per-stage timings
+reported in Server-Timing, and process CPU/RSS sampled from /api/status while the
+level runs. Results are saved as JSON with the git commit so runs can be compared.
+
+Usage (from backend/):
+    python -m benchmarks.load_test --concurrency 1,4,16 --duration 30
+    python -m benchmarks.load_test --rate 5,10,20 --mock-latency-ms 1500 --output after.json
+    python -m benchmarks.load_test --concurrency 8 --compare before.json
+    python -m benchmarks.load_test --url http://localhost:8000 --model groq_... --concurrency 4
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+import httpx
+
+from benchmarks.corpus import CorpusFile, generate_corpus
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENDPOINTS = {"extract": "/api/extract", "generate-schema": "/api/generate-schema"}
+# Large enough that the rate limiter never rejects benchmark traffic
+UNLIMITED_REQUESTS_PER_MINUTE = 10 ** 9
+
+
+def percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def parse_server_timing(header: Optional[str]) -> Dict[str, float]:
+    """Stage durations in milliseconds from a Server-Timing header"""
+    timings = {}
+    for entry in (header or "").split(","):
+        name, _, params = entry.strip().partition(";")
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "dur" and name:
+                try:
+                    timings[name] = float(value)
+                except ValueError:
+                    pass
+    return timings
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@contextmanager
+def server_process(module_args: List[str], port: int, env: Dict[str, str], cwd: str) -> Iterator[subprocess.Popen]:
+    """Run a server in a subprocess for the duration of the block"""
+    process = subprocess.Popen(
+        [sys.executable, "-m", *module_args, "--port", str(port)],
+        cwd=cwd,
+        env={**os.environ, "PYTHONPATH": BACKEND_DIR, **env},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE
+    )
+    try:
+        yield process
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+async def wait_until_ready(url: str, process: Optional[subprocess.Popen], timeout: float = 60.0):
+    """Poll a URL until it answers"""
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(timeout=2.0) as client:
+        while time.monotonic() < deadline:
+            if process is not None and process.poll() is not None:
+                raise RuntimeError(f"Server exited during startup:\n{process.stderr.read().decode(errors='replace')}")
+            try:
+                if (await client.get(url)).status_code < 500:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.25)
+    raise RuntimeError(f"{url} did not become ready within {timeout:.0f}s")
+
+
+class LevelRecorder:
+    """Outcomes of the requests sent at one load level"""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.ok_latencies: List[float] = []
+        self.statuses: Counter = Counter()
+        self.stages: Dict[str, List[float]] = defaultdict(list)
+        self.bytes_sent = 0
+
+    def record(self, latency: float, status: int, server_timing: Optional[str], size: int):
+        self.latencies.append(latency)
+        self.statuses[status] += 1
+        self.bytes_sent += size
+        if status == 200:
+            self.ok_latencies.append(latency)
+            for name, duration in parse_server_timing(server_timing).items():
+                self.stages[name].append(duration)
+
+
+class ProcessSampler:
+    """Polls /api/status while a level runs for CPU, RSS and AI queue depth"""
+
+    def __init__(self, client: httpx.AsyncClient, interval: float = 1.0):
+        self.client = client
+        self.interval = interval
+        self.samples: List[Dict[str, Any]] = []
+
+    async def sample(self) -> Optional[Dict[str, Any]]:
+        try:
+            response = await self.client.get("/api/status", timeout=5.0)
+            if response.status_code != 200:
+                return None
+            status = response.json()
+        except (httpx.HTTPError, ValueError):
+            return None
+        process = status.get("process", {})
+        sample = {
+            "time": time.perf_counter(),
+            "cpu_seconds": (process.get("cpu_user_seconds") or 0) + (process.get("cpu_system_seconds") or 0),
+            "rss_bytes": process.get("rss_bytes"),
+            "ai_queued": status.get("ai_queue", {}).get("queued"),
+            "ai_active": status.get("ai_queue", {}).get("active"),
+            "loop_lag_seconds": status.get("event_loop", {}).get("last_seconds")
+        }
+        self.samples.append(sample)
+        return sample
+
+    async def run(self, stop: asyncio.Event):
+        while not stop.is_set():
+            await self.sample()
+            try:
+                await asyncio.wait_for(stop.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def summary(self) -> Dict[str, Any]:
+        if len(self.samples) < 2:
+            return {}
+        first, last = self.samples[0], self.samples[-1]
+        elapsed = last["time"] - first["time"]
+        rss = [s["rss_bytes"] for s in self.samples if s["rss_bytes"] is not None]
+        queued = [s["ai_queued"] for s in self.samples if s["ai_queued"] is not None]
+        lag = [s["loop_lag_seconds"] for s in self.samples if s["loop_lag_seconds"] is not None]
+        return {
+            "cpu_seconds": round(last["cpu_seconds"] - first["cpu_seconds"], 3),
+            "cpu_utilization": round((last["cpu_seconds"] - first["cpu_seconds"]) / elapsed, 3) if elapsed else None,
+            "rss_start_bytes": rss[0] if rss else None,
+            "rss_max_bytes": max(rss) if rss else None,
+            "rss_end_bytes": rss[-1] if rss else None,
+            "ai_queued_max": max(queued) if queued else None,
+            "loop_lag_max_seconds": max(lag) if lag else None
+        }
+
+
+class LoadTest:
+    def __init__(self, base_url: str, endpoint: str, model: str, corpus: List[CorpusFile],
+                 schema_id: Optional[str] = None, seed: int = 0):
+        self.base_url = base_url
+        self.path = ENDPOINTS[endpoint]
+        self.model = model
+        self.corpus = corpus
+        self.schema_id = schema_id
+        self.rng = random.Random(seed)
+        self._next_file = 0
+
+    def _pick_file(self) -> CorpusFile:
+        corpus_file = self.corpus[self._next_file % len(self.corpus)]
+        self._next_file += 1
+        return corpus_file
+
+    async def send(self, client: httpx.AsyncClient, recorder: LevelRecorder):
+        corpus_file = self._pick_file()
+        data = {"model": self.model}
+        if self.schema_id:
+            data["schema_id"] = self.schema_id
+        start = time.perf_counter()
+        try:
+            response = await client.post(
+                self.path,
+                files={"file": (corpus_file.name, corpus_file.data, corpus_file.content_type)},
+                data=data
+            )
+            status, server_timing = response.status_code, response.headers.get("server-timing")
+        except httpx.TimeoutException:
+            status, server_timing = "client_timeout", None
+        except httpx.TransportError:
+            status, server_timing = "connection_error", None
+        recorder.record(time.perf_counter() - start, status, server_timing, len(corpus_file.data))
+
+    async def closed_loop(self, client: httpx.AsyncClient, recorder: LevelRecorder, concurrency: int, duration: float):
+        deadline = time.perf_counter() + duration
+
+        async def worker():
+            while time.perf_counter() < deadline:
+                await self.send(client, recorder)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    async def open_loop(self, client: httpx.AsyncClient, recorder: LevelRecorder, rate: float, duration: float):
+        deadline = time.perf_counter() + duration
+        pending = set()
+        while True:
+            await asyncio.sleep(self.rng.expovariate(rate))
+            if time.perf_counter() >= deadline:
+                break
+            task = asyncio.create_task(self.send(client, recorder))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        if pending:
+            await asyncio.gather(*pending)
+
+    async def run_level(self, mode: str, level: float, duration: float, warmup: float) -> Dict[str, Any]:
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=300.0, limits=limits) as client:
+            if warmup > 0:
+                await self._drive(client, LevelRecorder(), mode, level, warmup)
+
+            recorder = LevelRecorder()
+            sampler = ProcessSampler(client)
+            stop = asyncio.Event()
+            await sampler.sample()
+            sampling = asyncio.create_task(sampler.run(stop))
+            start = time.perf_counter()
+            await self._drive(client, recorder, mode, level, duration)
+            elapsed = time.perf_counter() - start
+            stop.set()
+            await sampling
+            await sampler.sample()
+
+        return self._report(mode, level, elapsed, recorder, sampler)
+
+    async def _drive(self, client, recorder, mode, level, duration):
+        if mode == "concurrency":
+            await self.closed_loop(client, recorder, int(level), duration)
+        else:
+            await self.open_loop(client, recorder, level, duration)
+
+    @staticmethod
+    def _report(mode: str, level: float, elapsed: float, recorder: LevelRecorder, sampler: ProcessSampler) -> Dict[str, Any]:
+        total = len(recorder.latencies)
+        ok_latencies = sorted(recorder.ok_latencies)
+        all_latencies = sorted(recorder.latencies)
+        process = sampler.summary()
+        return {
+            "mode": mode,
+            "level": level,
+            "duration_seconds": round(elapsed, 2),
+            "requests": total,
+            "successful": recorder.statuses.get(200, 0),
+            "throughput_rps": round(recorder.statuses.get(200, 0) / elapsed, 3) if elapsed else 0.0,
+            "offered_rps": round(total / elapsed, 3) if elapsed else 0.0,
+            "status_counts": {str(status): count for status, count in sorted(recorder.statuses.items(), key=str)},
+            "rate_limited_ratio": round(recorder.statuses.get(429, 0) / total, 4) if total else 0.0,
+            "error_ratio": round((total - recorder.statuses.get(200, 0)) / total, 4) if total else 0.0,
+            "latency_seconds": {
+                "p50": _round(percentile(ok_latencies, 0.50)),
+                "p95": _round(percentile(ok_latencies, 0.95)),
+                "p99": _round(percentile(ok_latencies, 0.99)),
+                "max": _round(ok_latencies[-1] if ok_latencies else None),
+                "all_p99": _round(percentile(all_latencies, 0.99))
+            },
+            "stages_ms": {
+                name: {
+                    "p50": round(percentile(sorted(values), 0.50), 2),
+                    "p95": round(percentile(sorted(values), 0.95), 2),
+                    "mean": round(sum(values) / len(values), 2)
+                }
+                for name, values in recorder.stages.items()
+            },
+            "process": {
+                **process,
+                "cpu_ms_per_request": (
+                    round(1000 * process["cpu_seconds"] / total, 2) if process.get("cpu_seconds") is not None and total else None
+                )
+            },
+            "upload_bytes": recorder.bytes_sent
+        }
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 4) if value is not None else None
+
+
+def print_level(result: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None):
+    latency = result["latency_seconds"]
+    process = result["process"]
+    label = f"{'c' if result['mode'] == 'concurrency' else 'rate '}{result['level']:g}"
+    line = (
+        f"{label:<10} {result['throughput_rps']:>8.2f} {result['requests']:>7} "
+        f"{_fmt(latency['p50']):>8} {_fmt(latency['p95']):>8} {_fmt(latency['p99']):>8} "
+        f"{100 * result['rate_limited_ratio']:>6.1f} {100 * result['error_ratio']:>6.1f} "
+        f"{_fmt(process.get('cpu_utilization'), 2):>6} {_fmt_mib(process.get('rss_max_bytes')):>8}"
+    )
+    if baseline is not None:
+        before, after = baseline["throughput_rps"], result["throughput_rps"]
+        before_p95, after_p95 = baseline["latency_seconds"]["p95"], latency["p95"]
+        line += f"   rps {_delta(before, after)}, p95 {_delta(before_p95, after_p95)}"
+    print(line)
+
+
+def print_stages(result: Dict[str, Any]):
+    stages = ", ".join(f"{name} {values['p50']:.1f}/{values['p95']:.1f}" for name, values in result["stages_ms"].items())
+    if stages:
+        print(f"{'':<10} stages p50/p95 ms: {stages}")
+
+
+def _fmt(value: Optional[float], digits: int = 3) -> str:
+    return f"{value:.{digits}f}" if value is not None else "-"
+
+
+def _fmt_mib(value: Optional[int]) -> str:
+    return f"{value / (1024 * 1024):.0f}M" if value is not None else "-"
+
+
+def _delta(before: Optional[float], after: Optional[float]) -> str:
+    if not before or after is None:
+        return "n/a"
+    return f"{100 * (after - before) / before:+.1f}%"
+
+
+def build_server_env(args) -> Dict[str, str]:
+    env = {
+        "ENABLE_MOCK_PROVIDER": "true",
+        "MOCK_LATENCY_MS": str(args.mock_latency_ms),
+        "MOCK_LATENCY_DISTRIBUTION": args.mock_latency_distribution,
+        "MOCK_ERROR_RATE": str(args.mock_error_rate),
+        "MOCK_RATE_LIMIT_RATE": str(args.mock_rate_limit_rate),
+        "MOCK_SEED": str(args.seed),
+        "RATE_LIMIT_REQUESTS": str(args.rate_limit or UNLIMITED_REQUESTS_PER_MINUTE),
+        "RATE_LIMIT_BURST": str(args.rate_limit_burst or args.rate_limit or UNLIMITED_REQUESTS_PER_MINUTE),
+        # Per-request INFO logs would dominate the profile of a single worker
+        "LOG_LEVEL": "WARNING"
+    }
+    if args.max_concurrent_requests:
+        env["MAX_CONCURRENT_REQUESTS"] = str(args.max_concurrent_requests)
+    if args.cassette:
+        # Serve recorded responses and latencies; the corpus documents differ from the
+        # recorded ones, so match on the prompt only
+        env.update({
+            "LLM_CASSETTE_MODE": "replay",
+            "LLM_CASSETTE_PATH": os.path.abspath(args.cassette),
+            "LLM_CASSETTE_MATCH": "prompt",
+            "LLM_CASSETTE_LATENCY_SCALE": str(args.cassette_latency_scale)
+        })
+    return env
+
+
+async def run(args) -> Dict[str, Any]:
+    corpus = generate_corpus(args.seed, args.corpus)
+    mode, levels = ("rate", args.rate) if args.rate else ("concurrency", args.concurrency)
+    results: Dict[str, Any] = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "endpoint": args.endpoint,
+            "model": args.model,
+            "provider": "external" if args.url else args.provider,
+            "mode": mode,
+            "levels": levels,
+            "duration_seconds": args.duration,
+            "warmup_seconds": args.warmup,
+            "mock_latency_ms": args.mock_latency_ms,
+            "mock_latency_distribution": args.mock_latency_distribution,
+            "mock_error_rate": args.mock_error_rate,
+            "mock_rate_limit_rate": args.mock_rate_limit_rate,
+            "rate_limit": args.rate_limit,
+            "cassette": args.cassette,
+            "cassette_latency_scale": args.cassette_latency_scale if args.cassette else None,
+            "max_concurrent_requests": args.max_concurrent_requests,
+            "corpus": {
+                "profile": args.corpus,
+                "seed": args.seed,
+                "files": len(corpus),
+                "bytes": sum(len(f.data) for f in corpus)
+            }
+        },
+        "levels": []
+    }
+
+    load_test = LoadTest(
+        args.url or f"http://127.0.0.1:{args.port}", args.endpoint, args.model, corpus, args.schema_id, args.seed
+    )
+    print(f"{'level':<10} {'rps':>8} {'reqs':>7} {'p50 s':>8} {'p95 s':>8} {'p99 s':>8} {'429 %':>6} {'err %':>6} {'cpu':>6} {'rss':>8}")
+    for level in levels:
+        result = await load_test.run_level(mode, level, args.duration, args.warmup)
+        results["levels"].append(result)
+        print_level(result, _baseline_level(args.baseline, mode, level))
+        print_stages(result)
+    return results
+
+
+def _baseline_level(baseline: Optional[Dict[str, Any]], mode: str, level: float) -> Optional[Dict[str, Any]]:
+    if not baseline:
+        return None
+    return next((r for r in baseline.get("levels", []) if r["mode"] == mode and r["level"] == level), None)
+
+
+async def main_async(args) -> Dict[str, Any]:
+    if args.url:
+        await wait_until_ready(f"{args.url}/health", None)
+        return await run(args)
+
+    env = build_server_env(args)
+    with tempfile.TemporaryDirectory(prefix="load-test-") as workdir:
+        if args.provider == "server":
+            # Real LiteLLM HTTP path against the OpenAI-compatible stand-in
+            stand_in_env = {k: v for k, v in env.items() if k.startswith("MOCK_")}
+            stand_in = server_process(["benchmarks.mock_openai_server"], args.port + 1, stand_in_env, BACKEND_DIR)
+            env.update({"GROQ_API_BASE": f"http://127.0.0.1:{args.port + 1}/v1", "GROQ_API_KEY": "mock"})
+        else:
+            stand_in = None
+
+        with stand_in or nullcontext():
+            if stand_in is not None:
+                await wait_until_ready(f"http://127.0.0.1:{args.port + 1}/v1/models", None)
+            # The API runs from a scratch directory so its SQLite database starts empty
+            with server_process(
+                ["uvicorn", "main:app", "--app-dir", BACKEND_DIR, "--workers", "1", "--log-level", "warning"],
+                args.port, env, workdir
+            ) as api:
+                await wait_until_ready(f"http://127.0.0.1:{args.port}/health", api)
+                return await run(args)
+
+
+def parse_levels(value: str) -> List[float]:
+    return [float(level) for level in value.split(",") if level.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--concurrency", type=parse_levels, default=[1.0, 4.0, 16.0], help="Closed-loop client counts, comma separated")
+    load.add_argument("--rate", type=parse_levels, help="Open-loop arrival rates in requests/second, comma separated")
+    parser.add_argument("--duration", type=float, default=20.0, help="Measured seconds per level")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Unmeasured seconds before each level")
+    parser.add_argument("--endpoint", choices=sorted(ENDPOINTS), default="extract")
+    parser.add_argument("--model", help="Model id (default: mock_default, or groq_mock-default with --provider server)")
+    parser.add_argument("--schema-id", help="Schema to extract with")
+    parser.add_argument("--corpus", choices=["small", "standard", "full"], default="standard")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--provider", choices=["inprocess", "server"], default="inprocess",
+                        help="inprocess: mock provider inside the API; server: LiteLLM against the stand-in server")
+    parser.add_argument("--url", help="Test an already running API instead of starting one")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the started API (the stand-in uses port + 1)")
+    parser.add_argument("--mock-latency-ms", type=float, default=800.0)
+    parser.add_argument("--mock-latency-distribution", choices=["fixed", "uniform", "lognormal"], default="lognormal")
+    parser.add_argument("--mock-error-rate", type=float, default=0.0)
+    parser.add_argument("--mock-rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--cassette", help="Replay provider responses and latencies from an LLM cassette (use the recorded --model)")
+    parser.add_argument("--cassette-latency-scale", type=float, default=1.0, help="Multiplier for replayed latencies")
+    parser.add_argument("--max-concurrent-requests", type=int, help="MAX_CONCURRENT_REQUESTS for the started API")
+    parser.add_argument("--rate-limit", type=int, help="RATE_LIMIT_REQUESTS for the started API (default: unlimited)")
+    parser.add_argument("--rate-limit-burst", type=int, help="RATE_LIMIT_BURST for the started API")
+    parser.add_argument("--output", help="JSON results path (default: load_test_<commit>_<time>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    if args.model is None:
+        args.model = "groq_mock-default" if args.provider == "server" and not args.url else "mock_default"
+    args.baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            args.baseline = json.load(f)
+
+    results = asyncio.run(main_async(args))
+
+    output = args.output or f"load_test_{results['commit'] or 'nogit'}_{datetime.now():%Y%m%d_%H%M%S}.json"
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Middleware overhead benchmark - per-request cost of the middleware stack
+
+Compares three apps serving the same small GET endpoint, called directly through
+ASGI (no server or network) so only the framework and middleware cost is measured:
+
+  bare    - no middleware
+  asgi    - the production stack from middleware.py
+  legacy  - the same layers written as BaseHTTPMiddleware subclasses
+
+Usage (from backend/):
+    python -m benchmarks.middleware_overhead --requests 5000
+"""
+
+import time
+import asyncio
+import argparse
+import logging
+import statistics
+from typing import Callable, Dict, List
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from middleware import (
+    RateLimitMiddleware,
+    SecurityHeadersMiddleware,
+    RequestLoggingMiddleware,
+    CacheMiddleware,
+    ErrorHandlingMiddleware,
+    APIKeyMiddleware
+)
+from services.rate_limiter import RateLimiter
+from services.response_cache import ResponseCache
+
+# Large enough that no benchmark request is ever limited
+UNLIMITED_REQUESTS_PER_MINUTE = 10 ** 9
+
+
+class LegacyRateLimit(BaseHTTPMiddleware):
+    def __init__(self, app):
+        super().__init__(app)
+        self.limiter = RateLimiter(UNLIMITED_REQUESTS_PER_MINUTE, burst=UNLIMITED_REQUESTS_PER_MINUTE)
+
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        await self.limiter.hit("ip:" + (request.client.host if request.client else "unknown"))
+        return await call_next(request)
+
+
+class LegacySecurityHeaders(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        response = await call_next(request)
+        response.headers["X-Content-Type-Options"] = "nosniff"
+        response.headers["X-Frame-Options"] = "DENY"
+        response.headers["X-XSS-Protection"] = "1; mode=block"
+        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
+        response.headers["Content-Security-Policy"] = "default-src 'self'"
+        return response
+
+
+class LegacyRequestLogging(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        start_time = time.time()
+        request.state.request_id = "bench"
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = "bench"
+        response.headers["X-Response-Time"] = f"{time.time() - start_time:.3f}"
+        return response
+
+
+class LegacyPassThrough(BaseHTTPMiddleware):
+    """Stands in for the cache (disabled), error handling and API key layers"""
+
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        return await call_next(request)
+
+
+def create_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/ping")
+    async def ping():
+        return JSONResponse({"success": True, "message": "pong"})
+
+    return app
+
+
+def build_stacks() -> Dict[str, FastAPI]:
+    """Build the bare, pure-ASGI and legacy apps, in the same layer order as main.py"""
+    bare = create_app()
+
+    asgi = create_app()
+    asgi.add_middleware(ErrorHandlingMiddleware)
+    asgi.add_middleware(SecurityHeadersMiddleware)
+    asgi.add_middleware(CacheMiddleware, cache=ResponseCache(enabled=False))
+    asgi.add_middleware(RequestLoggingMiddleware)
+    asgi.add_middleware(
+        RateLimitMiddleware,
+        requests_per_minute=UNLIMITED_REQUESTS_PER_MINUTE,
+        burst=UNLIMITED_REQUESTS_PER_MINUTE
+    )
+    asgi.add_middleware(APIKeyMiddleware)
+
+    legacy = create_app()
+    legacy.add_middleware(LegacyPassThrough)       # error handling
+    legacy.add_middleware(LegacySecurityHeaders)
+    legacy.add_middleware(LegacyPassThrough)       # cache
+    legacy.add_middleware(LegacyRequestLogging)
+    legacy.add_middleware(LegacyRateLimit)
+    legacy.add_middleware(LegacyPassThrough)       # API key
+
+    return {"bare": bare, "asgi": asgi, "legacy": legacy}
+
+
+async def call_once(app: FastAPI, path: str) -> float:
+    """Send one GET request through the app and return its duration in seconds"""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "headers": [(b"host", b"bench"), (b"accept", b"application/json")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80)
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    await app(scope, receive, send)
+    return time.perf_counter() - start
+
+
+async def run_benchmark(requests: int, warmup: int) -> Dict[str, Dict[str, float]]:
+    stacks = build_stacks()
+    results = {}
+    for name, app in stacks.items():
+        for _ in range(warmup):
+            await call_once(app, "/api/ping")
+        durations: List[float] = [await call_once(app, "/api/ping") for _ in range(requests)]
+        durations.sort()
+        results[name] = {
+            "mean_us": statistics.fmean(durations) * 1e6,
+            "p50_us": durations[len(durations) // 2] * 1e6,
+            "p99_us": durations[int(len(durations) * 0.99)] * 1e6
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure per-request middleware overhead")
+    parser.add_argument("--requests", type=int, default=5000, help="Timed requests per stack")
+    parser.add_argument("--warmup", type=int, default=500, help="Untimed requests per stack")
+    args = parser.parse_args()
+
+    # Request logging would dominate the measurement
+    logging.disable(logging.CRITICAL)
+
+    results = asyncio.run(run_benchmark(args.requests, args.warmup))
+    bare = results["bare"]["mean_us"]
+
+    print(f"{'stack':<8} {'mean µs':>10} {'p50 µs':>10} {'p99 µs':>10} {'overhead µs':>12}")
+    for name, stats in results.items():
+        print(
+            f"{name:<8} {stats['mean_us']:>10.1f} {stats['p50_us']:>10.1f} "
+            f"{stats['p99_us']:>10.1f} {stats['mean_us'] - bare:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Mock OpenAI-compatible server - stand-in provider for the real LiteLLM code path
+
+Serves /v1/chat/completions (plain and streaming) and /v1/models with the same
+content, latency and failure settings as the in-process mock provider
+(services/mock_provider.py, MOCK_* environment variables). Pointing a real provider
+at it exercises LiteLLM's HTTP client as well, without network access or keys:
+
+Usage (from backend/):
+    MOCK_LATENCY_MS=500 python -m benchmarks.mock_openai_server --port 9000
+    GROQ_API_BASE=http://localhost:9000/v1 GROQ_API_KEY=mock uvicorn main:app
+"""
+
+import json
+import time
+import asyncio
+import argparse
+from typing import Any, Dict, Iterator
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from services.mock_provider import (
+    MockRateLimitError,
+    estimate_tokens,
+    generate_content,
+    prompt_text,
+    sample_failure,
+    sample_latency,
+    IMAGE_TOKENS
+)
+
+app = FastAPI(title="Mock OpenAI-compatible provider")
+
+
+def _latency_profile(model: str) -> str:
+    """Models whose id ends with "instant" answer without simulated latency"""
+    return "instant" if model.endswith("instant") else "default"
+
+
+def _sse_chunks(completion_id: str, model: str, content: str, chunk_size: int = 64) -> Iterator[str]:
+    """OpenAI chat.completion.chunk events, ending with [DONE]"""
+    created = int(time.time())
+    deltas = [{"role": "assistant", "content": ""}] + [
+        {"content": content[start:start + chunk_size]} for start in range(0, len(content), chunk_size)
+    ]
+    for index, delta in enumerate(deltas):
+        last = index == len(deltas) - 1
+        chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": "stop" if last else None}]
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+@app.get("/v1/models")
+async def list_models():
+    return {
+        "object": "list",
+        "data": [
+            {"id": model, "object": "model", "owned_by": "mock"}
+            for model in ("mock-default", "mock-instant")
+        ]
+    }
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body: Dict[str, Any] = await request.json()
+    model = body.get("model", "mock-default")
+    await asyncio.sleep(sample_latency(_latency_profile(model)))
+
+    failure = sample_failure()
+    if failure is not None:
+        rate_limited = isinstance(failure, MockRateLimitError)
+        return JSONResponse(
+            status_code=429 if rate_limited else 503,
+            content={"error": {
+                "message": str(failure),
+                "type": "rate_limit_exceeded" if rate_limited else "service_unavailable",
+                "code": None
+            }},
+            headers={"Retry-After": "1"} if rate_limited else None
+        )
+
+    prompt, images = prompt_text(body.get("messages", []))
+    content = generate_content(prompt)
+    completion_id = f"chatcmpl-mock-{time.time_ns()}"
+
+    if body.get("stream"):
+        return StreamingResponse(_sse_chunks(completion_id, model, content), media_type="text/event-stream")
+
+    prompt_tokens = estimate_tokens(prompt) + images * IMAGE_TOKENS
+    completion_tokens = estimate_tokens(content)
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "service_tier": "default",
+        "system_fingerprint": "mock",
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop"
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""
+Pipeline microbenchmarks - CPU-bound document processing functions
+
+Times the functions every upload goes through, on the synthetic corpus
+(benchmarks/corpus.py), outside the web stack:
+
+  validate   FileValidator.validate_file
+  render     pdf_to_images (PDFs) or Image.open + load (images)
+  encode     image_to_base64
+  sanitize   InputSanitizer.sanitize_json_field on extraction results of growing size
+
+With --sweep, render is repeated for each pdf_dpi and encode for each
+max_image_dimension x image_compression_quality combination, reporting time, memory
+and the base64 payload sent to the provider, so settings can be tuned on data.
+
+Memory is reported two ways: peak Python allocations (tracemalloc) and peak resident
+memory growth sampled while the call runs, since Pillow and MuPDF allocate pixel
+buffers outside the Python allocator.
+
+Usage (from backend/):
+    python -m benchmarks.pipeline --corpus standard
+    python -m benchmarks.pipeline --corpus full --sweep --output pipeline.json
+"""
+
+import os
+import json
+import time
+import logging
+import argparse
+import statistics
+import threading
+import tracemalloc
+from io import BytesIO
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from config import settings
+from validators import FileValidator, InputSanitizer
+from services.document_processor import image_to_base64, pdf_to_images
+from services.mock_provider import generate_content
+from benchmarks.corpus import CorpusFile, generate_corpus
+from benchmarks.load_test import git_commit
+
+SWEEP_DPI = [100, 150, 200, 300]
+SWEEP_MAX_DIMENSION = [1024, 1568, 2048, 4096]
+SWEEP_QUALITY = [60, 75, 85, 95]
+SANITIZE_FIELD_COUNTS = [10, 100, 1000]
+
+
+def _rss_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class RssSampler:
+    """Samples resident memory from a thread to catch the peak of a native allocation"""
+
+    def __init__(self, interval: float = 0.001):
+        self.interval = interval
+        self.baseline = _rss_bytes()
+        self.peak = self.baseline
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            current = _rss_bytes()
+            if current is not None and (self.peak is None or current > self.peak):
+                self.peak = current
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        current = _rss_bytes()
+        if current is not None and (self.peak is None or current > self.peak):
+            self.peak = current
+
+    @property
+    def growth(self) -> Optional[int]:
+        return self.peak - self.baseline if self.peak is not None and self.baseline is not None else None
+
+
+def measure(fn: Callable[..., Any], repeats: int, setup: Optional[Callable[[], Any]] = None) -> Tuple[Dict[str, Any], Any]:
+    """
+    Time fn over repeats runs (after one warm-up run), then run it once more under
+    tracemalloc and the RSS sampler. setup() runs untimed before each call and its
+    result is passed to fn (for inputs that fn mutates)
+    """
+    invoke = fn if setup is not None else (lambda _: fn())
+    prepare = setup or (lambda: None)
+    result = invoke(prepare())
+
+    durations = []
+    for _ in range(repeats):
+        argument = prepare()
+        start = time.perf_counter()
+        result = invoke(argument)
+        durations.append(time.perf_counter() - start)
+
+    argument = prepare()
+    tracemalloc.start()
+    with RssSampler() as rss:
+        invoke(argument)
+    _, python_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "mean_ms": round(statistics.fmean(durations) * 1000, 3),
+        "min_ms": round(min(durations) * 1000, 3),
+        "max_ms": round(max(durations) * 1000, 3),
+        "python_peak_bytes": python_peak,
+        "rss_growth_bytes": rss.growth
+    }, result
+
+
+def open_image(data: bytes) -> Image.Image:
+    """Decode an uploaded image the way prepare_document_for_ai does (forcing the lazy load)"""
+    image = Image.open(BytesIO(data))
+    image.load()
+    return image
+
+
+def render(corpus_file: CorpusFile) -> Image.Image:
+    if corpus_file.content_type == "application/pdf":
+        return pdf_to_images(corpus_file.data, page_num=1)
+    return open_image(corpus_file.data)
+
+
+def bench_validate(corpus: List[CorpusFile], validator: FileValidator, repeats: int) -> List[Dict[str, Any]]:
+    rows = []
+    for corpus_file in corpus:
+        stats, (valid, error, _) = measure(lambda: validator.validate_file(corpus_file.data, corpus_file.name), repeats)
+        rows.append({"file": corpus_file.name, "input_bytes": len(corpus_file.data), "valid": valid, "error": error, **stats})
+    return rows
+
+
+def bench_render_encode(corpus: List[CorpusFile], repeats: int) -> List[Dict[str, Any]]:
+    """Render and encode each file at the current settings"""
+    rows = []
+    for corpus_file in corpus:
+        render_stats, image = measure(lambda: render(corpus_file), repeats)
+        # image_to_base64 resizes its input in place, so every run gets a fresh copy
+        encode_stats, payload = measure(image_to_base64, repeats, setup=image.copy)
+        rows.append({
+            "file": corpus_file.name,
+            "input_bytes": len(corpus_file.data),
+            "rendered_size": f"{image.width}x{image.height}",
+            "render": render_stats,
+            "encode": encode_stats,
+            "payload_bytes": len(payload)
+        })
+    return rows
+
+
+def bench_sanitize(repeats: int) -> List[Dict[str, Any]]:
+    """Sanitize mock extraction results with growing field counts"""
+    rows = []
+    for count in SANITIZE_FIELD_COUNTS:
+        prompt = "\n".join(f"- field_{index} (text): value {index}" for index in range(count))
+        data = json.loads(generate_content(prompt))
+        stats, _ = measure(lambda: InputSanitizer.sanitize_json_field(data), repeats)
+        rows.append({"fields": count, "json_bytes": len(json.dumps(data)), **stats})
+    return rows
+
+
+def bench_sweep(corpus: List[CorpusFile], repeats: int, dpis: List[int], dimensions: List[int],
+                qualities: List[int]) -> List[Dict[str, Any]]:
+    """
+    Render once per DPI (PDFs only; images do not depend on it) and encode each rendering
+    at every dimension/quality combination
+    """
+    original = (settings.performance.pdf_dpi, settings.performance.max_image_dimension,
+                settings.performance.image_compression_quality)
+    rows = []
+    try:
+        for corpus_file in corpus:
+            is_pdf = corpus_file.content_type == "application/pdf"
+            for dpi in dpis if is_pdf else [None]:
+                if dpi is not None:
+                    settings.performance.pdf_dpi = dpi
+                render_stats, image = measure(lambda: render(corpus_file), repeats)
+                for dimension in dimensions:
+                    for quality in qualities:
+                        settings.performance.max_image_dimension = dimension
+                        settings.performance.image_compression_quality = quality
+                        encode_stats, payload = measure(image_to_base64, repeats, setup=image.copy)
+                        rows.append({
+                            "file": corpus_file.name,
+                            "pdf_dpi": dpi,
+                            "max_image_dimension": dimension,
+                            "image_compression_quality": quality,
+                            "rendered_size": f"{image.width}x{image.height}",
+                            "render_ms": render_stats["mean_ms"],
+                            "encode_ms": encode_stats["mean_ms"],
+                            "total_ms": round(render_stats["mean_ms"] + encode_stats["mean_ms"], 3),
+                            "rss_growth_bytes": max(render_stats["rss_growth_bytes"] or 0, encode_stats["rss_growth_bytes"] or 0),
+                            "python_peak_bytes": max(render_stats["python_peak_bytes"], encode_stats["python_peak_bytes"]),
+                            "payload_bytes": len(payload)
+                        })
+    finally:
+        (settings.performance.pdf_dpi, settings.performance.max_image_dimension,
+         settings.performance.image_compression_quality) = original
+    return rows
+
+
+def summarize_sweep(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Mean cost of each setting combination across the corpus"""
+    groups: Dict[Tuple, List[Dict[str, Any]]] = {}
+    for row in rows:
+        key = (row["pdf_dpi"], row["max_image_dimension"], row["image_compression_quality"])
+        groups.setdefault(key, []).append(row)
+    return [
+        {
+            "pdf_dpi": dpi,
+            "max_image_dimension": dimension,
+            "image_compression_quality": quality,
+            "files": len(group),
+            "mean_total_ms": round(statistics.fmean(r["total_ms"] for r in group), 2),
+            "mean_payload_bytes": int(statistics.fmean(r["payload_bytes"] for r in group)),
+            "max_rss_growth_bytes": max(r["rss_growth_bytes"] for r in group)
+        }
+        for (dpi, dimension, quality), group in sorted(groups.items(), key=lambda item: tuple(v or 0 for v in item[0]))
+    ]
+
+
+def _kib(value: Optional[int]) -> str:
+    return f"{value / 1024:.0f}K" if value is not None else "-"
+
+
+def print_report(results: Dict[str, Any]):
+    print(f"\nvalidate_file{'':<17} {'mean ms':>9} {'py peak':>9} {'rss +':>9}")
+    for row in results["validate"]:
+        print(f"  {row['file']:<28} {row['mean_ms']:>9.2f} {_kib(row['python_peak_bytes']):>9} {_kib(row['rss_growth_bytes']):>9}"
+              + ("" if row["valid"] else f"  invalid: {row['error']}"))
+
+    print(f"\nrender + encode (dpi {settings.performance.pdf_dpi}, max dim {settings.performance.max_image_dimension}, "
+          f"quality {settings.performance.image_compression_quality})")
+    print(f"  {'file':<28} {'render ms':>10} {'encode ms':>10} {'rss +':>9} {'payload':>9}")
+    for row in results["render_encode"]:
+        rss = max(row["render"]["rss_growth_bytes"] or 0, row["encode"]["rss_growth_bytes"] or 0)
+        print(f"  {row['file']:<28} {row['render']['mean_ms']:>10.2f} {row['encode']['mean_ms']:>10.2f} "
+              f"{_kib(rss):>9} {_kib(row['payload_bytes']):>9}")
+
+    print("\nsanitize_json_field")
+    for row in results["sanitize"]:
+        print(f"  {row['fields']:>5} fields {_kib(row['json_bytes']):>8} {row['mean_ms']:>9.3f} ms")
+
+    if results.get("sweep_summary"):
+        print(f"\nsweep (mean over files)\n  {'dpi':>5} {'max dim':>8} {'quality':>8} {'total ms':>9} {'payload':>9} {'rss +':>9}")
+        for row in results["sweep_summary"]:
+            print(f"  {row['pdf_dpi'] or '-':>5} {row['max_image_dimension']:>8} {row['image_compression_quality']:>8} "
+                  f"{row['mean_total_ms']:>9.1f} {_kib(row['mean_payload_bytes']):>9} {_kib(row['max_rss_growth_bytes']):>9}")
+
+
+def parse_ints(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", choices=["small", "standard", "full"], default="standard")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=5, help="Timed runs per measurement")
+    parser.add_argument("--sweep", action="store_true", help="Sweep pdf_dpi, max_image_dimension and image_compression_quality")
+    parser.add_argument("--dpi", type=parse_ints, default=SWEEP_DPI)
+    parser.add_argument("--max-dimension", type=parse_ints, default=SWEEP_MAX_DIMENSION)
+    parser.add_argument("--quality", type=parse_ints, default=SWEEP_QUALITY)
+    parser.add_argument("--output", help="Save results as JSON")
+    args = parser.parse_args()
+
+    # Debug logs and spans in the measured functions should not count
+    logging.disable(logging.CRITICAL)
+
+    corpus = generate_corpus(args.seed, args.corpus)
+    validator = FileValidator(
+        max_file_size_mb=settings.security.max_file_size_mb,
+        max_image_dimension=settings.performance.max_image_dimension
+    )
+    results: Dict[str, Any] = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "corpus": args.corpus,
+            "seed": args.seed,
+            "repeats": args.repeats,
+            "pdf_dpi": settings.performance.pdf_dpi,
+            "max_image_dimension": settings.performance.max_image_dimension,
+            "image_compression_quality": settings.performance.image_compression_quality
+        },
+        "validate": bench_validate(corpus, validator, args.repeats),
+        "render_encode": bench_render_encode(corpus, args.repeats),
+        "sanitize": bench_sanitize(args.repeats)
+    }
+    if args.sweep:
+        results["sweep"] = bench_sweep(corpus, args.repeats, args.dpi, args.max_dimension, args.quality)
+        results["sweep_summary"] = summarize_sweep(results["sweep"])
+
+    print_report(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Prompt token benchmark - input size of every prompt, checked against a budget
+
+Builds the extraction prompt (with and without the output template, which is left out
+when the response JSON Schema is sent), the single-pass generation prompt and the four
+schema generation prompts for generated schemas from small to huge, with step outputs
+shaped like real model responses fed into the later steps, and counts characters and
+tokens with the local tokenizer (services/token_counter.py). Image tokens are not included: they depend on the
+provider and on MAX_IMAGE_DIMENSION, not on the prompt text.
+
+Counts are compared with benchmarks/prompt_token_budget.json and the script exits
+with status 1 when any prompt is more than --tolerance over its budget. After a
+deliberate prompt change, rerun with --update-budget and commit the new budget with it.
+
+Usage (from backend/):
+    python -m benchmarks.prompt_tokens
+    python -m benchmarks.prompt_tokens --sizes 5,50,500 --output prompts.json
+    python -m benchmarks.prompt_tokens --update-budget
+"""
+
+import sys
+import json
+import random
+import logging
+import argparse
+from pathlib import Path
+from typing import Any, Dict, List
+
+from routers.extraction import (
+    create_extraction_prompt, create_initial_detection_prompt, create_review_prompt,
+    create_confidence_analysis_prompt, create_hints_generation_prompt, create_single_pass_prompt
+)
+from services.token_counter import count_tokens, tokenizer_name
+from benchmarks.load_test import git_commit
+from benchmarks.database_scaling import generate_schema
+
+BUDGET_FILE = Path(__file__).with_name("prompt_token_budget.json")
+DEFAULT_SIZES = [5, 25, 100, 400]
+GENERATION_STEPS = ["step1_detection", "step2_review", "step3_confidence", "step4_hints"]
+STEPS = ["extraction", "extraction_structured"] + GENERATION_STEPS
+
+
+def step_outputs(schema: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Responses of steps 1-3 for a document with the schema's fields, as the model returns them"""
+    fields = schema["fields"]
+    initial = {
+        "document_type": schema["name"],
+        "layout_analysis": "Single page with a header, a photo on the left and labelled fields in two columns",
+        "fields": {
+            name: {
+                "type": field["type"],
+                "location": field["positioning_hints"],
+                "content_preview": f"Sample {name.replace('_', ' ')}"
+            }
+            for name, field in fields.items()
+        }
+    }
+    refined = {
+        "id": schema["name"].lower().replace(" ", "_"),
+        "name": schema["name"],
+        "description": schema["description"],
+        "category": schema["category"],
+        "fields": {
+            name: {"type": field["type"], "required": field["required"], "description": field["description"]}
+            for name, field in fields.items()
+        },
+        "changes_made": ["Added descriptions", "Marked identifying fields as required"]
+    }
+    confidence = {
+        "overall_confidence": 85,
+        "document_quality": "high",
+        "extraction_difficulty": "medium",
+        "field_confidence": {
+            name: {
+                "confidence_score": 90,
+                "legibility": "high",
+                "potential_issues": ["Small print"],
+                "extraction_notes": f"Printed {name.replace('_', ' ')} label"
+            }
+            for name in fields
+        }
+    }
+    return {"initial": initial, "refined": refined, "confidence": confidence}
+
+
+def build_prompts(field_count: int, seed: int) -> Dict[str, str]:
+    """Every prompt sent for one document with a schema of field_count fields"""
+    schema = generate_schema(random.Random(f"{seed}:{field_count}"), field_count, field_count)
+    outputs = step_outputs(schema)
+    return {
+        "extraction": create_extraction_prompt(schema=schema).text,
+        "extraction_structured": create_extraction_prompt(schema=schema, structured_output=True).text,
+        "step1_detection": create_initial_detection_prompt().text,
+        "step2_review": create_review_prompt(outputs["initial"]).text,
+        "step3_confidence": create_confidence_analysis_prompt(outputs["refined"]).text,
+        "step4_hints": create_hints_generation_prompt(outputs["refined"], outputs["confidence"]).text
+    }
+
+
+def measure(sizes: List[int], seed: int) -> Dict[str, Any]:
+    results = {
+        "no_schema": {
+            "extraction": _size(create_extraction_prompt().text),
+            "single_pass": _size(create_single_pass_prompt().text)
+        }
+    }
+    for field_count in sizes:
+        prompts = build_prompts(field_count, seed)
+        steps = {step: _size(prompts[step]) for step in STEPS}
+        steps["generation_total"] = {
+            key: sum(steps[step][key] for step in GENERATION_STEPS) for key in ("chars", "tokens")
+        }
+        results[f"{field_count}_fields"] = steps
+    return results
+
+
+def _size(prompt: str) -> Dict[str, int]:
+    return {"chars": len(prompt), "tokens": count_tokens(prompt)}
+
+
+def check_budget(results: Dict[str, Any], budget: Dict[str, Any], tolerance: float) -> List[str]:
+    """Prompts over budget by more than the tolerance"""
+    failures = []
+    for schema_key, steps in results.items():
+        for step, size in steps.items():
+            limit = budget.get("tokens", {}).get(schema_key, {}).get(step)
+            if limit is not None and size["tokens"] > limit * (1 + tolerance):
+                failures.append(
+                    f"{schema_key} {step}: {size['tokens']} tokens, budget {limit} "
+                    f"(+{100 * (size['tokens'] / limit - 1):.1f}%)"
+                )
+    return failures
+
+
+def print_report(results: Dict[str, Any], budget: Dict[str, Any]):
+    columns = STEPS + ["generation_total", "single_pass"]
+    print(f"{'schema':<12}" + "".join(f"{column:>22}" for column in columns))
+    for schema_key, steps in results.items():
+        row = f"{schema_key:<12}"
+        for column in columns:
+            if column not in steps:
+                row += f"{'':>22}"
+                continue
+            tokens = steps[column]["tokens"]
+            limit = budget.get("tokens", {}).get(schema_key, {}).get(column)
+            change = f" ({100 * (tokens / limit - 1):+.0f}%)" if limit else ""
+            row += f"{str(tokens) + change:>22}"
+        print(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="Schema field counts")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for generated schemas")
+    parser.add_argument("--budget", default=str(BUDGET_FILE), help="Token budget file")
+    parser.add_argument("--tolerance", type=float, default=0.05, help="Allowed growth over budget (fraction)")
+    parser.add_argument("--update-budget", action="store_true", help="Write the current counts as the budget")
+    parser.add_argument("--output", help="Save the results as JSON")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    results = measure(sizes, args.seed)
+    budget_path = Path(args.budget)
+    budget = json.loads(budget_path.read_text()) if budget_path.exists() else {}
+
+    print(f"Prompt tokens ({tokenizer_name()}), change against budget in parentheses\n")
+    print_report(results, budget)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"commit": git_commit(), "tokenizer": tokenizer_name(), "seed": args.seed, "prompts": results}, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+
+    if args.update_budget:
+        budget = {
+            "tokenizer": tokenizer_name(),
+            "seed": args.seed,
+            "tokens": {key: {step: size["tokens"] for step, size in steps.items()} for key, steps in results.items()}
+        }
+        budget_path.write_text(json.dumps(budget, indent=2) + "\n")
+        print(f"\nBudget written to {budget_path}")
+        return
+
+    if budget.get("tokenizer") and budget["tokenizer"] != tokenizer_name():
+        print(f"\nBudget was counted with {budget['tokenizer']}, not {tokenizer_name()}; skipping the check")
+        return
+    failures = check_budget(results, budget, args.tolerance)
+    if failures:
+        print(f"\n{len(failures)} prompt(s) over budget by more than {100 * args.tolerance:.0f}%:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print(f"\nAll prompts within budget (+{100 * args.tolerance:.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -19,10 +19,20 @@ class SecurityConfig(BaseModel):
     )
     rate_limit_requests: int = Field(default=100, description="Max requests per minute")
     rate_limit_burst: int = Field(default=10, description="Burst limit for rate limiting")
+    rate_limit_backend: str = Field(default="memory", description="Rate limit state backend (memory/redis)")
+    rate_limit_redis_url: Optional[str] = Field(default=None, description="Redis URL for shared rate limit state")
+    rate_limit_key_by_api_key: bool = Field(
+        default=False,
+        description="Limit per X-API-Key instead of per IP (only safe when API keys are enforced upstream)"
+    )
     cors_origins: List[str] = Field(
         default=["http://localhost:3000", "http://127.0.0.1:3000"],
         description="Allowed CORS origins"
     )
+    admin_api_key: Optional[str] = Field(
+        default=None,
+        description="Key required in X-Admin-Key for /api/admin endpoints (unset disables them)"
+    )
     # API key authentication not implemented
 
 class PerformanceConfig(BaseModel):
@@ -32,24 +42,42 @@ class PerformanceConfig(BaseModel):
     pdf_dpi: int = Field(default=200, description="DPI for PDF to image conversion")
     response_timeout: int = Field(default=60, description="API response timeout in seconds")
     max_concurrent_requests: int = Field(default=10, description="Maximum concurrent AI requests")
+    ai_queue_timeout: float = Field(default=10.0, description="Seconds an AI request waits for a free slot before a 429 (0 rejects at once)")
     cache_ttl_seconds: int = Field(default=3600, description="Cache TTL in seconds")
     enable_response_caching: bool = Field(default=True, description="Enable response caching")
+    response_cache_max_bytes: int = Field(default=64 * 1024 * 1024, description="Maximum total bytes held by the response cache")
+    response_cache_max_entry_bytes: int = Field(default=1024 * 1024, description="Largest response body the response cache will store")
+    schema_cache_size: int = Field(default=1024, description="Maximum schemas held in the in-process schema cache (0 disables it)")
+    enable_extraction_store: bool = Field(default=True, description="Persist extraction results to the database")
+    extraction_store_batch_size: int = Field(default=100, description="Maximum extraction results written per transaction")
+    extraction_store_flush_interval: float = Field(default=1.0, description="Seconds the extraction writer waits for more results")
 
 class LoggingConfig(BaseModel):
     """Logging configuration"""
     log_level: str = Field(default="INFO", description="Logging level")
     log_format: str = Field(
-        default='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        description="Log format string"
+        default='%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s',
+        description="Log format string (plain text output)"
     )
+    log_json: bool = Field(default=False, description="Write logs as JSON objects")
     log_file: Optional[str] = Field(default=None, description="Log file path")
+    log_file_max_bytes: int = Field(default=10 * 1024 * 1024, description="Size at which the log file is rotated")
+    log_file_backup_count: int = Field(default=5, description="Rotated log files to keep")
+    log_debug_sample_rate: float = Field(default=1.0, description="Fraction of DEBUG records kept (0.0-1.0)")
+    log_queue_size: int = Field(default=10000, description="Records buffered for the log writer thread before dropping")
     enable_request_logging: bool = Field(default=True, description="Enable request/response logging")
 
 class MonitoringConfig(BaseModel):
     """Monitoring and observability settings"""
     enable_health_checks: bool = Field(default=True, description="Enable health check endpoints")
+    enable_metrics: bool = Field(default=True, description="Expose Prometheus metrics at /metrics")
+    enable_server_timing: bool = Field(default=True, description="Report per-stage timings in a Server-Timing header")
     enable_tracing: bool = Field(default=False, description="Enable distributed tracing")
     tracing_sample_rate: float = Field(default=0.1, description="Tracing sample rate (0.0-1.0)")
+    tracing_exporter: str = Field(default="memory", description="Span exporter: memory (in-process), console or otlp")
+    loop_lag_interval: float = Field(default=0.5, description="Seconds between event loop lag samples (0 disables the monitor)")
+    enable_slow_callback_detection: bool = Field(default=False, description="Report callbacks that block the event loop")
+    slow_callback_threshold_ms: float = Field(default=100, description="Event loop block duration reported as a slow callback")
 
 class AIConfig(BaseModel):
     """AI model configuration"""
@@ -62,6 +90,23 @@ class AIConfig(BaseModel):
     max_retries: int = Field(default=3, description="Maximum retries for AI calls")
     retry_delay: float = Field(default=1.0, description="Delay between retries in seconds")
     request_timeout: int = Field(default=30, description="AI request timeout in seconds")
+    circuit_breaker_threshold: int = Field(default=5, description="Consecutive provider failures that open its circuit (0 disables it)")
+    circuit_breaker_reset_seconds: float = Field(default=30.0, description="Seconds an open circuit rejects calls before a trial call")
+    enable_mock_provider: bool = Field(default=False, description="Register the offline mock provider (mock_* models)")
+    mock_latency_ms: float = Field(default=800.0, description="Median simulated latency of mock calls in milliseconds")
+    mock_latency_distribution: str = Field(default="lognormal", description="Mock latency distribution (fixed/uniform/lognormal)")
+    mock_latency_spread: float = Field(default=0.5, description="Mock latency spread (uniform: +/- fraction of the median, lognormal: sigma)")
+    mock_error_rate: float = Field(default=0.0, description="Fraction of mock calls failing with a provider error (503)")
+    mock_rate_limit_rate: float = Field(default=0.0, description="Fraction of mock calls failing with a rate limit error (429)")
+    mock_seed: Optional[int] = Field(default=None, description="Random seed for reproducible mock latencies and failures")
+    llm_cassette_mode: str = Field(default="off", description="Provider call cassette: off, record or replay")
+    llm_cassette_path: str = Field(default="data/llm_cassette.db", description="Cassette file for recorded provider calls")
+    llm_cassette_latency_scale: float = Field(default=1.0, description="Multiplier for recorded latencies in replay mode (0 replays instantly)")
+    llm_cassette_match: str = Field(default="exact", description="Replay matching: exact (prompt, model, image) or prompt (ignores the image)")
+    structured_output_providers: List[str] = Field(
+        default=["groq", "mistral", "mock"],
+        description="Providers sent a strict JSON Schema response format for schema-guided extraction"
+    )
 
 class Settings(BaseModel):
     """Main application settings"""
@@ -94,6 +139,16 @@ class Settings(BaseModel):
             settings.security.max_file_size_mb = int(os.getenv("MAX_FILE_SIZE_MB"))
         if os.getenv("RATE_LIMIT_REQUESTS"):
             settings.security.rate_limit_requests = int(os.getenv("RATE_LIMIT_REQUESTS"))
+        if os.getenv("RATE_LIMIT_BURST"):
+            settings.security.rate_limit_burst = int(os.getenv("RATE_LIMIT_BURST"))
+        if os.getenv("RATE_LIMIT_BACKEND"):
+            settings.security.rate_limit_backend = os.getenv("RATE_LIMIT_BACKEND").lower()
+        if os.getenv("REDIS_URL"):
+            settings.security.rate_limit_redis_url = os.getenv("REDIS_URL")
+        if os.getenv("RATE_LIMIT_KEY_BY_API_KEY"):
+            settings.security.rate_limit_key_by_api_key = os.getenv("RATE_LIMIT_KEY_BY_API_KEY").lower() == "true"
+        if os.getenv("ADMIN_API_KEY"):
+            settings.security.admin_api_key = os.getenv("ADMIN_API_KEY")
         # API key auth not implemented
         if os.getenv("CORS_ORIGINS"):
             settings.security.cors_origins = [origin.strip() for origin in os.getenv("CORS_ORIGINS").split(",")]
@@ -103,6 +158,16 @@ class Settings(BaseModel):
             settings.logging.log_level = os.getenv("LOG_LEVEL").upper()
         if os.getenv("LOG_FILE"):
             settings.logging.log_file = os.getenv("LOG_FILE")
+        if os.getenv("LOG_JSON"):
+            settings.logging.log_json = os.getenv("LOG_JSON").lower() == "true"
+        if os.getenv("LOG_FILE_MAX_MB"):
+            settings.logging.log_file_max_bytes = int(float(os.getenv("LOG_FILE_MAX_MB")) * 1024 * 1024)
+        if os.getenv("LOG_FILE_BACKUP_COUNT"):
+            settings.logging.log_file_backup_count = int(os.getenv("LOG_FILE_BACKUP_COUNT"))
+        if os.getenv("LOG_DEBUG_SAMPLE_RATE"):
+            settings.logging.log_debug_sample_rate = float(os.getenv("LOG_DEBUG_SAMPLE_RATE"))
+        if os.getenv("LOG_QUEUE_SIZE"):
+            settings.logging.log_queue_size = int(os.getenv("LOG_QUEUE_SIZE"))
         if os.getenv("ENABLE_REQUEST_LOGGING"):
             settings.logging.enable_request_logging = os.getenv("ENABLE_REQUEST_LOGGING").lower() == "true"
 
@@ -117,10 +182,24 @@ class Settings(BaseModel):
             settings.performance.response_timeout = int(os.getenv("RESPONSE_TIMEOUT"))
         if os.getenv("MAX_CONCURRENT_REQUESTS"):
             settings.performance.max_concurrent_requests = int(os.getenv("MAX_CONCURRENT_REQUESTS"))
+        if os.getenv("AI_QUEUE_TIMEOUT"):
+            settings.performance.ai_queue_timeout = float(os.getenv("AI_QUEUE_TIMEOUT"))
         if os.getenv("CACHE_TTL_SECONDS"):
             settings.performance.cache_ttl_seconds = int(os.getenv("CACHE_TTL_SECONDS"))
         if os.getenv("ENABLE_RESPONSE_CACHING"):
             settings.performance.enable_response_caching = os.getenv("ENABLE_RESPONSE_CACHING").lower() == "true"
+        if os.getenv("RESPONSE_CACHE_MAX_MB"):
+            settings.performance.response_cache_max_bytes = int(float(os.getenv("RESPONSE_CACHE_MAX_MB")) * 1024 * 1024)
+        if os.getenv("RESPONSE_CACHE_MAX_ENTRY_KB"):
+            settings.performance.response_cache_max_entry_bytes = int(float(os.getenv("RESPONSE_CACHE_MAX_ENTRY_KB")) * 1024)
+        if os.getenv("SCHEMA_CACHE_SIZE"):
+            settings.performance.schema_cache_size = int(os.getenv("SCHEMA_CACHE_SIZE"))
+        if os.getenv("ENABLE_EXTRACTION_STORE"):
+            settings.performance.enable_extraction_store = os.getenv("ENABLE_EXTRACTION_STORE").lower() == "true"
+        if os.getenv("EXTRACTION_STORE_BATCH_SIZE"):
+            settings.performance.extraction_store_batch_size = int(os.getenv("EXTRACTION_STORE_BATCH_SIZE"))
+        if os.getenv("EXTRACTION_STORE_FLUSH_INTERVAL"):
+            settings.performance.extraction_store_flush_interval = float(os.getenv("EXTRACTION_STORE_FLUSH_INTERVAL"))
 
         # AI settings
         if os.getenv("DEFAULT_AI_PROVIDER"):
@@ -135,19 +214,62 @@ class Settings(BaseModel):
             settings.ai.retry_delay = float(os.getenv("AI_RETRY_DELAY"))
         if os.getenv("AI_REQUEST_TIMEOUT"):
             settings.ai.request_timeout = int(os.getenv("AI_REQUEST_TIMEOUT"))
+        if os.getenv("AI_CIRCUIT_BREAKER_THRESHOLD"):
+            settings.ai.circuit_breaker_threshold = int(os.getenv("AI_CIRCUIT_BREAKER_THRESHOLD"))
+        if os.getenv("AI_CIRCUIT_BREAKER_RESET_SECONDS"):
+            settings.ai.circuit_breaker_reset_seconds = float(os.getenv("AI_CIRCUIT_BREAKER_RESET_SECONDS"))
+        if os.getenv("ENABLE_MOCK_PROVIDER"):
+            settings.ai.enable_mock_provider = os.getenv("ENABLE_MOCK_PROVIDER").lower() == "true"
+        if os.getenv("MOCK_LATENCY_MS"):
+            settings.ai.mock_latency_ms = float(os.getenv("MOCK_LATENCY_MS"))
+        if os.getenv("MOCK_LATENCY_DISTRIBUTION"):
+            settings.ai.mock_latency_distribution = os.getenv("MOCK_LATENCY_DISTRIBUTION")
+        if os.getenv("MOCK_LATENCY_SPREAD"):
+            settings.ai.mock_latency_spread = float(os.getenv("MOCK_LATENCY_SPREAD"))
+        if os.getenv("MOCK_ERROR_RATE"):
+            settings.ai.mock_error_rate = float(os.getenv("MOCK_ERROR_RATE"))
+        if os.getenv("MOCK_RATE_LIMIT_RATE"):
+            settings.ai.mock_rate_limit_rate = float(os.getenv("MOCK_RATE_LIMIT_RATE"))
+        if os.getenv("MOCK_SEED"):
+            settings.ai.mock_seed = int(os.getenv("MOCK_SEED"))
+        if os.getenv("LLM_CASSETTE_MODE"):
+            settings.ai.llm_cassette_mode = os.getenv("LLM_CASSETTE_MODE").lower()
+        if os.getenv("LLM_CASSETTE_PATH"):
+            settings.ai.llm_cassette_path = os.getenv("LLM_CASSETTE_PATH")
+        if os.getenv("LLM_CASSETTE_LATENCY_SCALE"):
+            settings.ai.llm_cassette_latency_scale = float(os.getenv("LLM_CASSETTE_LATENCY_SCALE"))
+        if os.getenv("LLM_CASSETTE_MATCH"):
+            settings.ai.llm_cassette_match = os.getenv("LLM_CASSETTE_MATCH").lower()
+        if os.getenv("STRUCTURED_OUTPUT_PROVIDERS") is not None:
+            settings.ai.structured_output_providers = [
+                provider.strip().lower() for provider in os.getenv("STRUCTURED_OUTPUT_PROVIDERS").split(",") if provider.strip()
+            ]
 
         # Monitoring settings
         if os.getenv("ENABLE_HEALTH_CHECKS"):
             settings.monitoring.enable_health_checks = os.getenv("ENABLE_HEALTH_CHECKS").lower() == "true"
+        if os.getenv("ENABLE_METRICS"):
+            settings.monitoring.enable_metrics = os.getenv("ENABLE_METRICS").lower() == "true"
+        if os.getenv("ENABLE_SERVER_TIMING"):
+            settings.monitoring.enable_server_timing = os.getenv("ENABLE_SERVER_TIMING").lower() == "true"
         if os.getenv("ENABLE_TRACING"):
             settings.monitoring.enable_tracing = os.getenv("ENABLE_TRACING").lower() == "true"
         if os.getenv("TRACING_SAMPLE_RATE"):
             settings.monitoring.tracing_sample_rate = float(os.getenv("TRACING_SAMPLE_RATE"))
+        if os.getenv("TRACING_EXPORTER"):
+            settings.monitoring.tracing_exporter = os.getenv("TRACING_EXPORTER").lower()
+        if os.getenv("LOOP_LAG_INTERVAL"):
+            settings.monitoring.loop_lag_interval = float(os.getenv("LOOP_LAG_INTERVAL"))
+        if os.getenv("ENABLE_SLOW_CALLBACK_DETECTION"):
+            settings.monitoring.enable_slow_callback_detection = os.getenv("ENABLE_SLOW_CALLBACK_DETECTION").lower() == "true"
+        if os.getenv("SLOW_CALLBACK_THRESHOLD_MS"):
+            settings.monitoring.slow_callback_threshold_ms = float(os.getenv("SLOW_CALLBACK_THRESHOLD_MS"))
 
         # Production optimizations
         if environment == "production":
             settings.debug = False
             settings.logging.log_level = os.getenv("LOG_LEVEL", "WARNING")
+            settings.logging.log_json = os.getenv("LOG_JSON", "true").lower() == "true"
             settings.performance.enable_response_caching = True
 
         return settings
@@ -2,6 +2,7 @@
 FastAPI backend for AI Data Extractor
 """
 
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 
@@ -16,9 +17,21 @@ from middleware import (
     SecurityHeadersMiddleware,
     RequestLoggingMiddleware,
     CacheMiddleware,
+    MetricsMiddleware,
+    TracingMiddleware,
+    ServerTimingMiddleware,
     ErrorHandlingMiddleware,
+    ProfilingMiddleware,
     APIKeyMiddleware
 )
+from services.rate_limiter import create_rate_limit_backend
+from services.response_cache import response_cache
+from services.schema_cache import schema_cache
+from services.metrics import mark_process_dead
+from services.tracing import setup_tracing
+from services.structured_logging import setup_logging
+from services.runtime_monitor import loop_lag_monitor
+from services.loop_watchdog import loop_watchdog
 
 # Import routers
 from routers.health import router as health_router
@@ -26,19 +39,32 @@ from routers.models import router as models_router
 from routers.schemas import router as schemas_router, load_default_schemas
 from routers.documents import router as documents_router
 from routers.extraction import router as extraction_router
-
-# Configure logging
-logging.basicConfig(
-    level=getattr(logging, settings.logging.log_level.upper()),
-    format=settings.logging.log_format,
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler(settings.logging.log_file) if settings.logging.log_file else logging.NullHandler()
-    ]
+from routers.extractions import router as extractions_router
+from routers.metrics import router as metrics_router
+from routers.admin import router as admin_router
+
+# Configure logging (records are written by a background thread)
+setup_logging(
+    level=settings.logging.log_level,
+    text_format=settings.logging.log_format,
+    json_format=settings.logging.log_json,
+    log_file=settings.logging.log_file,
+    max_bytes=settings.logging.log_file_max_bytes,
+    backup_count=settings.logging.log_file_backup_count,
+    debug_sample_rate=settings.logging.log_debug_sample_rate,
+    queue_size=settings.logging.log_queue_size
 )
 
 logger = logging.getLogger(__name__)
 
+# Tracing (no-op unless ENABLE_TRACING=true)
+setup_tracing(
+    settings.monitoring.enable_tracing,
+    sample_rate=settings.monitoring.tracing_sample_rate,
+    exporter=settings.monitoring.tracing_exporter,
+    service_name=settings.app_name
+)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -52,7 +78,6 @@ async def lifespan(app: FastAPI):
     try:
         import litellm
         logger.info("LiteLLM initialized successfully")
-        litellm.enable_json_schema_validation = True
     except ImportError:
         logger.error("LiteLLM is required. Install with: pip install litellm")
         raise
@@ -71,10 +96,24 @@ async def lifespan(app: FastAPI):
     # Load default schemas
     load_default_schemas()
 
+    # Start the background writer for extraction results
+    from services.extraction_store import extraction_store
+    if settings.performance.enable_extraction_store:
+        extraction_store.start()
+
+    # Sample event loop lag for /api/status
+    loop_lag_monitor.start()
+    if settings.monitoring.enable_slow_callback_detection:
+        loop_watchdog.start(asyncio.get_running_loop())
+
     yield
 
     # Shutdown
     logger.info("Shutting down application")
+    await loop_lag_monitor.stop()
+    loop_watchdog.stop()
+    extraction_store.stop()
+    mark_process_dead()
 
 
 # Create FastAPI application
@@ -85,14 +124,34 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Drop cached schema responses whenever schemas change, in this worker or another one
+schema_cache.add_invalidation_listener(lambda: response_cache.invalidate_tags(["schemas"]))
+response_cache.add_tag_check("schemas", schema_cache.check_for_changes)
+
 # Add middleware stack (order matters - first added is innermost)
+app.add_middleware(ProfilingMiddleware)
 app.add_middleware(ErrorHandlingMiddleware)
 
 # Security and performance middleware (cache before CORS)
 app.add_middleware(SecurityHeadersMiddleware)
-app.add_middleware(CacheMiddleware)
-app.add_middleware(RequestLoggingMiddleware)
-app.add_middleware(RateLimitMiddleware, requests_per_minute=settings.security.rate_limit_requests)
+app.add_middleware(CacheMiddleware, cache=response_cache)
+app.add_middleware(RequestLoggingMiddleware, log_requests=settings.logging.enable_request_logging)
+if settings.monitoring.enable_server_timing:
+    app.add_middleware(ServerTimingMiddleware, timing_allow_origin=settings.security.cors_origins)
+app.add_middleware(
+    RateLimitMiddleware,
+    requests_per_minute=settings.security.rate_limit_requests,
+    burst=settings.security.rate_limit_burst,
+    backend=create_rate_limit_backend(
+        settings.security.rate_limit_backend,
+        settings.security.rate_limit_redis_url
+    ),
+    key_by_api_key=settings.security.rate_limit_key_by_api_key
+)
+
+# Request metrics (outside rate limiting so 429s are counted too)
+if settings.monitoring.enable_metrics:
+    app.add_middleware(MetricsMiddleware)
 
 # CORS middleware (after cache so CORS headers are always applied)
 app.add_middleware(
@@ -101,6 +160,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Request-ID", "X-Response-Time"],
 )
 
 # Compression middleware should be outermost (applied last)
@@ -109,12 +169,19 @@ app.add_middleware(GZipMiddleware, minimum_size=1000)
 # API key middleware for protected endpoints
 app.add_middleware(APIKeyMiddleware)
 
+# Root tracing span, outermost so it covers the whole stack
+app.add_middleware(TracingMiddleware)
+
 # Include routers
 app.include_router(health_router, tags=["Health"])
 app.include_router(models_router, tags=["Models"])
 app.include_router(schemas_router, tags=["Schemas"])
 app.include_router(documents_router, tags=["Documents"])
 app.include_router(extraction_router, tags=["Extraction"])
+app.include_router(extractions_router, tags=["Extractions"])
+if settings.monitoring.enable_metrics:
+    app.include_router(metrics_router, tags=["Monitoring"])
+app.include_router(admin_router, tags=["Admin"])
 
 
 if __name__ == "__main__":
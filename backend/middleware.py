@@ -1,31 +1,49 @@
 """
 Production middleware for security, performance, and monitoring
+
+All middleware here is plain ASGI: it wraps send() instead of buffering responses,
+so streaming bodies pass straight through.
 """
 
 import time
+import math
 import hashlib
-import json
-from typing import Dict, Optional, Callable, Any
-from datetime import datetime, timedelta
-from collections import defaultdict
+from typing import Dict, List, Optional, Tuple, Any
+from datetime import datetime
 import logging
 
 from fastapi import Request, Response, HTTPException, status
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from services.rate_limiter import RateLimiter
+from services.response_cache import ResponseCache, CachedResponse, response_cache, if_none_match_matches
+from services.metrics import HTTP_REQUEST_DURATION, HTTP_REQUEST_SIZE, HTTP_RESPONSE_SIZE, start_stage_timer
+from services.tracing import tracing_enabled, get_tracer
+from services.structured_logging import request_id_var
+from services.loop_watchdog import loop_watchdog
+from services.profiler import profiler_sessions
+from opentelemetry import propagate
+from opentelemetry.trace import SpanKind, Status, StatusCode
 
 logger = logging.getLogger(__name__)
 
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
+class RateLimitMiddleware:
     """Rate limiting middleware to prevent abuse"""
 
-    def __init__(self, app: ASGIApp, requests_per_minute: int = 100, burst: int = 10):
-        super().__init__(app)
-        self.requests_per_minute = requests_per_minute
-        self.burst = burst
-        self.requests: Dict[str, list] = defaultdict(list)
+    def __init__(
+        self,
+        app: ASGIApp,
+        requests_per_minute: int = 100,
+        burst: int = 10,
+        backend: Optional[Any] = None,
+        key_by_api_key: bool = False
+    ):
+        self.app = app
+        self.limiter = RateLimiter(requests_per_minute=requests_per_minute, burst=burst, backend=backend)
+        self.key_by_api_key = key_by_api_key
 
     def get_client_ip(self, request: Request) -> str:
         """Extract client IP from request"""
@@ -34,262 +52,480 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
             return forwarded.split(",")[0].strip()
         return request.client.host if request.client else "unknown"
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+    def get_rate_limit_key(self, request: Request) -> str:
+        """Limit per API key when enabled and present, otherwise per client IP"""
+        if self.key_by_api_key:
+            api_key = request.headers.get("X-API-Key")
+            if api_key:
+                return "key:" + hashlib.sha256(api_key.encode()).hexdigest()[:32]
+        return "ip:" + self.get_client_ip(request)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
         """Check rate limit and process request"""
-        client_ip = self.get_client_ip(request)
-        now = time.time()
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-        # Clean old requests
-        self.requests[client_ip] = [
-            req_time for req_time in self.requests[client_ip]
-            if req_time > now - 60  # Keep only last minute
-        ]
+        key = self.get_rate_limit_key(Request(scope))
+        result = await self.limiter.hit(key)
 
-        # Check rate limit
-        if len(self.requests[client_ip]) >= self.requests_per_minute:
-            logger.warning(f"Rate limit exceeded for IP: {client_ip}")
-            return JSONResponse(
+        if not result.allowed:
+            logger.warning(f"Rate limit exceeded for {key}")
+            response = JSONResponse(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
                 content={
                     "error": "Rate limit exceeded",
-                    "message": f"Maximum {self.requests_per_minute} requests per minute allowed"
-                },
-                headers={"Retry-After": "60"}
-            )
-
-        # Check burst limit
-        recent_requests = [
-            req_time for req_time in self.requests[client_ip]
-            if req_time > now - 1  # Last second
-        ]
-        if len(recent_requests) >= self.burst:
-            logger.warning(f"Burst limit exceeded for IP: {client_ip}")
-            return JSONResponse(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                content={
-                    "error": "Burst limit exceeded",
-                    "message": f"Maximum {self.burst} requests per second allowed"
+                    "message": (
+                        f"Maximum {self.limiter.requests_per_minute} requests per minute "
+                        f"(bursts of {self.limiter.burst}) allowed"
+                    )
                 },
-                headers={"Retry-After": "1"}
+                headers={"Retry-After": str(max(1, math.ceil(result.retry_after)))}
             )
-
-        # Record request
-        self.requests[client_ip].append(now)
+            await response(scope, receive, send)
+            return
 
         # Process request
-        response = await call_next(request)
-        return response
-
-
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
+        await self.app(scope, receive, send)
+
+
+# Relaxed CSP for documentation pages to allow CDN resources
+DOCS_CSP = (
+    "default-src 'self'; "
+    "script-src 'self' 'unsafe-inline' 'unsafe-eval' cdn.jsdelivr.net unpkg.com; "
+    "style-src 'self' 'unsafe-inline' fonts.googleapis.com cdn.jsdelivr.net unpkg.com; "
+    "font-src 'self' data: fonts.gstatic.com cdn.jsdelivr.net; "
+    "img-src 'self' data: https: fastapi.tiangolo.com; "
+    "connect-src 'self'"
+)
+
+# Strict CSP for API endpoints
+API_CSP = (
+    "default-src 'self'; "
+    "script-src 'self' 'unsafe-inline'; "
+    "style-src 'self' 'unsafe-inline'; "
+    "img-src 'self' data: https:; "
+    "font-src 'self' data:; "
+    "connect-src 'self'"
+)
+
+
+class SecurityHeadersMiddleware:
     """Add security headers to responses"""
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        response = await call_next(request)
+    def __init__(self, app: ASGIApp):
+        self.app = app
 
-        # Add security headers
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
         # Different CSP for docs pages vs API
-        if request.url.path in ["/docs", "/redoc"]:
-            # Relaxed CSP for documentation pages to allow CDN resources
-            response.headers["Content-Security-Policy"] = (
-                "default-src 'self'; "
-                "script-src 'self' 'unsafe-inline' 'unsafe-eval' cdn.jsdelivr.net unpkg.com; "
-                "style-src 'self' 'unsafe-inline' fonts.googleapis.com cdn.jsdelivr.net unpkg.com; "
-                "font-src 'self' data: fonts.gstatic.com cdn.jsdelivr.net; "
-                "img-src 'self' data: https: fastapi.tiangolo.com; "
-                "connect-src 'self'"
-            )
-        else:
-            # Strict CSP for API endpoints
-            response.headers["Content-Security-Policy"] = (
-                "default-src 'self'; "
-                "script-src 'self' 'unsafe-inline'; "
-                "style-src 'self' 'unsafe-inline'; "
-                "img-src 'self' data: https:; "
-                "font-src 'self' data:; "
-                "connect-src 'self'"
-            )
+        csp = DOCS_CSP if scope["path"] in ("/docs", "/redoc") else API_CSP
+        is_https = scope.get("scheme") == "https"
 
-        # HSTS for production
-        if request.url.scheme == "https":
-            response.headers["Strict-Transport-Security"] = (
-                "max-age=31536000; includeSubDomains; preload"
-            )
+        async def send_with_headers(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-Content-Type-Options"] = "nosniff"
+                headers["X-Frame-Options"] = "DENY"
+                headers["X-XSS-Protection"] = "1; mode=block"
+                headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
+                headers["Content-Security-Policy"] = csp
 
-        return response
+                # HSTS for production
+                if is_https:
+                    headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains; preload"
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+class RequestLoggingMiddleware:
+    """Assign a request ID (added to every log record) and log requests and responses"""
 
+    def __init__(self, app: ASGIApp, log_requests: bool = True):
+        self.app = app
+        self.log_requests = log_requests
 
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
-    """Log requests and responses for monitoring"""
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
         # Start timer
         start_time = time.time()
+        client_host = scope["client"][0] if scope.get("client") else None
 
         # Generate request ID
-        request_id = hashlib.md5(
-            f"{time.time()}{request.client.host if request.client else ''}".encode()
-        ).hexdigest()[:8]
+        request_id = hashlib.md5(f"{time.time()}{client_host or ''}".encode()).hexdigest()[:8]
 
-        # Store request ID in state
-        request.state.request_id = request_id
+        # Store request ID in state (read back as request.state.request_id)
+        scope.setdefault("state", {})["request_id"] = request_id
+        request_id_var.set(request_id)
+        loop_watchdog.track_request(scope)
 
         # Log request
-        logger.info(
-            f"[{request_id}] {request.method} {request.url.path} "
-            f"from {request.client.host if request.client else 'unknown'}"
-        )
+        if self.log_requests:
+            logger.info(f"{scope['method']} {scope['path']} from {client_host or 'unknown'}")
 
-        try:
-            # Process request
-            response = await call_next(request)
+        status_code = None
 
-            # Calculate duration
-            duration = time.time() - start_time
+        async def send_with_timing(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                duration = time.time() - start_time
 
-            # Log response
-            logger.info(
-                f"[{request_id}] {response.status_code} "
-                f"in {duration:.3f}s"
-            )
-
-            # Add timing header
-            response.headers["X-Request-ID"] = request_id
-            response.headers["X-Response-Time"] = f"{duration:.3f}"
-
-            return response
+                # Add timing header
+                headers = MutableHeaders(scope=message)
+                headers["X-Request-ID"] = request_id
+                headers["X-Response-Time"] = f"{duration:.3f}"
+            await send(message)
 
+        try:
+            # Process request
+            await self.app(scope, receive, send_with_timing)
         except Exception as e:
             duration = time.time() - start_time
             logger.error(
-                f"[{request_id}] Request failed after {duration:.3f}s: {str(e)}",
+                f"Request failed after {duration:.3f}s: {str(e)}",
                 exc_info=True
             )
             raise
 
+        # Log response
+        if self.log_requests:
+            duration = time.time() - start_time
+            logger.info(f"{status_code} in {duration:.3f}s")
 
-class CompressionMiddleware(BaseHTTPMiddleware):
-    """Compress responses for better performance"""
 
-    def should_compress(self, response: Response) -> bool:
-        """Check if response should be compressed"""
-        content_length = response.headers.get("content-length")
-        if content_length and int(content_length) < 1024:  # Don't compress small responses
-            return False
+class MetricsMiddleware:
+    """Record request latency and payload sizes per route template"""
 
-        content_type = response.headers.get("content-type", "")
-        compressible_types = ["application/json", "text/", "application/xml"]
-        return any(ct in content_type for ct in compressible_types)
+    def __init__(self, app: ASGIApp, skip_paths: Optional[List[str]] = None):
+        self.app = app
+        self.skip_paths = skip_paths if skip_paths is not None else ["/metrics"]
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        # Check if client accepts gzip
-        accept_encoding = request.headers.get("accept-encoding", "")
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
 
-        response = await call_next(request)
+        start_time = time.perf_counter()
+        status_code = 500
+        response_size = 0
 
-        # Skip if client doesn't accept gzip or response shouldn't be compressed
-        if "gzip" not in accept_encoding or not self.should_compress(response):
+        async def send_with_metrics(message: Message):
+            nonlocal status_code, response_size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            # Label by route template, never the raw path, to keep label cardinality bounded
+            route = scope.get("route")
+            route_label = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+
+            HTTP_REQUEST_DURATION.labels(method, route_label, str(status_code)).observe(
+                time.perf_counter() - start_time
+            )
+            content_length = Headers(scope=scope).get("content-length")
+            if content_length and content_length.isdigit():
+                HTTP_REQUEST_SIZE.labels(method, route_label).observe(int(content_length))
+            HTTP_RESPONSE_SIZE.labels(method, route_label).observe(response_size)
+
+
+class ServerTimingMiddleware:
+    """Attach a per-request stage timer (request.state.stage_timer) and emit it as Server-Timing"""
+
+    def __init__(self, app: ASGIApp, timing_allow_origin: Optional[List[str]] = None):
+        self.app = app
+        # Lets cross-origin pages read the timings through the Resource Timing API
+        self.timing_allow_origin = ", ".join(timing_allow_origin) if timing_allow_origin else None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timer = start_stage_timer()
+        scope.setdefault("state", {})["stage_timer"] = timer
+
+        async def send_with_server_timing(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", timer.server_timing())
+                if self.timing_allow_origin:
+                    headers["Timing-Allow-Origin"] = self.timing_allow_origin
+            await send(message)
+
+        await self.app(scope, receive, send_with_server_timing)
+
+
+class TracingMiddleware:
+    """Open a root span per request, continuing any W3C trace context from the caller"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not tracing_enabled():
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        carrier = {name.decode("latin-1"): value.decode("latin-1") for name, value in scope["headers"]}
+        context = propagate.extract(carrier)
+        status_code = 500
+
+        async def send_with_status(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        with get_tracer().start_as_current_span(
+            f"{method} {scope['path']}",
+            context=context,
+            kind=SpanKind.SERVER,
+            attributes={"http.method": method, "http.target": scope["path"], "http.scheme": scope.get("scheme", "http")}
+        ) as root_span:
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                # Name the span by route template once routing has happened
+                route = getattr(scope.get("route"), "path", None)
+                if route:
+                    root_span.update_name(f"{method} {route}")
+                    root_span.set_attribute("http.route", route)
+                root_span.set_attribute("http.status_code", status_code)
+                request_id = scope.get("state", {}).get("request_id")
+                if request_id:
+                    root_span.set_attribute("request.id", request_id)
+                if status_code >= 500:
+                    root_span.set_status(Status(StatusCode.ERROR))
+
+
+class CacheMiddleware:
+    """Serve GET responses from the byte-bounded response cache"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        cache: Optional[ResponseCache] = None,
+        skip_paths: Optional[List[str]] = None,
+        tag_rules: Optional[Dict[str, str]] = None
+    ):
+        self.app = app
+        self.cache = cache or response_cache
+        self.skip_paths = skip_paths if skip_paths is not None else ["/health", "/api/status", "/api/extractions", "/metrics", "/api/admin"]
+        # Path prefix -> tag, so writes can invalidate every response built from that data
+        self.tag_rules = tag_rules if tag_rules is not None else {"/api/schemas": "schemas"}
+
+    def get_tags(self, path: str) -> List[str]:
+        """Get invalidation tags for a request path"""
+        return [tag for prefix, tag in self.tag_rules.items() if path.startswith(prefix)]
+
+    def is_cacheable(self, status_code: int, headers: Headers) -> bool:
+        """Only complete, uncompressed, public JSON responses of known size are stored"""
+        if status_code != 200:
+            return False
+        if "application/json" not in headers.get("content-type", ""):
+            return False
+        content_length = headers.get("content-length")
+        if content_length is None or int(content_length) > self.cache.max_entry_bytes:
+            return False
+        if "content-encoding" in headers or "set-cookie" in headers or headers.get("vary", "").strip() == "*":
+            return False
+        cache_control = headers.get("cache-control", "").lower()
+        return "no-store" not in cache_control and "private" not in cache_control
+
+    def build_response(self, entry: CachedResponse, accept_encoding: str, if_none_match: Optional[str], cache_status: str) -> Response:
+        """Replay a cached entry, choosing the gzip variant when the client accepts it"""
+        age = str(int(time.time() - entry.created_at))
+
+        if if_none_match_matches(if_none_match, entry.etag):
+            headers = [(k, v) for k, v in entry.headers if k.lower() in (b"etag", b"cache-control", b"vary")]
+            response = Response(status_code=304)
+            response.raw_headers = headers + [(b"x-cache", cache_status.encode()), (b"x-cache-age", age.encode())]
             return response
 
-        # For streaming responses, we can't easily compress
-        # In production, use nginx/apache for compression
+        headers = list(entry.headers)
+        body = entry.body
+        if entry.gzip_body is not None and "gzip" in accept_encoding.lower():
+            body = entry.gzip_body
+            headers.append((b"content-encoding", b"gzip"))
+
+        response = Response(status_code=entry.status_code)
+        response.body = body
+        response.raw_headers = headers + [
+            (b"content-length", str(len(body)).encode()),
+            (b"x-cache", cache_status.encode()),
+            (b"x-cache-age", age.encode())
+        ]
         return response
 
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        # Only cache GET requests
+        if scope["type"] != "http" or scope["method"] != "GET" or not self.cache.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        if any(path.startswith(skip_path) for skip_path in self.skip_paths):
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        query = scope.get("query_string", b"").decode("latin-1")
+        accept_encoding = request_headers.get("accept-encoding", "")
+        if_none_match = request_headers.get("if-none-match")
+
+        entry, epoch = self.cache.get("GET", path, query, request_headers)
+        if entry is not None:
+            logger.debug(f"Cache hit for {path}?{query}")
+            await self.build_response(entry, accept_encoding, if_none_match, "HIT")(scope, receive, send)
+            return
+
+        # Ask for the full body so it can be cached; the condition is evaluated here instead
+        if if_none_match:
+            scope["headers"] = [(name, value) for name, value in scope["headers"] if name != b"if-none-match"]
+
+        start_message: Optional[Message] = None
+        body_chunks: List[bytes] = []
+        buffering = False
+        discarding = False
+
+        def is_not_modified(status_code: int, response_headers: Headers) -> bool:
+            """The stripped condition, evaluated against a response that is not replayed from the cache"""
+            etag = response_headers.get("etag")
+            return status_code == 200 and etag is not None and if_none_match_matches(if_none_match, etag)
+
+        async def send_not_modified(headers: List[Tuple[bytes, bytes]]):
+            await send({
+                "type": "http.response.start",
+                "status": 304,
+                "headers": [(k, v) for k, v in headers if k.lower() in (b"etag", b"cache-control", b"vary")]
+            })
+            await send({"type": "http.response.body", "body": b""})
+
+        async def send_through_cache(message: Message):
+            nonlocal start_message, buffering, discarding
+            if discarding:
+                return
+
+            if message["type"] == "http.response.start":
+                response_headers = Headers(raw=message["headers"])
+                if not self.is_cacheable(message["status"], response_headers):
+                    if is_not_modified(message["status"], response_headers):
+                        # The client already has this version: answer 304 and drop the body
+                        discarding = True
+                        await send_not_modified(message["headers"])
+                        return
+                    # Everything else, including streaming bodies, passes straight through
+                    await send(message)
+                    return
+                start_message = message
+                buffering = True
+                return
+
+            if not buffering or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body_chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            buffering = False
+            body = b"".join(body_chunks)
+            response_headers = Headers(raw=start_message["headers"])
+            stored = self.cache.store(
+                "GET", path, query, request_headers,
+                status_code=start_message["status"],
+                headers=start_message["headers"],
+                body=body,
+                vary=response_headers.get("vary", "").split(","),
+                tags=self.get_tags(path),
+                epoch=epoch
+            )
+            if stored is None:
+                if is_not_modified(start_message["status"], response_headers):
+                    await send_not_modified(start_message["headers"])
+                    return
+                await send(start_message)
+                await send({"type": "http.response.body", "body": body})
+                return
 
-class CacheMiddleware(BaseHTTPMiddleware):
-    """Simple in-memory cache for GET requests"""
+            await self.build_response(stored, accept_encoding, if_none_match, "MISS")(scope, receive, send)
 
-    def __init__(self, app: ASGIApp, ttl_seconds: int = 3600):
-        super().__init__(app)
-        self.cache: Dict[str, tuple[Any, float]] = {}
-        self.ttl_seconds = ttl_seconds
+        await self.app(scope, receive, send_through_cache)
 
-    def get_cache_key(self, request: Request) -> str:
-        """Generate cache key from request"""
-        return f"{request.method}:{request.url.path}:{request.url.query}"
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        # Only cache GET requests
-        if request.method != "GET":
-            return await call_next(request)
-
-        # Skip cache for certain paths
-        skip_paths = ["/health", "/api/status"]
-        if any(request.url.path.startswith(path) for path in skip_paths):
-            return await call_next(request)
-
-        cache_key = self.get_cache_key(request)
-        now = time.time()
-
-        # Check cache
-        if cache_key in self.cache:
-            cached_response, timestamp = self.cache[cache_key]
-            if now - timestamp < self.ttl_seconds:
-                logger.debug(f"Cache hit for {cache_key}")
-                return JSONResponse(
-                    content=cached_response,
-                    headers={"X-Cache": "HIT", "X-Cache-Age": str(int(now - timestamp))}
-                )
+class ProfilingMiddleware:
+    """Hand requests to armed profiler sessions (a single flag check when none is armed)"""
 
-        # Process request
-        response = await call_next(request)
-
-        # Cache successful JSON responses
-        if response.status_code == 200:
-            content_type = response.headers.get("content-type", "")
-            if "application/json" in content_type:
-                # Read response body (this consumes the response)
-                body = b""
-                async for chunk in response.body_iterator:
-                    body += chunk
-
-                try:
-                    # Decode body as UTF-8 first
-                    try:
-                        body_text = body.decode('utf-8')
-                    except UnicodeDecodeError:
-                        # If we can't decode as UTF-8, don't cache
-                        logger.debug(f"Cannot decode response body as UTF-8 for {cache_key}")
-                        return response
-
-                    # Parse and cache JSON
-                    json_content = json.loads(body_text)
-                    self.cache[cache_key] = (json_content, now)
-
-                    # Return new response with cache headers
-                    return JSONResponse(
-                        content=json_content,
-                        headers={"X-Cache": "MISS"}
-                    )
-                except json.JSONDecodeError:
-                    # Return original response if not JSON
-                    return Response(content=body, headers=dict(response.headers))
+    def __init__(self, app: ASGIApp):
+        self.app = app
 
-        return response
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if not profiler_sessions.armed or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        sessions = profiler_sessions.claim(scope["path"])
+        for session in sessions:
+            await session.before()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            for session in sessions:
+                await session.after()
 
 
-class ErrorHandlingMiddleware(BaseHTTPMiddleware):
+class ErrorHandlingMiddleware:
     """Global error handling with proper logging and response format"""
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        response_started = False
+
+        async def send_tracking_start(message: Message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
         try:
-            return await call_next(request)
+            await self.app(scope, receive, send_tracking_start)
         except HTTPException:
             # Let FastAPI handle HTTP exceptions
             raise
         except Exception as e:
-            request_id = getattr(request.state, "request_id", "unknown")
+            request_id = scope.get("state", {}).get("request_id", "unknown")
             logger.error(
-                f"[{request_id}] Unhandled exception: {str(e)}",
+                f"Unhandled exception: {str(e)}",
                 exc_info=True
             )
 
-            return JSONResponse(
+            # Headers are already on the wire, so the connection can only be aborted
+            if response_started:
+                raise
+
+            response = JSONResponse(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 content={
                     "success": False,
@@ -299,32 +535,37 @@ class ErrorHandlingMiddleware(BaseHTTPMiddleware):
                     "timestamp": datetime.utcnow().isoformat()
                 }
             )
+            await response(scope, receive, send)
 
 
-class APIKeyMiddleware(BaseHTTPMiddleware):
+class APIKeyMiddleware:
     """API key authentication middleware"""
 
     def __init__(self, app: ASGIApp, api_keys: Optional[list] = None):
-        super().__init__(app)
+        self.app = app
         self.api_keys = set(api_keys) if api_keys else set()
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
         # Skip auth for health check and docs
         skip_paths = ["/health", "/docs", "/openapi.json", "/redoc"]
-        if any(request.url.path.startswith(path) for path in skip_paths):
-            return await call_next(request)
+        if scope["type"] != "http" or any(scope["path"].startswith(path) for path in skip_paths):
+            await self.app(scope, receive, send)
+            return
 
         # Check API key if configured
         if self.api_keys:
-            api_key = request.headers.get("X-API-Key")
+            api_key = Headers(scope=scope).get("X-API-Key")
             if not api_key or api_key not in self.api_keys:
-                logger.warning(f"Invalid API key from {request.client.host if request.client else 'unknown'}")
-                return JSONResponse(
+                client_host = scope["client"][0] if scope.get("client") else "unknown"
+                logger.warning(f"Invalid API key from {client_host}")
+                response = JSONResponse(
                     status_code=status.HTTP_401_UNAUTHORIZED,
                     content={
                         "error": "Unauthorized",
                         "message": "Invalid or missing API key"
                     }
                 )
+                await response(scope, receive, send)
+                return
 
-        return await call_next(request)
\ No newline at end of file
+        await self.app(scope, receive, send)
\ No newline at end of file
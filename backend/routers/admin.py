@@ -0,0 +1,117 @@
+"""
+Admin diagnostics endpoints (require the X-Admin-Key header)
+"""
+
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+
+from config import settings
+from services.loop_watchdog import loop_watchdog
+from services.profiler import MAX_PROFILE_SECONDS, profiler_sessions, profile_for
+
+
+def require_admin(x_admin_key: Optional[str] = Header(None)):
+    """Dependency to check the admin API key"""
+    if not settings.security.admin_api_key:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin endpoints are disabled (ADMIN_API_KEY is not set)"
+        )
+    if not x_admin_key or not secrets.compare_digest(x_admin_key, settings.security.admin_api_key):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or missing admin key"
+        )
+
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+@router.get("/api/admin/slow-callbacks")
+async def get_slow_callbacks(limit: int = Query(20, ge=1, le=200)):
+    """
+    Top event loop blockers seen by this worker (ENABLE_SLOW_CALLBACK_DETECTION=true),
+    ordered by total blocked time, with stacks and the routes/requests they hit
+    """
+    return loop_watchdog.get_report(limit)
+
+
+@router.delete("/api/admin/slow-callbacks")
+async def reset_slow_callbacks():
+    """Clear collected slow callback events"""
+    loop_watchdog.reset()
+    return {"success": True}
+
+
+def _check_route(route: str):
+    """Reject route templates the profiler cannot match"""
+    if not route.startswith("/"):
+        raise HTTPException(status_code=400, detail="route must be a path such as /api/extract")
+
+
+@router.post("/api/admin/profile/cpu")
+async def profile_cpu(
+    seconds: float = Query(10, gt=0, le=MAX_PROFILE_SECONDS),
+    interval_ms: float = Query(5, ge=1, le=1000),
+    format: str = Query("json", pattern="^(json|collapsed)$")
+):
+    """
+    Sample every thread's stack for the given time and return the result
+    format=collapsed returns plain collapsed stacks for flamegraph.pl / speedscope
+    """
+    report = await profile_for(seconds, interval_ms / 1000)
+    if format == "collapsed":
+        return PlainTextResponse("\n".join(report["collapsed"]))
+    return report
+
+
+@router.post("/api/admin/profile/cpu/requests")
+async def arm_cpu_profile(
+    route: str = Query("/api/extract", description="Route path or template, e.g. /api/schemas/{schema_id}"),
+    count: int = Query(5, ge=1, le=1000),
+    interval_ms: float = Query(5, ge=1, le=1000)
+):
+    """Profile while the next `count` requests to `route` are in flight (read with GET)"""
+    _check_route(route)
+    session = profiler_sessions.arm_cpu(route, count, interval_ms / 1000)
+    return session.status()
+
+
+@router.get("/api/admin/profile/cpu")
+async def get_cpu_profile(format: str = Query("json", pattern="^(json|collapsed)$")):
+    """Progress and samples of the request-triggered CPU profile"""
+    session = profiler_sessions.cpu
+    if session is None:
+        raise HTTPException(status_code=404, detail="No CPU profile has been requested")
+    if format == "collapsed":
+        return PlainTextResponse(session.profiler.collapsed())
+    return {**session.status(), **session.profiler.report()}
+
+
+@router.post("/api/admin/profile/memory")
+async def arm_memory_profile(
+    route: str = Query("/api/extract", description="Route path or template"),
+    count: int = Query(3, ge=1, le=100)
+):
+    """Take tracemalloc snapshots around the next `count` requests to `route` (read with GET)"""
+    _check_route(route)
+    try:
+        session = profiler_sessions.arm_memory(route, count)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return session.status()
+
+
+@router.get("/api/admin/profile/memory")
+async def get_memory_profile(top: int = Query(20, ge=1, le=200)):
+    """Top allocation growth sites, peak memory and per-stage peaks once the session is done"""
+    session = profiler_sessions.memory
+    if session is None:
+        raise HTTPException(status_code=404, detail="No memory profile has been requested")
+    if not session.done:
+        return session.status()
+    return await run_in_threadpool(session.report, top)
@@ -23,7 +23,7 @@ async def upload_document(
 
     try:
         # Use shared document processing function
-        file_data, metadata = await process_uploaded_document(file, request_id)
+        file_data, metadata = await process_uploaded_document(file)
 
         # Generate document metadata using shared function
         document_metadata = create_document_metadata(metadata, request_id)
@@ -47,7 +47,7 @@ async def upload_document(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"[{request_id}] Document upload error: {str(e)}", exc_info=True)
+        logger.error(f"Document upload error: {str(e)}", exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to process document upload"
@@ -4,8 +4,10 @@ Data extraction and schema generation endpoints
 
 import json
 import time
+import uuid
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Literal, Tuple
+from collections import defaultdict
 from datetime import datetime
 
 from fastapi import APIRouter, UploadFile, File, Form, Request, HTTPException, Depends, status
@@ -13,8 +15,13 @@ from fastapi import APIRouter, UploadFile, File, Form, Request, HTTPException, D
 from config import settings
 from validators import InputSanitizer
 from services.document_processor import process_uploaded_document, prepare_document_for_ai
-from services.ai_service import determine_ai_model, make_ai_request_with_retry, extract_json_from_text
-from routers.schemas import get_schemas_dict
+from services.ai_service import determine_ai_model, make_ai_request_with_retry, extract_json_from_text, parse_ai_response
+from routers.schemas import get_schemas_dict, get_schema_by_id
+from services.database import db_service
+from services.extraction_store import extraction_store
+from services.metrics import Ewma, stage, get_stage_timer
+from services.prompt_compiler import CompiledPrompt, compile_prompt, compact_json
+from services.structured_output import extraction_response_format, schema_generation_response_format
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -22,6 +29,11 @@ logger = logging.getLogger(__name__)
 # Initialize sanitizer
 input_sanitizer = InputSanitizer()
 
+# Recent AI time and provider-reported input tokens of schema generations per (model, mode),
+# for the fast mode savings estimate
+generation_ai_time: Dict[Tuple[str, str], Ewma] = defaultdict(Ewma)
+generation_prompt_tokens: Dict[Tuple[str, str], Ewma] = defaultdict(Ewma)
+
 
 def check_ai_request_limit():
     """Dependency to check AI request limits"""
@@ -40,41 +52,51 @@ async def extract_data(
     file: UploadFile = File(...),
     model: Optional[str] = Form(None),
     schema_id: Optional[str] = Form(None),
+    schema_version: Optional[int] = Form(None),
     _: None = Depends(check_ai_request_limit)
 ):
     """Extract data with production-grade error handling and validation"""
     request_id = getattr(request.state, "request_id", "unknown")
     start_time = time.time()
 
-    logger.info(f"[{request_id}] Starting data extraction for {file.filename}")
+    logger.info(f"Starting data extraction for {file.filename}")
 
     try:
-        # Use shared document processing functions
-        file_data, metadata = await process_uploaded_document(file, request_id)
-        image, image_base64 = await prepare_document_for_ai(file_data, metadata, request_id)
-
-        # Determine model using shared function
+        # Determine model using shared function (rejects unlisted models before the upload is processed)
         provider_id, model_id, model_param = determine_ai_model(model)
 
-        # Sanitize and validate schema_id
+        # Use shared document processing functions
+        file_data, metadata = await process_uploaded_document(file)
+        image, image_base64 = await prepare_document_for_ai(file_data, metadata)
+
+        # Sanitize and validate schema_id, resolving the exact schema version used
+        schema = None
         if schema_id:
             schema_id = input_sanitizer.sanitize_string(schema_id, max_length=100)
-            # Check if schema exists in database
-            from routers.schemas import get_schema_by_id
-            if not get_schema_by_id(schema_id):
-                logger.warning(f"[{request_id}] Invalid schema_id: {schema_id}")
+            # Check if schema (or the pinned version) exists in database
+            with stage("db"):
+                schema = get_schema_by_id(schema_id, schema_version)
+            if not schema:
+                logger.warning(f"Invalid schema_id: {schema_id} (version {schema_version})")
                 schema_id = None
 
-        # Create extraction prompt
-        prompt = create_extraction_prompt(schema_id)
+        # Create extraction prompt, leaving the output template to a JSON Schema response format where supported
+        response_format = extraction_response_format(schema, model_param)
+        prompt = create_extraction_prompt(schema_id, schema=schema, structured_output=response_format is not None)
 
-        # Make AI request with retry and timeout
-        logger.info(f"[{request_id}] Making AI request with model {model_param}")
-        ai_response = await make_ai_request_with_retry(prompt, image_base64, model_param)
+        # Make AI request with retry and timeout; the full prompt is only built if the model rejects the format
+        logger.info(f"Making AI request with model {model_param}")
+        ai_response = await make_ai_request_with_retry(
+            prompt.text, image_base64, model_param, response_format=response_format,
+            fallback_prompt=(lambda: create_extraction_prompt(schema_id, schema=schema).text) if response_format else None
+        )
+        if response_format and ai_response["response_format"] != "json_schema":
+            prompt = create_extraction_prompt(schema_id, schema=schema)
 
-        # Process response
+        # Process response, keeping the complete fields of a response cut off at the token limit
         raw_content = ai_response["content"]
-        is_json, parsed_data, formatted_text = extract_json_from_text(raw_content)
+        parsed = parse_ai_response(raw_content)
+        is_json, parsed_data = parsed.data is not None, parsed.data
 
         # Build response
         extraction_result = {
@@ -91,6 +113,12 @@ async def extract_data(
                 "model_used": f"{provider_id} - {model_id}",
                 "extraction_mode": "schema_guided" if schema_id else "freeform",
                 "schema_used": schema_id,
+                "schema_version": schema.get("version") if schema else None,
+                "prompt_tokens": prompt_token_counts(prompt, ai_response.get("usage")),
+                "response_format": ai_response["response_format"],
+                "finish_reason": ai_response["finish_reason"],
+                "json_parse": parsed.method,
+                "recovered_fields": parsed.recovered_fields,
                 "request_id": request_id
             }
         }
@@ -100,21 +128,40 @@ async def extract_data(
             extraction_result["document_verification"] = parsed_data["document_verification"]
 
         # Add validation results if schema was used
-        if schema_id and is_json and parsed_data:
-            from routers.schemas import get_schema_by_id
-            schema = get_schema_by_id(schema_id)
-            if schema:
+        if schema and is_json and parsed_data:
+            with stage("schema_validation"):
                 validation_results = validate_against_schema(parsed_data, schema)
-                extraction_result["validation"] = validation_results
+            extraction_result["validation"] = validation_results
+
+        timings = get_stage_timer(request).as_dict()
+        extraction_result["metadata"]["timings"] = timings
+
+        # Persist the result in the background (adds no latency to the response)
+        if settings.performance.enable_extraction_store:
+            extraction_id = str(uuid.uuid4())
+            extraction_result["metadata"]["extraction_id"] = extraction_id
+            extraction_store.record({
+                "extraction_id": extraction_id,
+                "request_id": request_id,
+                "file_hash": metadata.get("file_hash"),
+                "file_type": metadata["file_type"],
+                "schema_id": schema_id,
+                "schema_version": extraction_result["metadata"]["schema_version"],
+                "model": model_param,
+                "processing_time": time.time() - start_time,
+                "timings": timings,
+                "usage": ai_response.get("usage"),
+                "result": extraction_result
+            })
 
-        logger.info(f"[{request_id}] Extraction completed in {time.time() - start_time:.2f}s")
+        logger.info(f"Extraction completed in {time.time() - start_time:.2f}s")
 
         return extraction_result
 
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"[{request_id}] Extraction error: {str(e)}", exc_info=True)
+        logger.error(f"Extraction error: {str(e)}", exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to extract data from document"
@@ -126,159 +173,236 @@ async def generate_schema(
     request: Request,
     file: UploadFile = File(...),
     model: Optional[str] = Form(None),
+    reuse_threshold: Optional[float] = Form(None, ge=0.0, le=1.0),
+    mode: Literal["thorough", "fast"] = Form("thorough"),
     _: None = Depends(check_ai_request_limit)
 ):
-    """Generate schema with production validation and error handling"""
+    """Generate schema with production validation and error handling
+
+    mode=thorough runs four sequential calls (detection, review, confidence, hints);
+    mode=fast produces the same schema from one combined call.
+    """
     request_id = getattr(request.state, "request_id", "unknown")
     start_time = time.time()
 
-    logger.info(f"[{request_id}] Starting schema generation for {file.filename}")
+    logger.info(f"Starting schema generation for {file.filename}")
 
     try:
-        # Use shared document processing functions
-        file_data, metadata = await process_uploaded_document(file, request_id)
-        image, image_base64 = await prepare_document_for_ai(file_data, metadata, request_id)
-
-        # Determine model using shared function
+        # Determine model using shared function (rejects unlisted models before the upload is processed)
         provider_id, model_id, model_param = determine_ai_model(model)
 
+        # Use shared document processing functions
+        file_data, metadata = await process_uploaded_document(file)
+        image, image_base64 = await prepare_document_for_ai(file_data, metadata)
+
         # Get schemas dict to store result
         SCHEMAS = get_schemas_dict()
 
-        # Multi-step AI processing
+        # AI processing: one combined call (fast) or four sequential steps (thorough)
         ai_debug_info = {"steps": []}
-        logger.info(f"[{request_id}] Starting multi-step schema generation with model {model_param}")
-
-        # Step 1: Initial Detection
-        step1_prompt = create_initial_detection_prompt()
-        step1_start = time.time()
-
-        step1_response_data = await make_ai_request_with_retry(
-            step1_prompt, image_base64, model_param, max_retries=settings.ai.max_retries
-        )
-        step1_end = time.time()
-
-        step1_raw = step1_response_data["content"]
-        step1_valid, step1_data, step1_formatted = extract_json_from_text(step1_raw)
-
-        ai_debug_info["steps"].append({
-            "step": 1,
-            "name": "Initial Detection",
-            "duration": step1_end - step1_start,
-            "success": step1_valid,
-            "tokens_used": step1_response_data.get("usage", {}),
-            "prompt": step1_prompt,
-            "raw_response": step1_raw,
-            "parsed_data": step1_data
-        })
-
-        if not step1_valid or not step1_data:
-            logger.warning(f"[{request_id}] Step 1 failed, using fallback schema")
-            step1_data = {
-                "document_type": "Unknown Document",
-                "layout_analysis": "Unable to analyze document layout due to AI processing error",
-                "fields": {
-                    "field_1": {
-                        "type": "text",
-                        "location": "Unable to determine location",
-                        "content_preview": "Unable to preview content"
+        logger.info(f"Starting {mode} schema generation with model {model_param}")
+
+        if mode == "fast":
+            # Single call returning the refined schema with confidence and hints
+            single_prompt = create_single_pass_prompt()
+            single_start = time.time()
+
+            single_response_data = await make_ai_request_with_retry(
+                single_prompt.text, image_base64, model_param, max_retries=settings.ai.max_retries,
+                response_format=schema_generation_response_format(model_param)
+            )
+            single_end = time.time()
+
+            single_raw = single_response_data["content"]
+            single_valid, single_data, single_formatted = extract_json_from_text(single_raw)
+
+            ai_debug_info["steps"].append({
+                "step": 1,
+                "name": "Single-Pass Generation",
+                "duration": single_end - single_start,
+                "success": single_valid,
+                "tokens_used": single_response_data.get("usage", {}),
+                "prompt": single_prompt.text,
+                "prompt_tokens": prompt_token_counts(single_prompt, single_response_data.get("usage")),
+                "raw_response": single_raw,
+                "parsed_data": single_data
+            })
+
+            step1_valid = single_valid and isinstance(single_data.get("fields"), list)
+            if step1_valid:
+                step1_data, step2_data, step3_data, step4_data = single_pass_to_steps(single_data)
+            else:
+                logger.warning("Single-pass generation failed, using fallback schema")
+                step1_data = fallback_detection()
+                step2_data = fallback_refined_schema(step1_data)
+                step3_data = step4_data = None
+            step3_valid = step4_valid = step1_valid
+        else:
+            # Step 1: Initial Detection
+            step1_prompt = create_initial_detection_prompt()
+            step1_start = time.time()
+
+            step1_response_data = await make_ai_request_with_retry(
+                step1_prompt.text, image_base64, model_param, max_retries=settings.ai.max_retries
+            )
+            step1_end = time.time()
+
+            step1_raw = step1_response_data["content"]
+            step1_valid, step1_data, step1_formatted = extract_json_from_text(step1_raw)
+
+            ai_debug_info["steps"].append({
+                "step": 1,
+                "name": "Initial Detection",
+                "duration": step1_end - step1_start,
+                "success": step1_valid,
+                "tokens_used": step1_response_data.get("usage", {}),
+                "prompt": step1_prompt.text,
+                "prompt_tokens": prompt_token_counts(step1_prompt, step1_response_data.get("usage")),
+                "raw_response": step1_raw,
+                "parsed_data": step1_data
+            })
+
+            if not step1_valid or not step1_data:
+                logger.warning("Step 1 failed, using fallback schema")
+                step1_data = fallback_detection()
+
+        # Look for existing schemas with the same field set before the remaining (expensive) steps
+        similar_schemas = []
+        if step1_valid and isinstance(step1_data.get("fields"), dict):
+            with stage("db"):
+                similar_schemas = db_service.find_similar_schemas(
+                    list(step1_data["fields"]), min_similarity=reuse_threshold if reuse_threshold is not None else 0.5
+                )
+
+        if reuse_threshold is not None and similar_schemas:
+            best_match = similar_schemas[0]
+            existing_schema = get_schema_by_id(best_match["schema_id"])
+            if existing_schema:
+                end_time = time.time()
+                logger.info(
+                    f"Reusing existing schema {best_match['schema_id']} "
+                    f"(similarity {best_match['similarity']:.2f}), skipping remaining generation steps"
+                )
+                return {
+                    "success": True,
+                    "generated_schema": {
+                        "schema_id": existing_schema["id"],
+                        "schema_data": existing_schema,
+                        "is_valid": True,
+                        "ready_for_extraction": True,
+                        "raw_response": "Reused existing schema after initial detection",
+                        "formatted_text": json.dumps(existing_schema, indent=2) if settings.debug else None
                     },
-                    "field_2": {
-                        "type": "text",
-                        "location": "Unable to determine location",
-                        "content_preview": "Unable to preview content"
-                    }
-                }
-            }
-
-        # Step 2: Schema Review & Refinement
-        step2_prompt = create_review_prompt(step1_data)
-        step2_start = time.time()
-
-        step2_response_data = await make_ai_request_with_retry(
-            step2_prompt, image_base64, model_param, max_retries=settings.ai.max_retries
-        )
-        step2_end = time.time()
-
-        step2_raw = step2_response_data["content"]
-        step2_valid, step2_data, step2_formatted = extract_json_from_text(step2_raw)
-
-        ai_debug_info["steps"].append({
-            "step": 2,
-            "name": "Schema Review & Refinement",
-            "duration": step2_end - step2_start,
-            "success": step2_valid,
-            "tokens_used": step2_response_data.get("usage", {}),
-            "prompt": step2_prompt,
-            "raw_response": step2_raw,
-            "parsed_data": step2_data
-        })
-
-        if not step2_valid or not step2_data:
-            logger.warning(f"[{request_id}] Step 2 failed, using Step 1 results with fallbacks")
-            step2_data = {
-                "id": f"generated_schema_{int(time.time())}",
-                "name": f"{step1_data.get('document_type', 'Unknown')} Schema",
-                "description": f"Auto-generated schema for {step1_data.get('document_type', 'unknown document type')}",
-                "category": "Generated",
-                "fields": {}
-            }
-
-            # Convert Step 1 fields to Step 2 format with fallbacks
-            for field_name, field_info in step1_data.get("fields", {}).items():
-                step2_data["fields"][field_name] = {
-                    "type": field_info.get("type", "text"),
-                    "required": False,  # Conservative fallback
-                    "description": f"Field extracted from {field_info.get('location', 'document')}"
+                    "next_steps": {
+                        "available_in_schemas": True,
+                        "can_use_for_extraction": True,
+                        "schema_endpoint": f"/api/schemas/{existing_schema['id']}"
+                    },
+                    "metadata": {
+                        "processing_time": end_time - start_time,
+                        "file_type": metadata["file_type"],
+                        "file_size": metadata["file_size"],
+                        "model_used": f"{provider_id} - {model_id}",
+                        "fields_generated": len(existing_schema.get("fields", {})),
+                        "generation_mode": mode,
+                        "steps_completed": len(ai_debug_info["steps"]),
+                        "prompt_tokens": total_prompt_tokens(ai_debug_info["steps"]),
+                        "overall_confidence": existing_schema.get("overall_confidence") or 75,
+                        "document_quality": existing_schema.get("document_quality") or "medium",
+                        "reused_existing_schema": True,
+                        "similar_schemas": similar_schemas,
+                        "timings": get_stage_timer(request).as_dict(),
+                        "request_id": request_id
+                    },
+                    "ai_debug": ai_debug_info if settings.debug else None
                 }
 
-        # Step 3: Confidence Analysis
-        step3_prompt = create_confidence_analysis_prompt(step2_data)
-        step3_start = time.time()
-
-        step3_response_data = await make_ai_request_with_retry(
-            step3_prompt, image_base64, model_param, max_retries=settings.ai.max_retries
-        )
-        step3_end = time.time()
-
-        step3_raw = step3_response_data["content"]
-        step3_valid, step3_data, step3_formatted = extract_json_from_text(step3_raw)
-
-        ai_debug_info["steps"].append({
-            "step": 3,
-            "name": "Confidence Analysis",
-            "duration": step3_end - step3_start,
-            "success": step3_valid,
-            "tokens_used": step3_response_data.get("usage", {}),
-            "prompt": step3_prompt,
-            "raw_response": step3_raw,
-            "parsed_data": step3_data
-        })
-
-        # Step 4: Hints Generation
-        step4_prompt = create_hints_generation_prompt(step2_data, step3_data or {})
-        step4_start = time.time()
-
-        step4_response_data = await make_ai_request_with_retry(
-            step4_prompt, image_base64, model_param, max_retries=settings.ai.max_retries
-        )
-        step4_end = time.time()
-
-        step4_raw = step4_response_data["content"]
-        step4_valid, step4_data, step4_formatted = extract_json_from_text(step4_raw)
-
-        ai_debug_info["steps"].append({
-            "step": 4,
-            "name": "Extraction Hints Generation",
-            "duration": step4_end - step4_start,
-            "success": step4_valid,
-            "tokens_used": step4_response_data.get("usage", {}),
-            "prompt": step4_prompt,
-            "raw_response": step4_raw,
-            "parsed_data": step4_data
-        })
+        if mode == "thorough":
+            # Step 2: Schema Review & Refinement
+            step2_prompt = create_review_prompt(step1_data)
+            step2_start = time.time()
+
+            step2_response_data = await make_ai_request_with_retry(
+                step2_prompt.text, image_base64, model_param, max_retries=settings.ai.max_retries
+            )
+            step2_end = time.time()
+
+            step2_raw = step2_response_data["content"]
+            step2_valid, step2_data, step2_formatted = extract_json_from_text(step2_raw)
+
+            ai_debug_info["steps"].append({
+                "step": 2,
+                "name": "Schema Review & Refinement",
+                "duration": step2_end - step2_start,
+                "success": step2_valid,
+                "tokens_used": step2_response_data.get("usage", {}),
+                "prompt": step2_prompt.text,
+                "prompt_tokens": prompt_token_counts(step2_prompt, step2_response_data.get("usage")),
+                "raw_response": step2_raw,
+                "parsed_data": step2_data
+            })
+
+            if not step2_valid or not step2_data:
+                logger.warning("Step 2 failed, using Step 1 results with fallbacks")
+                step2_data = fallback_refined_schema(step1_data)
+
+            # Step 3: Confidence Analysis
+            step3_prompt = create_confidence_analysis_prompt(step2_data)
+            step3_start = time.time()
+
+            step3_response_data = await make_ai_request_with_retry(
+                step3_prompt.text, image_base64, model_param, max_retries=settings.ai.max_retries
+            )
+            step3_end = time.time()
+
+            step3_raw = step3_response_data["content"]
+            step3_valid, step3_data, step3_formatted = extract_json_from_text(step3_raw)
+
+            ai_debug_info["steps"].append({
+                "step": 3,
+                "name": "Confidence Analysis",
+                "duration": step3_end - step3_start,
+                "success": step3_valid,
+                "tokens_used": step3_response_data.get("usage", {}),
+                "prompt": step3_prompt.text,
+                "prompt_tokens": prompt_token_counts(step3_prompt, step3_response_data.get("usage")),
+                "raw_response": step3_raw,
+                "parsed_data": step3_data
+            })
+
+            # Step 4: Hints Generation
+            step4_prompt = create_hints_generation_prompt(step2_data, step3_data or {})
+            step4_start = time.time()
+
+            step4_response_data = await make_ai_request_with_retry(
+                step4_prompt.text, image_base64, model_param, max_retries=settings.ai.max_retries
+            )
+            step4_end = time.time()
+
+            step4_raw = step4_response_data["content"]
+            step4_valid, step4_data, step4_formatted = extract_json_from_text(step4_raw)
+
+            ai_debug_info["steps"].append({
+                "step": 4,
+                "name": "Extraction Hints Generation",
+                "duration": step4_end - step4_start,
+                "success": step4_valid,
+                "tokens_used": step4_response_data.get("usage", {}),
+                "prompt": step4_prompt.text,
+                "prompt_tokens": prompt_token_counts(step4_prompt, step4_response_data.get("usage")),
+                "raw_response": step4_raw,
+                "parsed_data": step4_data
+            })
 
         end_time = time.time()
+        ai_time = sum(step["duration"] for step in ai_debug_info["steps"])
+        provider_prompt_tokens = total_prompt_tokens(ai_debug_info["steps"])["provider"]
+        savings = estimate_single_pass_savings(
+            model_param, single_prompt, provider_prompt_tokens, ai_time, step1_data, step2_data, step3_data
+        ) if mode == "fast" else None
+        generation_ai_time[(model_param, mode)].add(ai_time)
+        if provider_prompt_tokens is not None:
+            generation_prompt_tokens[(model_param, mode)].add(provider_prompt_tokens)
 
         # Build final schema with enhanced data
         schema_id = step2_data.get("id", f"generated_schema_{int(time.time())}")
@@ -331,7 +455,7 @@ async def generate_schema(
         safe_schema_id = input_sanitizer.sanitize_string(schema_id, max_length=100)
         SCHEMAS[safe_schema_id] = enhanced_schema
 
-        logger.info(f"[{request_id}] Schema generation completed in {end_time - start_time:.2f}s")
+        logger.info(f"Schema generation completed in {end_time - start_time:.2f}s")
 
         return {
             "success": True,
@@ -354,9 +478,15 @@ async def generate_schema(
                 "file_size": metadata["file_size"],
                 "model_used": f"{provider_id} - {model_id}",
                 "fields_generated": len(enhanced_schema.get("fields", {})),
+                "generation_mode": mode,
                 "steps_completed": len(ai_debug_info["steps"]),
+                "prompt_tokens": total_prompt_tokens(ai_debug_info["steps"]),
+                "savings": savings,
                 "overall_confidence": enhanced_schema.get("overall_confidence", 75),
                 "document_quality": enhanced_schema.get("document_quality", "medium"),
+                "reused_existing_schema": False,
+                "similar_schemas": similar_schemas,
+                "timings": get_stage_timer(request).as_dict(),
                 "request_id": request_id
             },
             "ai_debug": ai_debug_info if settings.debug else None
@@ -365,13 +495,37 @@ async def generate_schema(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"[{request_id}] Schema generation error: {str(e)}", exc_info=True)
+        logger.error(f"Schema generation error: {str(e)}", exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to generate schema from document"
         )
 
 
+PROMPT_TOKEN_KEYS = ("provider", "static", "text")
+
+
+def prompt_token_counts(prompt: CompiledPrompt, usage: Optional[Dict[str, Any]]) -> Dict[str, Optional[int]]:
+    """
+    Token counts of a sent prompt: as reported by the provider (text and image), of its
+    static prefix (cached), and of the whole text, which is only tokenized in debug mode
+    """
+    return {
+        "provider": (usage or {}).get("prompt_tokens"),
+        "static": prompt.static_tokens,
+        "text": prompt.tokens if settings.debug else None
+    }
+
+
+def total_prompt_tokens(steps: List[Dict[str, Any]]) -> Dict[str, Optional[int]]:
+    """Prompt token counts summed over generation steps, None where a step has no count"""
+    totals = {}
+    for key in PROMPT_TOKEN_KEYS:
+        counts = [step["prompt_tokens"][key] for step in steps]
+        totals[key] = sum(counts) if None not in counts else None
+    return totals
+
+
 def validate_against_schema(data: Dict, schema: Dict) -> Dict:
     """Validate extracted data against schema"""
     validation_results = {"passed": True, "errors": [], "warnings": []}
@@ -404,198 +558,39 @@ def validate_against_schema(data: Dict, schema: Dict) -> Dict:
     return validation_results
 
 
-def create_extraction_prompt(schema_id: Optional[str] = None) -> str:
-    """Create extraction prompt based on schema, with enhanced support for AI-generated schemas and document verification"""
-    base_prompt = """DOCUMENT VERIFICATION & DATA EXTRACTION
+# Static prompt instructions. They are identical for every request so providers can
+# cache them as a prompt prefix; request-specific sections are appended after them.
+EXTRACTION_INSTRUCTIONS = """DOCUMENT VERIFICATION & DATA EXTRACTION
 
 PART 1: DOCUMENT VERIFICATION (KYC/Authentication)
-Analyze this document for authenticity and type verification:
+1. Document type: identify the document type and how confident you are that it matches the expected type, from its structure, layout, fonts and formatting
+2. Authenticity: look for tampering (photo replacement, text alterations), structural anomalies or inconsistencies, field positions that differ from the expected template, and inconsistent print quality or fonts
+3. Security: validate the Machine Readable Zone (MRZ) if present, check date logic (issue < expiry, age consistency), field format compliance and consistency between fields
 
-1. Document Type Identification:
-   - What type of document is this?
-   - How confident are you it matches the expected type?
-   - Check document structure, layout, fonts, and formatting
+PART 2: DATA EXTRACTION
+Extract the document's data with confidence scores, focusing on key-value pairs (labels and their values), tables and structured data, identifying information, dates, amounts and reference numbers.
 
-2. Authenticity Assessment:
-   - Look for signs of tampering (photo replacement, text alterations)
-   - Check for structural anomalies or inconsistencies
-   - Verify field positioning matches expected template
-   - Assess print quality and font consistency
+For missing or unreadable fields return value "" with confidence 0 and extraction_notes "field not found".
 
-3. Security Validation:
-   - Validate Machine Readable Zone (MRZ) if present
-   - Check date logic (issue < expiry, age consistency)
-   - Verify field format compliance
-   - Cross-check data consistency between fields
+Risk level (from authenticity_score):
+- low (80-100): document appears genuine, proceed with automated processing
+- medium (50-79): some concerns detected, recommend manual review
+- high (0-49): significant issues detected, manual verification required
 
-PART 2: DATA EXTRACTION
-Extract all text, data, and structure from the document with confidence scores.
-
-Return the data as structured JSON in this format:
-{
-  "document_verification": {
-    "document_type_confidence": 95,
-    "expected_document_type": "expected_type",
-    "detected_document_type": "detected_type",
-    "authenticity_score": 88,
-    "tampering_indicators": {
-      "photo_manipulation": false,
-      "text_alterations": false,
-      "structural_anomalies": false,
-      "digital_artifacts": false,
-      "font_inconsistencies": false
-    },
-    "security_checks": {
-      "mrz_checksum_valid": true,
-      "field_consistency": true,
-      "date_logic_valid": true,
-      "format_compliance": true
-    },
-    "verification_notes": ["specific observations about authenticity"],
-    "risk_level": "low|medium|high"
-  },
-  "extracted_fields": {
-    "field_name": {
-      "value": "extracted value",
-      "confidence": 85,
-      "extraction_notes": "any issues or uncertainties"
-    }
-  },
-  "overall_confidence": 75,
-  "document_quality": "high|medium|low",
-  "extraction_issues": ["list of any general issues"]
-}
-
-Risk Level Guidelines:
-- LOW (80-100% authenticity): Document appears genuine, proceed with automated processing
-- MEDIUM (50-79% authenticity): Some concerns detected, recommend manual review
-- HIGH (0-49% authenticity): Significant issues detected, manual verification required
-
-Confidence scoring guidelines:
-- 90-100: Very clear, unambiguous extraction
-- 70-89: Clear but minor uncertainties (e.g., slight blur, formatting variations)
-- 50-69: Readable but significant uncertainties (e.g., partial occlusion, handwriting)
-- 30-49: Difficult extraction, multiple interpretations possible
-- 0-29: Very uncertain, mostly guessing
-
-Focus on:
-- Document authenticity and tampering detection
-- Key-value pairs (labels and their corresponding values)
-- Tables and structured data
-- Important identifying information
-- Dates, amounts, and reference numbers"""
-
-    from routers.schemas import get_schema_by_id
-    schema = get_schema_by_id(schema_id) if schema_id else None
-    if schema:
-        schema_prompt = f"""
-
-This appears to be a {schema['name']} document. Extract the following specific fields:
-"""
+Confidence:
+- 90-100: very clear, unambiguous extraction
+- 70-89: clear but minor uncertainties (e.g. slight blur, formatting variations)
+- 50-69: readable but significant uncertainties (e.g. partial occlusion, handwriting)
+- 30-49: difficult extraction, multiple interpretations possible
+- 0-29: very uncertain, mostly guessing"""
 
-        # Enhanced field extraction with AI-generated schema features
-        for field_name, field_info in schema['fields'].items():
-            required_text = " (REQUIRED)" if field_info.get('required') else ""
-
-            # Core field description
-            description = field_info.get('description', f'Field: {field_name}')
-            field_type = field_info.get('type', 'text')
-            schema_prompt += f"- {field_name} ({field_type}): {description}{required_text}\n"
-
-            # Add extraction hints if available (from multi-step AI generation)
-            if field_info.get('extraction_hints'):
-                hints = field_info['extraction_hints']
-                if isinstance(hints, list) and hints:
-                    schema_prompt += f"  Hints: {'; '.join(hints[:2])}\n"  # Use first 2 hints
-
-            # Add positioning hints if available
-            if field_info.get('positioning_hints'):
-                schema_prompt += f"  Location: {field_info['positioning_hints']}\n"
-
-            # Add validation pattern hints
-            if field_info.get('validation_pattern'):
-                schema_prompt += f"  Expected format: matches pattern {field_info['validation_pattern']}\n"
-
-        # Add document-specific guidance if available
-        if schema.get('document_quality'):
-            quality = schema['document_quality']
-            if quality == 'low':
-                schema_prompt += "\nNote: This document may have quality issues. Be extra careful with OCR interpretation.\n"
-            elif quality == 'high':
-                schema_prompt += "\nNote: This is a high-quality document with clear text.\n"
-
-        # Add extraction difficulty guidance
-        if schema.get('extraction_difficulty'):
-            difficulty = schema['extraction_difficulty']
-            if difficulty == 'hard':
-                schema_prompt += "This document has complex layout. Pay attention to field positioning.\n"
-            elif difficulty == 'easy':
-                schema_prompt += "This document has a straightforward layout.\n"
-
-        # Final instructions with confidence scoring and verification
-        schema_prompt += f"""
-
-CRITICAL: Return a JSON object with this structure:
-{{
-  "document_verification": {{
-    "document_type_confidence": 0-100,
-    "expected_document_type": "{schema['name'].lower().replace(' ', '_')}",
-    "detected_document_type": "detected_type",
-    "authenticity_score": 0-100,
-    "tampering_indicators": {{
-      "photo_manipulation": true/false,
-      "text_alterations": true/false,
-      "structural_anomalies": true/false,
-      "digital_artifacts": true/false,
-      "font_inconsistencies": true/false
-    }},
-    "security_checks": {{
-      "mrz_checksum_valid": true/false,
-      "field_consistency": true/false,
-      "date_logic_valid": true/false,
-      "format_compliance": true/false
-    }},
-    "verification_notes": ["specific observations"],
-    "risk_level": "low|medium|high"
-  }},
-  "extracted_fields": {{
-    {', '.join([f'"{field}": {{"value": "extracted value", "confidence": 0-100, "extraction_notes": "optional notes"}}' for field in list(schema['fields'].keys())[:1]])}
-    // ... continue for all fields: {list(schema['fields'].keys())}
-  }},
-  "overall_confidence": 0-100,
-  "document_quality": "high|medium|low",
-  "extraction_issues": []
-}}
-
-Document Verification Requirements:
-- Verify this document matches expected type: {schema['name']}
-- Check authenticity indicators carefully
-- Validate all security features
-- Assess tampering risk
-
-Each field MUST include:
-- value: The extracted value (string/number)
-- confidence: Score 0-100 based on extraction certainty
-- extraction_notes: Any issues or uncertainties (optional)
-
-For missing/unreadable fields: {{"value": "", "confidence": 0, "extraction_notes": "field not found"}}"""
-
-        return base_prompt + schema_prompt
-
-    return base_prompt + """\n
-Return a JSON object with document_verification (including document type detection and authenticity assessment) and extracted_fields containing each detected field with value, confidence, and extraction_notes.
-Include overall_confidence, document_quality, and extraction_issues.
-
-For document_verification:
-- detected_document_type: Identify what type of document this appears to be
-- document_type_confidence: How confident you are in the document type identification (0-100)
-- authenticity_score: Overall assessment of document authenticity (0-100)
-- risk_level: "low", "medium", or "high" based on authenticity concerns"""
-
-
-def create_initial_detection_prompt() -> str:
-    """Step 1: Initial Schema Detection"""
-    return """STEP 1: INITIAL DOCUMENT ANALYSIS
+# Appended when the provider is not given the response JSON Schema
+EXTRACTION_OUTPUT_FORMAT = """Return ONLY a JSON object with this structure:
+{"document_verification":{"document_type_confidence":0-100,"expected_document_type":"expected_type","detected_document_type":"detected_type","authenticity_score":0-100,"tampering_indicators":{"photo_manipulation":true/false,"text_alterations":true/false,"structural_anomalies":true/false,"digital_artifacts":true/false,"font_inconsistencies":true/false},"security_checks":{"mrz_checksum_valid":true/false,"field_consistency":true/false,"date_logic_valid":true/false,"format_compliance":true/false},"verification_notes":["specific observations about authenticity"],"risk_level":"low|medium|high"},"extracted_fields":{"field_name":{"value":"extracted value","confidence":0-100,"extraction_notes":"any issues or uncertainties"}},"overall_confidence":0-100,"document_quality":"high|medium|low","extraction_issues":["list of any general issues"]}
+
+Each field MUST include value (string/number) and confidence (0-100); extraction_notes is optional."""
+
+INITIAL_DETECTION_INSTRUCTIONS = """STEP 1: INITIAL DOCUMENT ANALYSIS
 Analyze this document image and perform initial field detection.
 
 Tasks:
@@ -605,28 +600,12 @@ Tasks:
 4. Create initial schema structure
 
 Return ONLY a JSON object with this structure:
-{
-  "document_type": "detected document type",
-  "layout_analysis": "brief description of document layout",
-  "fields": {
-    "field_name": {
-      "type": "text|number|date|email|phone|url|boolean",
-      "location": "brief description of where this field appears",
-      "content_preview": "sample of visible content if readable"
-    }
-  }
-}
+{"document_type":"detected document type","layout_analysis":"brief description of document layout","fields":{"field_name":{"type":"text|number|date|email|phone|url|boolean","location":"brief description of where this field appears","content_preview":"sample of visible content if readable"}}}
 
 Focus on completeness - capture EVERY visible field, even small ones."""
 
-
-def create_review_prompt(initial_schema: dict) -> str:
-    """Step 2: Schema Review & Refinement"""
-    return f"""STEP 2: SCHEMA REVIEW AND REFINEMENT
-Review the initial schema against the document image for accuracy and completeness.
-
-Initial Schema:
-{json.dumps(initial_schema, indent=2)}
+REVIEW_INSTRUCTIONS = """STEP 2: SCHEMA REVIEW AND REFINEMENT
+Review the initial schema given below against the document image for accuracy and completeness.
 
 Tasks:
 1. Verify all fields are correctly identified
@@ -636,66 +615,21 @@ Tasks:
 5. Add proper field descriptions
 
 Return ONLY a JSON object with this structure:
-{{
-  "id": "document_type_snake_case",
-  "name": "Human Readable Document Name",
-  "description": "Brief description of document purpose",
-  "category": "Government|Business|Personal|Healthcare|Education|Other",
-  "fields": {{
-    "field_name": {{
-      "type": "text|number|date|email|phone|url|boolean",
-      "required": true|false,
-      "description": "Clear description of what this field represents"
-    }}
-  }},
-  "changes_made": ["list of changes from initial schema"]
-}}"""
-
-
-def create_confidence_analysis_prompt(refined_schema: dict) -> str:
-    """Step 3: Field Confidence Analysis"""
-    return f"""STEP 3: FIELD CONFIDENCE ANALYSIS
-Analyze the extraction difficulty and confidence for each field in the schema.
+{"id":"document_type_snake_case","name":"Human Readable Document Name","description":"Brief description of document purpose","category":"Government|Business|Personal|Healthcare|Education|Other","fields":{"field_name":{"type":"text|number|date|email|phone|url|boolean","required":true|false,"description":"Clear description of what this field represents"}},"changes_made":["list of changes from initial schema"]}"""
 
-Refined Schema:
-{json.dumps(refined_schema, indent=2)}
+CONFIDENCE_INSTRUCTIONS = """STEP 3: FIELD CONFIDENCE ANALYSIS
+Analyze the extraction difficulty and confidence for each field of the schema given below.
 
 Tasks:
-1. Score each field's extraction confidence (0-100) based on:
-   - Text legibility and clarity
-   - Field boundaries and layout
-   - Potential OCR challenges
-   - Handwritten vs printed text
-   - Text size and quality
+1. Score each field's extraction confidence (0-100) based on text legibility and clarity, field boundaries and layout, potential OCR challenges, handwritten vs printed text, and text size and quality
 2. Assess overall document quality
 3. Identify potential extraction challenges
 
 Return ONLY a JSON object with this structure:
-{{
-  "overall_confidence": 85,
-  "document_quality": "high|medium|low",
-  "extraction_difficulty": "easy|medium|hard",
-  "field_confidence": {{
-    "field_name": {{
-      "confidence_score": 95,
-      "legibility": "high|medium|low",
-      "potential_issues": ["list of potential extraction challenges"],
-      "extraction_notes": "specific notes about this field"
-    }}
-  }}
-}}"""
-
-
-def create_hints_generation_prompt(schema_with_confidence: dict, confidence_analysis: dict) -> str:
-    """Step 4: Extraction Hints Generation"""
-    return f"""STEP 4: EXTRACTION HINTS GENERATION
-Generate specific extraction instructions and hints for each field.
-
-Schema:
-{json.dumps(schema_with_confidence, indent=2)}
+{"overall_confidence":85,"document_quality":"high|medium|low","extraction_difficulty":"easy|medium|hard","field_confidence":{"field_name":{"confidence_score":95,"legibility":"high|medium|low","potential_issues":["list of potential extraction challenges"],"extraction_notes":"specific notes about this field"}}}"""
 
-Confidence Analysis:
-{json.dumps(confidence_analysis, indent=2)}
+HINTS_INSTRUCTIONS = """STEP 4: EXTRACTION HINTS GENERATION
+Generate specific extraction instructions and hints for each field of the schema given below, using its confidence analysis.
 
 Tasks:
 1. Create extraction hints for each field based on document layout
@@ -705,16 +639,229 @@ Tasks:
 5. Add fallback strategies for difficult fields
 
 Return ONLY a JSON object with this structure:
-{{
-  "extraction_strategy": {{
-    "field_name": {{
-      "extraction_hints": ["List of specific hints for extracting this field"],
-      "validation_pattern": "regex pattern if applicable",
-      "common_formats": ["expected format examples"],
-      "fallback_strategy": "what to do if primary extraction fails",
-      "positioning_hints": "where to look for this field"
-    }}
-  }},
-  "document_specific_notes": ["general extraction notes for this document type"],
-  "quality_recommendations": ["suggestions for improving extraction accuracy"]
-}}"""
\ No newline at end of file
+{"extraction_strategy":{"field_name":{"extraction_hints":["List of specific hints for extracting this field"],"validation_pattern":"regex pattern if applicable","common_formats":["expected format examples"],"fallback_strategy":"what to do if primary extraction fails","positioning_hints":"where to look for this field"}},"document_specific_notes":["general extraction notes for this document type"],"quality_recommendations":["suggestions for improving extraction accuracy"]}"""
+
+
+def create_extraction_prompt(
+    schema_id: Optional[str] = None,
+    schema: Optional[Dict] = None,
+    structured_output: bool = False
+) -> CompiledPrompt:
+    """Create extraction prompt based on schema, with enhanced support for AI-generated schemas and document verification
+
+    With structured_output the response shape comes from the JSON Schema response format,
+    so the output template is left out of the prompt.
+    """
+    instructions = EXTRACTION_INSTRUCTIONS if structured_output else f"{EXTRACTION_INSTRUCTIONS}\n\n{EXTRACTION_OUTPUT_FORMAT}"
+    if schema is None and schema_id:
+        schema = get_schema_by_id(schema_id)
+    if not schema:
+        return compile_prompt(
+            instructions,
+            "No schema was given: identify the document type yourself (detected_document_type) "
+            "and return every field you find in extracted_fields."
+        )
+
+    expected_type = schema['name'].lower().replace(' ', '_')
+    schema_prompt = (
+        f"This appears to be a {schema['name']} document (expected_document_type \"{expected_type}\"). "
+        "Verify it matches this type, check authenticity indicators and security features, and assess tampering risk.\n"
+        "Return exactly these fields in extracted_fields:\n"
+    )
+
+    # Enhanced field extraction with AI-generated schema features
+    for field_name, field_info in schema['fields'].items():
+        required_text = " (REQUIRED)" if field_info.get('required') else ""
+
+        # Core field description
+        description = field_info.get('description', f'Field: {field_name}')
+        field_type = field_info.get('type', 'text')
+        schema_prompt += f"- {field_name} ({field_type}): {description}{required_text}\n"
+
+        # Add extraction hints if available (from multi-step AI generation)
+        if field_info.get('extraction_hints'):
+            hints = field_info['extraction_hints']
+            if isinstance(hints, list) and hints:
+                schema_prompt += f"  Hints: {'; '.join(hints[:2])}\n"  # Use first 2 hints
+
+        # Add positioning hints if available
+        if field_info.get('positioning_hints'):
+            schema_prompt += f"  Location: {field_info['positioning_hints']}\n"
+
+        # Add validation pattern hints
+        if field_info.get('validation_pattern'):
+            schema_prompt += f"  Expected format: matches pattern {field_info['validation_pattern']}\n"
+
+    # Add document-specific guidance if available
+    quality = schema.get('document_quality')
+    if quality == 'low':
+        schema_prompt += "Note: This document may have quality issues. Be extra careful with OCR interpretation.\n"
+    elif quality == 'high':
+        schema_prompt += "Note: This is a high-quality document with clear text.\n"
+
+    # Add extraction difficulty guidance
+    difficulty = schema.get('extraction_difficulty')
+    if difficulty == 'hard':
+        schema_prompt += "This document has complex layout. Pay attention to field positioning.\n"
+    elif difficulty == 'easy':
+        schema_prompt += "This document has a straightforward layout.\n"
+
+    return compile_prompt(instructions, schema_prompt)
+
+
+def create_initial_detection_prompt() -> CompiledPrompt:
+    """Step 1: Initial Schema Detection"""
+    return compile_prompt(INITIAL_DETECTION_INSTRUCTIONS)
+
+
+def create_review_prompt(initial_schema: dict) -> CompiledPrompt:
+    """Step 2: Schema Review & Refinement"""
+    return compile_prompt(REVIEW_INSTRUCTIONS, f"Initial Schema:\n{compact_json(initial_schema)}")
+
+
+def create_confidence_analysis_prompt(refined_schema: dict) -> CompiledPrompt:
+    """Step 3: Field Confidence Analysis"""
+    return compile_prompt(CONFIDENCE_INSTRUCTIONS, f"Refined Schema:\n{compact_json(refined_schema)}")
+
+
+def create_hints_generation_prompt(schema_with_confidence: dict, confidence_analysis: dict) -> CompiledPrompt:
+    """Step 4: Extraction Hints Generation"""
+    return compile_prompt(
+        HINTS_INSTRUCTIONS,
+        f"Schema:\n{compact_json(schema_with_confidence)}",
+        f"Confidence Analysis:\n{compact_json(confidence_analysis)}"
+    )
+
+
+SINGLE_PASS_INSTRUCTIONS = """SINGLE-PASS SCHEMA GENERATION
+Analyze this document image and produce a complete extraction schema in one pass.
+
+Tasks:
+1. Identify the document type (National ID, Passport, Residence Permit, Business License, etc.)
+2. Capture EVERY visible field, number, date and data element, even small ones, with its type (text, number, date, email, phone, url, boolean), required/optional status and a clear description
+3. Score each field's extraction confidence (0-100) from legibility, field boundaries and layout, OCR challenges, handwritten vs printed text, and text size, and list potential extraction issues
+4. Give extraction hints, a validation pattern where applicable (empty otherwise) and where to find each field
+5. Assess overall document quality and extraction difficulty, with notes and recommendations for extraction accuracy
+
+Return ONLY a JSON object with this structure:
+{"document_type":"detected document type","id":"document_type_snake_case","name":"Human Readable Document Name","description":"Brief description of document purpose","category":"Government|Business|Personal|Healthcare|Education|Other","overall_confidence":85,"document_quality":"high|medium|low","extraction_difficulty":"easy|medium|hard","fields":[{"name":"field_name","type":"text|number|date|email|phone|url|boolean","required":true|false,"description":"Clear description of what this field represents","confidence_score":95,"legibility":"high|medium|low","potential_issues":["list of potential extraction challenges"],"extraction_hints":["List of specific hints for extracting this field"],"validation_pattern":"regex pattern if applicable","positioning_hints":"where to look for this field"}],"document_specific_notes":["general extraction notes for this document type"],"quality_recommendations":["suggestions for improving extraction accuracy"]}"""
+
+
+def create_single_pass_prompt() -> CompiledPrompt:
+    """Steps 1-4 combined into one call (mode=fast)"""
+    return compile_prompt(SINGLE_PASS_INSTRUCTIONS)
+
+
+def single_pass_to_steps(data: Dict[str, Any]) -> Tuple[Dict, Dict, Dict, Dict]:
+    """Split a single-pass response into the outputs of steps 1-4"""
+    detection = {"document_type": data.get("document_type") or data.get("name", "Unknown Document"), "fields": {}}
+    refined = {key: data[key] for key in ("id", "name", "description", "category") if key in data}
+    refined["fields"] = {}
+    confidence = {
+        key: data[key] for key in ("overall_confidence", "document_quality", "extraction_difficulty") if key in data
+    }
+    confidence["field_confidence"] = {}
+    hints = {key: data.get(key, []) for key in ("document_specific_notes", "quality_recommendations")}
+    hints["extraction_strategy"] = {}
+
+    for field in data.get("fields", []):
+        if not isinstance(field, dict) or not field.get("name"):
+            continue
+        name = field["name"]
+        detection["fields"][name] = {"type": field.get("type", "text"), "location": field.get("positioning_hints", "")}
+        refined["fields"][name] = {
+            key: field[key] for key in ("type", "required", "description") if key in field
+        }
+        confidence["field_confidence"][name] = {
+            key: field[key] for key in ("confidence_score", "legibility", "potential_issues") if key in field
+        }
+        hints["extraction_strategy"][name] = {
+            key: field[key] for key in ("extraction_hints", "validation_pattern", "positioning_hints") if key in field
+        }
+    return detection, refined, confidence, hints
+
+
+def fallback_detection() -> Dict[str, Any]:
+    """Step 1 result used when detection fails"""
+    return {
+        "document_type": "Unknown Document",
+        "layout_analysis": "Unable to analyze document layout due to AI processing error",
+        "fields": {
+            "field_1": {
+                "type": "text",
+                "location": "Unable to determine location",
+                "content_preview": "Unable to preview content"
+            },
+            "field_2": {
+                "type": "text",
+                "location": "Unable to determine location",
+                "content_preview": "Unable to preview content"
+            }
+        }
+    }
+
+
+def fallback_refined_schema(step1_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Step 2 result built from the Step 1 fields when review fails"""
+    refined = {
+        "id": f"generated_schema_{int(time.time())}",
+        "name": f"{step1_data.get('document_type', 'Unknown')} Schema",
+        "description": f"Auto-generated schema for {step1_data.get('document_type', 'unknown document type')}",
+        "category": "Generated",
+        "fields": {}
+    }
+
+    # Convert Step 1 fields to Step 2 format with fallbacks
+    for field_name, field_info in step1_data.get("fields", {}).items():
+        refined["fields"][field_name] = {
+            "type": field_info.get("type", "text"),
+            "required": False,  # Conservative fallback
+            "description": f"Field extracted from {field_info.get('location', 'document')}"
+        }
+    return refined
+
+
+def estimate_single_pass_savings(
+    model_param: str,
+    single_prompt: CompiledPrompt,
+    prompt_tokens: Optional[int],
+    ai_time: float,
+    step1_data: Dict,
+    step2_data: Dict,
+    step3_data: Optional[Dict]
+) -> Dict[str, Any]:
+    """
+    Input tokens and AI time of a fast generation against recent thorough generations
+    with the same model. In debug mode the thorough input tokens are also estimated for
+    this document, by building and tokenizing the four step prompts.
+    """
+    thorough_time = generation_ai_time.get((model_param, "thorough"))
+    thorough_seconds = thorough_time.value if thorough_time is not None else None
+    thorough_tokens_ewma = generation_prompt_tokens.get((model_param, "thorough"))
+    thorough_tokens = round(thorough_tokens_ewma.value) if thorough_tokens_ewma is not None else None
+
+    local_estimate = None
+    if settings.debug:
+        step_prompts = [
+            create_initial_detection_prompt(),
+            create_review_prompt(step1_data),
+            create_confidence_analysis_prompt(step2_data),
+            create_hints_generation_prompt(step2_data, step3_data or {})
+        ]
+        # Provider-reported prompt tokens include the image, which each of the four calls sends again
+        image_tokens = max(0, (prompt_tokens or single_prompt.tokens) - single_prompt.tokens)
+        local_estimate = sum(prompt.tokens for prompt in step_prompts) + len(step_prompts) * image_tokens
+        if thorough_tokens is None:
+            thorough_tokens = local_estimate
+
+    return {
+        "prompt_tokens": prompt_tokens,
+        "thorough_prompt_tokens_estimate": thorough_tokens,
+        "thorough_prompt_tokens_local_estimate": local_estimate,
+        "prompt_tokens_saved": (
+            thorough_tokens - prompt_tokens if thorough_tokens is not None and prompt_tokens is not None else None
+        ),
+        "ai_seconds": round(ai_time, 3),
+        "thorough_ai_seconds_estimate": round(thorough_seconds, 3) if thorough_seconds is not None else None,
+        "ai_seconds_saved": round(thorough_seconds - ai_time, 3) if thorough_seconds is not None else None
+    }
@@ -0,0 +1,64 @@
+"""
+Stored extraction results endpoints
+"""
+
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from validators import InputSanitizer
+from services.extraction_store import extraction_store
+
+router = APIRouter()
+
+# Initialize sanitizer
+input_sanitizer = InputSanitizer()
+
+
+@router.get("/api/extractions")
+async def list_extractions(
+    schema_id: Optional[str] = Query(None, max_length=100),
+    schema_version: Optional[int] = Query(None, ge=1),
+    risk_level: Optional[str] = Query(None, pattern="^(low|medium|high)$"),
+    document_type: Optional[str] = Query(None, max_length=100),
+    file_hash: Optional[str] = Query(None, pattern="^[0-9a-f]{64}$"),
+    model: Optional[str] = Query(None, max_length=200),
+    min_confidence: Optional[float] = Query(None, ge=0, le=100),
+    max_confidence: Optional[float] = Query(None, ge=0, le=100),
+    cursor: Optional[int] = Query(None, ge=1, description="next_cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=500)
+):
+    """List stored extraction results, newest first, with filtering and keyset pagination"""
+    extractions, next_cursor = extraction_store.query(
+        schema_id=input_sanitizer.sanitize_string(schema_id, max_length=100) if schema_id else None,
+        schema_version=schema_version,
+        risk_level=risk_level,
+        document_type=input_sanitizer.sanitize_string(document_type, max_length=100) if document_type else None,
+        file_hash=file_hash,
+        model=input_sanitizer.sanitize_string(model, max_length=200) if model else None,
+        min_confidence=min_confidence,
+        max_confidence=max_confidence,
+        cursor=cursor,
+        limit=limit
+    )
+
+    return {
+        "success": True,
+        "extractions": extractions,
+        "next_cursor": next_cursor
+    }
+
+
+@router.get("/api/extractions/{extraction_id}")
+async def get_extraction(extraction_id: str):
+    """Get a stored extraction result"""
+    safe_extraction_id = input_sanitizer.sanitize_string(extraction_id, max_length=100)
+
+    extraction = extraction_store.get(safe_extraction_id)
+    if not extraction:
+        raise HTTPException(status_code=404, detail="Extraction not found")
+
+    return {
+        "success": True,
+        "extraction": extraction
+    }
@@ -6,7 +6,16 @@ from datetime import datetime
 from fastapi import APIRouter
 
 from config import settings
-from services.ai_service import get_active_ai_requests
+from services.ai_service import get_active_ai_requests, get_ai_queue_stats
+from services.provider_health import provider_health
+from services.llm_cassette import llm_cassette
+from services.structured_output import get_structured_output_stats
+from services.runtime_monitor import loop_lag_monitor, get_executor_stats, get_process_stats
+from services.schema_cache import schema_cache
+from services.response_cache import response_cache
+from services.database import db_service
+from services.extraction_store import extraction_store
+from services.structured_logging import get_logging_stats
 
 router = APIRouter()
 
@@ -34,3 +43,30 @@ async def health_check():
     return health_status
 
 
+@router.get("/api/status")
+async def runtime_status():
+    """
+    Live runtime internals of this worker process: event loop lag, thread pools,
+    AI admission queue, provider latency and circuit state, caches, database and memory
+    """
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "version": settings.app_version,
+        "environment": settings.environment,
+        "event_loop": loop_lag_monitor.get_stats(),
+        "executors": get_executor_stats(),
+        "ai_queue": get_ai_queue_stats(),
+        "providers": provider_health.get_stats(),
+        "llm_cassette": llm_cassette.get_stats(),
+        "structured_output": get_structured_output_stats(),
+        "caches": {
+            "schemas": schema_cache.get_stats(),
+            "responses": response_cache.get_stats()
+        },
+        "database": {
+            **db_service.get_connection_stats(),
+            "extraction_store": extraction_store.get_stats()
+        },
+        "logging": get_logging_stats(),
+        "process": get_process_stats()
+    }
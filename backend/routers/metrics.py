@@ -0,0 +1,17 @@
+"""
+Prometheus metrics endpoint
+"""
+
+from fastapi import APIRouter, Response
+from fastapi.concurrency import run_in_threadpool
+
+from services.metrics import render_metrics
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Expose metrics in the Prometheus text format (aggregated across workers in multiprocess mode)"""
+    body, content_type = await run_in_threadpool(render_metrics)
+    return Response(content=body, media_type=content_type)
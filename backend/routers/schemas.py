@@ -4,57 +4,286 @@ Document schemas endpoints
 
 import json
 import time
+import uuid
+import asyncio
 import logging
 from typing import Optional, Dict, Any
 from datetime import datetime
 
-from fastapi import APIRouter, HTTPException, Request, Form, Response
+from fastapi import APIRouter, HTTPException, Request, Form, Response, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
 from validators import InputSanitizer
 from services.database import db_service
+from services.schema_cache import schema_cache
+from services.response_cache import compute_etag, if_none_match_matches
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Bulk import limits
+MAX_IMPORT_LINE_BYTES = 5 * 1024 * 1024
+MAX_IMPORT_ERRORS_REPORTED = 1000
+
+# Field-set similarity at which a saved schema is reported as a likely duplicate
+DUPLICATE_SIMILARITY_THRESHOLD = 0.8
+
 # Initialize sanitizer
 input_sanitizer = InputSanitizer()
 
 
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check the If-None-Match request header against an ETag"""
+    return if_none_match_matches(request.headers.get("if-none-match"), etag)
+
+
+def conditional_json_response(request: Request, content: Dict[str, Any]) -> Response:
+    """
+    Build a JSON response with a strong ETag, or a 304 if the client copy is current
+    Clients must revalidate on every use, which costs a 304 instead of a full body
+    """
+    response = JSONResponse(content=content)
+    etag = compute_etag(response.body)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return response
+
+
 @router.get("/api/schemas")
-async def get_available_schemas(response: Response):
+async def get_available_schemas(request: Request):
     """Get list of available document schemas"""
-    # Prevent caching to ensure fresh data
-    response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-    response.headers["Pragma"] = "no-cache"
-    response.headers["Expires"] = "0"
+    schemas = schema_cache.get_all_schemas()
+    logger.debug(f"Retrieved {len(schemas)} schemas")
 
-    schemas = db_service.get_all_schemas()
+    return conditional_json_response(request, {
+        "success": True,
+        "schemas": schemas
+    })
 
-    # Debug logging
-    logger.info(f"Retrieved {len(schemas)} schemas from database")
-    for schema_id, schema_data in schemas.items():
-        logger.info(f"Schema: {schema_id} - {schema_data.get('name', 'Unknown')}")
+
+@router.get("/api/schemas/fields")
+async def find_schemas_by_field(
+    name: str = Query(..., min_length=1, max_length=100),
+    type: Optional[str] = Query(None, max_length=50),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """Find schemas that define a given field"""
+    safe_name = input_sanitizer.sanitize_string(name, max_length=100)
+    safe_type = input_sanitizer.sanitize_string(type, max_length=50) if type else None
+
+    matches = db_service.find_schemas_by_field(safe_name, field_type=safe_type, limit=limit)
 
     return {
         "success": True,
-        "schemas": schemas
+        "field_name": safe_name,
+        "matches": matches
+    }
+
+
+@router.get("/api/schemas/similar")
+async def find_similar_schemas(
+    fields: str = Query(..., min_length=1, description="Comma-separated field names"),
+    min_similarity: float = Query(0.5, ge=0.0, le=1.0),
+    limit: int = Query(5, ge=1, le=50)
+):
+    """Find existing schemas whose field sets overlap the given fields (Jaccard similarity)"""
+    field_names = [
+        input_sanitizer.sanitize_string(field, max_length=100)
+        for field in fields.split(",")
+    ]
+
+    similar = db_service.find_similar_schemas(field_names, min_similarity=min_similarity, limit=limit)
+
+    return {
+        "success": True,
+        "similar_schemas": similar
+    }
+
+
+@router.get("/api/schemas/export")
+async def export_schemas(category: Optional[str] = Query(None)):
+    """Stream all schemas as NDJSON (one schema per line)"""
+    safe_category = input_sanitizer.sanitize_string(category, max_length=50) if category else None
+
+    return StreamingResponse(
+        db_service.iter_schema_export_lines(category=safe_category),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="schemas.ndjson"'}
+    )
+
+
+def _parse_import_line(line_number: int, line: bytes) -> tuple[Optional[tuple], Optional[Dict[str, Any]]]:
+    """
+    Parse and sanitize one NDJSON import line
+    Returns: (record, error) - exactly one of them is set
+    """
+    try:
+        schema_dict = json.loads(line)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        return None, {"line": line_number, "error": f"Invalid JSON: {str(e)}"}
+
+    if not isinstance(schema_dict, dict):
+        return None, {"line": line_number, "error": "Each line must be a JSON object"}
+    if not isinstance(schema_dict.get("fields", {}), dict):
+        return None, {"line": line_number, "error": "'fields' must be a JSON object"}
+
+    schema_dict = input_sanitizer.sanitize_json_field(schema_dict)
+
+    schema_id = input_sanitizer.sanitize_string(str(schema_dict.get("id") or ""), max_length=100) or str(uuid.uuid4())
+
+    schema_dict["name"] = input_sanitizer.sanitize_string(schema_dict.get("name") or "Unknown Schema", max_length=100)
+    schema_dict["category"] = input_sanitizer.sanitize_string(schema_dict.get("category") or "Other", max_length=50)
+
+    return (line_number, schema_id, schema_dict), None
+
+
+def _import_schema_batch(lines: list[tuple[int, bytes]]) -> tuple[int, list]:
+    """Parse and write one batch of import lines (runs in the threadpool)"""
+    records = []
+    errors = []
+    for line_number, line in lines:
+        record, error = _parse_import_line(line_number, line)
+        if error:
+            errors.append(error)
+        else:
+            records.append(record)
+
+    imported = 0
+    if records:
+        imported, write_errors = db_service.import_schemas(records)
+        errors.extend(write_errors)
+
+    errors.sort(key=lambda error: error["line"])
+    return imported, errors
+
+
+@router.post("/api/schemas/import")
+async def import_schemas(
+    request: Request,
+    batch_size: int = Query(500, ge=1, le=5000)
+):
+    """Import schemas from a streamed NDJSON body, upserting them in batched transactions"""
+    start_time = time.time()
+
+    imported = 0
+    failed = 0
+    errors = []
+    batch = []
+    line_number = 0
+    pending = b""
+    in_flight: Optional[asyncio.Task] = None
+
+    async def collect_in_flight():
+        nonlocal imported, failed, in_flight
+        if in_flight is None:
+            return
+        batch_imported, batch_errors = await in_flight
+        in_flight = None
+        imported += batch_imported
+        failed += len(batch_errors)
+        errors.extend(batch_errors[:MAX_IMPORT_ERRORS_REPORTED - len(errors)])
+
+    async def flush_batch():
+        # Keep one batch in the threadpool while the next one is received
+        nonlocal in_flight
+        await collect_in_flight()
+        if batch:
+            in_flight = asyncio.ensure_future(run_in_threadpool(_import_schema_batch, list(batch)))
+            batch.clear()
+
+    try:
+        async for chunk in request.stream():
+            pending += chunk
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                line_number += 1
+                if line.strip():
+                    batch.append((line_number, line))
+                    # Per line, so a large chunk never builds a batch over batch_size
+                    if len(batch) >= batch_size:
+                        await flush_batch()
+
+            if len(pending) > MAX_IMPORT_LINE_BYTES:
+                await flush_batch()
+                await collect_in_flight()
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Line {line_number + 1} exceeds {MAX_IMPORT_LINE_BYTES} bytes ({imported} schemas already imported)"
+                )
+
+        if pending.strip():
+            batch.append((line_number + 1, pending))
+        await flush_batch()
+        await collect_in_flight()
+    finally:
+        # Never leave a batch writing after the request is gone
+        if in_flight is not None:
+            await asyncio.shield(in_flight)
+
+    logger.info(
+        f"Schema import finished: {imported} imported, {failed} failed "
+        f"in {time.time() - start_time:.2f}s"
+    )
+
+    return {
+        "success": failed == 0,
+        "imported": imported,
+        "failed": failed,
+        "errors": errors,
+        "errors_truncated": failed > len(errors),
+        "processing_time": time.time() - start_time
     }
 
 
 @router.get("/api/schemas/{schema_id}")
-async def get_schema_details(schema_id: str, response: Response):
+async def get_schema_details(schema_id: str, request: Request):
     """Get detailed schema information"""
-    # Prevent caching to ensure fresh data
-    response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-    response.headers["Pragma"] = "no-cache"
-    response.headers["Expires"] = "0"
-
     # Sanitize schema_id
     safe_schema_id = input_sanitizer.sanitize_string(schema_id, max_length=100)
 
-    schema = db_service.get_schema(safe_schema_id)
+    schema = schema_cache.get_schema(safe_schema_id)
     if not schema:
         raise HTTPException(status_code=404, detail="Schema not found")
 
+    return conditional_json_response(request, {
+        "success": True,
+        "schema": schema
+    })
+
+
+@router.get("/api/schemas/{schema_id}/versions")
+async def get_schema_versions(schema_id: str):
+    """List the version history of a schema"""
+    # Sanitize schema_id
+    safe_schema_id = input_sanitizer.sanitize_string(schema_id, max_length=100)
+
+    versions = db_service.get_schema_versions(safe_schema_id)
+    if not versions:
+        raise HTTPException(status_code=404, detail="Schema not found")
+
+    return {
+        "success": True,
+        "schema_id": safe_schema_id,
+        "versions": versions
+    }
+
+
+@router.get("/api/schemas/{schema_id}/versions/{version}")
+async def get_schema_version(schema_id: str, version: int, response: Response):
+    """Get a specific schema version (immutable, so it can be cached indefinitely)"""
+    # Sanitize schema_id
+    safe_schema_id = input_sanitizer.sanitize_string(schema_id, max_length=100)
+
+    schema = schema_cache.get_schema_version(safe_schema_id, version)
+    if not schema:
+        raise HTTPException(status_code=404, detail="Schema version not found")
+
+    response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+
     return {
         "success": True,
         "schema": schema
@@ -69,7 +298,6 @@ async def save_generated_schema(
     schema_category: str = Form(None)
 ):
     """Save a generated schema for future use"""
-    request_id = getattr(request.state, "request_id", "unknown")
 
     try:
         # Sanitize inputs
@@ -81,11 +309,10 @@ async def save_generated_schema(
             schema_dict = json.loads(schema_data)
             schema_dict = input_sanitizer.sanitize_json_field(schema_dict)
         except json.JSONDecodeError as e:
-            logger.warning(f"[{request_id}] Invalid JSON in schema data: {str(e)}")
+            logger.warning(f"Invalid JSON in schema data: {str(e)}")
             raise HTTPException(status_code=400, detail="Invalid JSON in schema data")
 
         # Generate schema ID
-        import uuid
         schema_id = str(uuid.uuid4())
 
         # Create schema metadata
@@ -99,41 +326,48 @@ async def save_generated_schema(
             "schema_data": schema_dict
         }
 
-        # Store schema in database
-        logger.info(f"[{request_id}] Attempting to save schema with ID: {schema_id}")
-        logger.info(f"[{request_id}] Schema data keys: {list(schema_with_metadata.keys())}")
+        # Report near-duplicates of the schema being saved
+        new_fields = schema_with_metadata["fields"]
+        similar_schemas = db_service.find_similar_schemas(
+            list(new_fields) if isinstance(new_fields, dict) else [],
+            min_similarity=DUPLICATE_SIMILARITY_THRESHOLD
+        )
+        if similar_schemas:
+            logger.info(f"Schema {schema_id} is similar to {len(similar_schemas)} existing schema(s)")
 
-        success = db_service.save_schema(schema_id, schema_with_metadata)
+        # Store schema in database
+        version = db_service.save_schema(schema_id, schema_with_metadata)
 
-        if not success:
-            logger.error(f"[{request_id}] Database save returned False for schema: {schema_id}")
+        if not version:
+            logger.error(f"Database save failed for schema: {schema_id}")
             raise HTTPException(status_code=500, detail="Failed to save schema to database")
 
-        logger.info(f"[{request_id}] Schema saved successfully with ID: {schema_id}")
+        logger.info(f"Schema saved successfully with ID: {schema_id}")
 
         # Verify the save by trying to retrieve it
         verification = db_service.get_schema(schema_id)
-        if verification:
-            logger.info(f"[{request_id}] Verification: Schema {schema_id} exists in database")
-        else:
-            logger.warning(f"[{request_id}] Verification failed: Schema {schema_id} not found after save")
+        if not verification:
+            logger.warning(f"Verification failed: Schema {schema_id} not found after save")
 
         return {
             "success": True,
             "schema_id": schema_id,
+            "version": version,
             "message": "Schema saved successfully",
             "schema": {
                 "id": schema_id,
                 "name": safe_schema_name,
                 "category": safe_schema_category,
-                "field_count": len(schema_dict.get("fields", {}))
-            }
+                "field_count": len(schema_dict.get("fields", {})),
+                "version": version
+            },
+            "similar_schemas": similar_schemas
         }
 
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"[{request_id}] Schema save error: {str(e)}", exc_info=True)
+        logger.error(f"Schema save error: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to save schema")
 
 
@@ -147,14 +381,13 @@ async def update_schema(
     schema_description: str = Form(None)
 ):
     """Update an existing schema"""
-    request_id = getattr(request.state, "request_id", "unknown")
 
     try:
         # Sanitize schema ID
         safe_schema_id = input_sanitizer.sanitize_string(schema_id, max_length=100)
 
         # Check if schema exists
-        existing_schema = db_service.get_schema(safe_schema_id)
+        existing_schema = schema_cache.get_schema(safe_schema_id)
         if not existing_schema:
             raise HTTPException(status_code=404, detail="Schema not found")
 
@@ -168,14 +401,9 @@ async def update_schema(
             schema_dict = json.loads(schema_data)
             schema_dict = input_sanitizer.sanitize_json_field(schema_dict)
         except json.JSONDecodeError as e:
-            logger.warning(f"[{request_id}] Invalid JSON in schema data: {str(e)}")
+            logger.warning(f"Invalid JSON in schema data: {str(e)}")
             raise HTTPException(status_code=400, detail="Invalid JSON in schema data")
 
-        # Debug: Log the incoming data
-        logger.info(f"[{request_id}] UPDATE - Incoming schema_data: {schema_data[:200]}...")
-        logger.info(f"[{request_id}] UPDATE - Parsed field count: {len(schema_dict.get('fields', {}))}")
-        logger.info(f"[{request_id}] UPDATE - Field names: {list(schema_dict.get('fields', {}).keys())}")
-
         # Update schema metadata
         updated_schema = {
             "id": safe_schema_id,
@@ -189,55 +417,54 @@ async def update_schema(
         }
 
         # Update schema in database
-        logger.info(f"[{request_id}] UPDATE - Saving to database with {len(updated_schema.get('fields', {}))} fields")
-        success = db_service.save_schema(safe_schema_id, updated_schema)
+        version = db_service.save_schema(safe_schema_id, updated_schema)
 
-        if not success:
-            logger.error(f"[{request_id}] UPDATE - Database save returned False")
+        if not version:
+            logger.error(f"Database save failed for schema: {safe_schema_id}")
             raise HTTPException(status_code=500, detail="Failed to update schema in database")
 
-        logger.info(f"[{request_id}] Schema updated with ID: {safe_schema_id}")
+        logger.info(f"Schema updated with ID: {safe_schema_id} (version {version}, {len(updated_schema['fields'])} fields)")
 
         # Verify the update by retrieving it
         verification = db_service.get_schema(safe_schema_id)
         if verification:
             verify_field_count = len(verification.get('fields', {}))
-            logger.info(f"[{request_id}] UPDATE - Verification: {verify_field_count} fields in database")
             if verify_field_count != len(schema_dict.get('fields', {})):
-                logger.warning(f"[{request_id}] UPDATE - Field count mismatch! Expected: {len(schema_dict.get('fields', {}))}, Found: {verify_field_count}")
+                logger.warning(f"Field count mismatch after update of {safe_schema_id}! Expected: {len(schema_dict.get('fields', {}))}, Found: {verify_field_count}")
         else:
-            logger.error(f"[{request_id}] UPDATE - Verification failed: Schema not found after update")
+            logger.error(f"Verification failed: Schema {safe_schema_id} not found after update")
 
         return {
             "success": True,
             "schema_id": safe_schema_id,
+            "version": version,
             "message": "Schema updated successfully",
             "schema": {
                 "id": safe_schema_id,
                 "name": safe_schema_name,
                 "category": safe_schema_category,
-                "field_count": len(schema_dict.get("fields", {}))
+                "field_count": len(schema_dict.get("fields", {})),
+                "version": version
             }
         }
 
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"[{request_id}] Schema update error: {str(e)}", exc_info=True)
+        logger.error(f"Schema update error: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to update schema")
 
 
 @router.delete("/api/schemas/{schema_id}")
 async def delete_schema(schema_id: str, request: Request):
     """Delete an existing schema"""
-    request_id = getattr(request.state, "request_id", "unknown")
 
     try:
         # Sanitize schema ID
         safe_schema_id = input_sanitizer.sanitize_string(schema_id, max_length=100)
 
         # Check if schema exists
-        existing_schema = db_service.get_schema(safe_schema_id)
+        existing_schema = schema_cache.get_schema(safe_schema_id)
         if not existing_schema:
             raise HTTPException(status_code=404, detail="Schema not found")
 
@@ -247,7 +474,7 @@ async def delete_schema(schema_id: str, request: Request):
         if not success:
             raise HTTPException(status_code=500, detail="Failed to delete schema from database")
 
-        logger.info(f"[{request_id}] Schema deleted with ID: {safe_schema_id}")
+        logger.info(f"Schema deleted with ID: {safe_schema_id}")
 
         return {
             "success": True,
@@ -258,18 +485,20 @@ async def delete_schema(schema_id: str, request: Request):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"[{request_id}] Schema delete error: {str(e)}", exc_info=True)
+        logger.error(f"Schema delete error: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to delete schema")
 
 
 def get_schemas_dict() -> Dict[str, Any]:
     """Get the schemas dictionary (for use by other modules)"""
-    return db_service.get_all_schemas()
+    return schema_cache.get_all_schemas()
 
 
-def get_schema_by_id(schema_id: str) -> Optional[Dict[str, Any]]:
-    """Get a specific schema by ID (for use by other modules)"""
-    return db_service.get_schema(schema_id)
+def get_schema_by_id(schema_id: str, version: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """Get a specific schema by ID, optionally pinned to a version (for use by other modules)"""
+    if version is not None:
+        return schema_cache.get_schema_version(schema_id, version)
+    return schema_cache.get_schema(schema_id)
 
 
 def load_default_schemas():
@@ -2,31 +2,55 @@
 AI service - handles model configuration, prompts, and API calls
 """
 
-import json
 import time
 import asyncio
 import logging
-from typing import Optional, Dict, Any, List
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, List, AsyncIterator, Callable
 
 from fastapi import HTTPException, status
 
 from config import settings
 from validators import InputSanitizer
+from services.metrics import (
+    Ewma,
+    stage,
+    record_stage,
+    record_token_usage,
+    AI_IN_FLIGHT,
+    AI_QUEUE_DEPTH,
+    AI_QUEUE_WAIT,
+    AI_PROVIDER_ERRORS,
+    AI_PAYLOAD_SIZE,
+    AI_RESPONSE_PARSE
+)
+from services.tracing import set_span_attributes
+from services.provider_health import provider_health
+from services.mock_provider import MOCK_PROVIDER, mock_completion, register_mock_models
+from services.llm_cassette import llm_cassette
+from services.structured_output import JSON_OBJECT_FORMAT, is_response_format_rejection, mark_unsupported
+from services.json_parser import ParseResult, parse_json_response, dumps_indented
 
 # Import LiteLLM for AI model calls
 try:
     import litellm
-    from litellm import completion
-    litellm.enable_json_schema_validation = True
+    from litellm import completion, JSONSchemaValidationError
+    # json_schema replies are checked by parse_ai_response, which also repairs truncated ones
+    litellm.enable_json_schema_validation = False
 except ImportError:
     raise ImportError("LiteLLM is required. Install with: pip install litellm")
 
 logger = logging.getLogger(__name__)
 input_sanitizer = InputSanitizer()
 
-# Request tracking for concurrent limits
+# Request tracking for concurrent limits: at most max_concurrent_requests provider
+# calls run at once per worker, the rest wait for a slot
 active_ai_requests = 0
-ai_request_lock = asyncio.Lock()
+queued_ai_requests = 0
+ai_request_semaphore = asyncio.Semaphore(settings.performance.max_concurrent_requests)
+ai_queue_wait = Ewma()
+ai_queue_wait_max = 0.0
+ai_queue_timeouts = 0
 
 # Provider and model configuration
 PROVIDER_OPTIONS = {
@@ -43,6 +67,10 @@ MODEL_OPTIONS = {
     }
 }
 
+# Offline mock models (ENABLE_MOCK_PROVIDER=true) for local runs and load testing
+register_mock_models(PROVIDER_OPTIONS, MODEL_OPTIONS)
+provider_health.track(PROVIDER_OPTIONS.values())
+
 
 def get_model_param(provider: str, model: str) -> str:
     """Get the model parameter for LiteLLM"""
@@ -50,6 +78,8 @@ def get_model_param(provider: str, model: str) -> str:
         return f"groq/{model}"
     elif provider == "mistral":
         return f"mistral/{model}"
+    elif provider == MOCK_PROVIDER:
+        return f"{MOCK_PROVIDER}/{model}"
     else:
         return model
 
@@ -61,6 +91,12 @@ def determine_ai_model(model: Optional[str]) -> tuple[str, str, str]:
     """
     if model and '_' in model:
         provider_id, model_id = model.split('_', 1)
+        # Only listed models: the provider and model end up in metric labels and health stats
+        if model_id not in MODEL_OPTIONS.get(provider_id, {}).values():
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Unsupported model, see /api/models for the available models"
+            )
     else:
         provider_id = settings.ai.default_provider
         model_id = settings.ai.default_model
@@ -69,52 +105,151 @@ def determine_ai_model(model: Optional[str]) -> tuple[str, str, str]:
     return provider_id, model_id, model_param
 
 
+@asynccontextmanager
+async def ai_request_slot() -> AsyncIterator[None]:
+    """
+    Wait for an AI admission slot and hold it for one provider call
+    Waits at most AI_QUEUE_TIMEOUT seconds, then rejects the request with a 429
+    """
+    global active_ai_requests, queued_ai_requests, ai_queue_wait_max, ai_queue_timeouts
+
+    queued_ai_requests += 1
+    AI_QUEUE_DEPTH.inc()
+    wait_start = time.perf_counter()
+    try:
+        timeout = settings.performance.ai_queue_timeout
+        if timeout <= 0 and ai_request_semaphore.locked():
+            raise asyncio.TimeoutError
+        await asyncio.wait_for(ai_request_semaphore.acquire(), timeout=timeout if timeout > 0 else None)
+    except asyncio.TimeoutError:
+        ai_queue_timeouts += 1
+        logger.warning(f"No AI request slot free within {settings.performance.ai_queue_timeout}s, rejecting request")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many active AI requests. Please try again later."
+        )
+    finally:
+        queued_ai_requests -= 1
+        AI_QUEUE_DEPTH.dec()
+    queue_wait = time.perf_counter() - wait_start
+    AI_QUEUE_WAIT.observe(queue_wait)
+    record_stage("ai_queue", queue_wait)
+    ai_queue_wait.add(queue_wait)
+    ai_queue_wait_max = max(ai_queue_wait_max, queue_wait)
+
+    active_ai_requests += 1
+    AI_IN_FLIGHT.inc()
+    logger.debug(f"Active AI requests: {active_ai_requests}")
+    try:
+        yield
+    finally:
+        active_ai_requests -= 1
+        AI_IN_FLIGHT.dec()
+        ai_request_semaphore.release()
+        logger.debug(f"Active AI requests: {active_ai_requests}")
+
+
+def classify_provider_error(error: Exception) -> str:
+    """Map a provider exception to a coarse error type for metrics"""
+    if isinstance(error, asyncio.TimeoutError):
+        return "timeout"
+    name = type(error).__name__
+    for marker, error_type in (
+        ("RateLimit", "rate_limit"),
+        ("Authentication", "auth"),
+        ("PermissionDenied", "auth"),
+        ("ContextWindow", "context_window"),
+        ("BadRequest", "bad_request"),
+        ("Timeout", "timeout"),
+        ("Connection", "connection"),
+        ("ServiceUnavailable", "unavailable"),
+        ("InternalServer", "server_error")
+    ):
+        if marker in name:
+            return error_type
+    return "other"
+
+
 async def make_ai_request_with_retry(
     prompt: str,
     image_base64: str,
     model_param: str,
-    max_retries: int = 3
+    max_retries: int = 3,
+    response_format: Optional[Dict[str, Any]] = None,
+    fallback_prompt: Optional[Callable[[], str]] = None
 ) -> Dict[str, Any]:
-    """Make AI request with retry logic and error handling"""
-    global active_ai_requests
+    """Make AI request with retry logic and error handling
+
+    response_format defaults to json_object. If the model rejects a json_schema format,
+    the remaining attempts use json_object and the prompt built by fallback_prompt instead.
+    """
+    response_format = response_format or JSON_OBJECT_FORMAT
+    provider = model_param.split("/", 1)[0]
+    # The mock provider goes through the same admission, timeout, retry and breaker path
+    completion_fn = mock_completion if provider == MOCK_PROVIDER and settings.ai.enable_mock_provider else completion
+    # Record provider calls to, or replay them from, the LLM cassette when enabled
+    completion_fn = llm_cassette.wrap(completion_fn)
+    AI_PAYLOAD_SIZE.observe(len(prompt) + len(image_base64))
 
     for attempt in range(max_retries):
+        # Fail fast while the provider's circuit is open instead of queueing doomed calls
+        if not provider_health.allow_request(provider):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"AI provider {provider} is temporarily unavailable"
+            )
+
         try:
-            async with ai_request_lock:
-                active_ai_requests += 1
-                logger.info(f"Active AI requests: {active_ai_requests}")
-
-            try:
-                # Add timeout to AI request
-                response = await asyncio.wait_for(
-                    asyncio.to_thread(
-                        completion,
-                        model=model_param,
-                        messages=[{
-                            "role": "user",
-                            "content": [
-                                {"type": "text", "text": prompt},
-                                {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{image_base64}"}}
-                            ]
-                        }],
-                        temperature=settings.ai.temperature,
-                        response_format={"type": "json_object"}
-                    ),
-                    timeout=settings.ai.request_timeout
-                )
+            async with ai_request_slot():
+                with stage("ai_call", "make_ai_request_with_retry.attempt", {
+                    "ai.model": model_param,
+                    "ai.provider": provider,
+                    "ai.attempt": attempt + 1,
+                    "ai.retry_count": attempt
+                }) as current:
+                    call_start = time.perf_counter()
+                    # Add timeout to AI request
+                    response = await asyncio.wait_for(
+                        asyncio.to_thread(
+                            completion_fn,
+                            model=model_param,
+                            messages=[{
+                                "role": "user",
+                                "content": [
+                                    {"type": "text", "text": prompt},
+                                    {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{image_base64}"}}
+                                ]
+                            }],
+                            temperature=settings.ai.temperature,
+                            response_format=response_format
+                        ),
+                        timeout=settings.ai.request_timeout
+                    )
 
-                return {
-                    "content": response.choices[0].message.content,
-                    "usage": getattr(response, 'usage', {}).dict() if hasattr(response, 'usage') and response.usage else {},
-                    "model": getattr(response, 'model', model_param)
-                }
+                    usage = getattr(response, 'usage', {}).dict() if hasattr(response, 'usage') and response.usage else {}
+                    set_span_attributes(current, {
+                        "ai.tokens.prompt": usage.get("prompt_tokens"),
+                        "ai.tokens.completion": usage.get("completion_tokens"),
+                        "ai.tokens.total": usage.get("total_tokens")
+                    })
 
-            finally:
-                async with ai_request_lock:
-                    active_ai_requests = max(0, active_ai_requests - 1)
-                    logger.info(f"Active AI requests: {active_ai_requests}")
+            provider_health.record_success(provider, time.perf_counter() - call_start)
+            record_token_usage(model_param, usage)
+            return {
+                "content": response.choices[0].message.content,
+                "usage": usage,
+                "model": getattr(response, 'model', model_param),
+                "response_format": response_format["type"],
+                "finish_reason": getattr(response.choices[0], 'finish_reason', None)
+            }
+
+        except HTTPException:
+            # Rejected by admission control, not a provider failure
+            raise
 
         except asyncio.TimeoutError:
+            AI_PROVIDER_ERRORS.labels(provider, "timeout").inc()
+            provider_health.record_failure(provider, "timeout")
             logger.warning(f"AI request timeout (attempt {attempt + 1}/{max_retries})")
             if attempt < max_retries - 1:
                 await asyncio.sleep(settings.ai.retry_delay * (attempt + 1))
@@ -124,7 +259,28 @@ async def make_ai_request_with_retry(
                     detail="AI request timed out"
                 )
 
+        except JSONSchemaValidationError as e:
+            # Only raised when validation is enabled: the call succeeded, so keep the reply for parsing
+            provider_health.record_success(provider, time.perf_counter() - call_start)
+            logger.warning(f"AI response does not match the {response_format['type']} response format, parsing it as is")
+            return {
+                "content": e.raw_response,
+                "usage": {},
+                "model": model_param,
+                "response_format": response_format["type"],
+                "finish_reason": None
+            }
+
         except Exception as e:
+            # The request was invalid, not the provider unhealthy: retry without the schema
+            if response_format["type"] == "json_schema" and is_response_format_rejection(e):
+                mark_unsupported(model_param)
+                return await make_ai_request_with_retry(
+                    fallback_prompt() if fallback_prompt else prompt, image_base64, model_param, max_retries - attempt
+                )
+            error_type = classify_provider_error(e)
+            AI_PROVIDER_ERRORS.labels(provider, error_type).inc()
+            provider_health.record_failure(provider, error_type)
             logger.error(f"AI request failed (attempt {attempt + 1}/{max_retries}): {str(e)}")
             if attempt < max_retries - 1:
                 await asyncio.sleep(settings.ai.retry_delay * (attempt + 1))
@@ -135,33 +291,24 @@ async def make_ai_request_with_retry(
                 )
 
 
+@stage("parse", "parse_ai_response")
+def parse_ai_response(text: Optional[str]) -> ParseResult:
+    """Parse and sanitize the JSON object in an AI response, repairing truncated output"""
+    result = parse_json_response(text or "")
+    AI_RESPONSE_PARSE.labels(result.method).inc()
+    if result.data is None:
+        return result
+    if result.method == "repaired":
+        logger.warning(f"Repaired truncated AI response, {len(result.recovered_fields)} fields recovered")
+    return result._replace(data=input_sanitizer.sanitize_json_field(result.data))
+
+
 def extract_json_from_text(text: str) -> tuple[bool, Optional[Dict], str]:
     """Extract JSON from AI response text with validation"""
-    try:
-        # Try direct JSON parse
-        data = json.loads(text)
-        # Sanitize the extracted data
-        data = input_sanitizer.sanitize_json_field(data)
-        return True, data, json.dumps(data, indent=2)
-    except:
-        pass
-
-    # Try to find JSON blocks in markdown or text
-    import re
-
-    # Look for JSON blocks in markdown code fences
-    json_blocks = re.findall(r'```json\s*(\{.*?\})\s*```', text, re.DOTALL)
-    if json_blocks:
-        for block in json_blocks:
-            try:
-                data = json.loads(block)
-                data = input_sanitizer.sanitize_json_field(data)
-                if isinstance(data, dict):
-                    return True, data, json.dumps(data, indent=2)
-            except:
-                continue
-
-    return False, None, text
+    result = parse_ai_response(text)
+    if result.data is None:
+        return False, None, text
+    return True, result.data, dumps_indented(result.data)
 
 
 def get_supported_models() -> List[Dict[str, str]]:
@@ -183,4 +330,23 @@ def get_supported_models() -> List[Dict[str, str]]:
 
 def get_active_ai_requests() -> int:
     """Get current number of active AI requests"""
-    return active_ai_requests
\ No newline at end of file
+    return active_ai_requests
+
+
+def get_queued_ai_requests() -> int:
+    """Get current number of AI requests waiting for an admission slot"""
+    return queued_ai_requests
+
+
+def get_ai_queue_stats() -> Dict[str, Any]:
+    """Get AI admission queue statistics"""
+    return {
+        "active": active_ai_requests,
+        "queued": queued_ai_requests,
+        "max_concurrent": settings.performance.max_concurrent_requests,
+        "admitted": ai_queue_wait.count,
+        "wait_ewma_seconds": round(ai_queue_wait.value, 4) if ai_queue_wait.value is not None else None,
+        "wait_max_seconds": round(ai_queue_wait_max, 4),
+        "wait_timeout_seconds": settings.performance.ai_queue_timeout,
+        "timeouts": ai_queue_timeouts
+    }
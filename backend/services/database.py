@@ -2,24 +2,62 @@
 Database service for persistent storage of schemas and application data
 """
 
+import re
 import sqlite3
 import json
 import logging
+import threading
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Iterator, Tuple, Callable
 from datetime import datetime
 from contextlib import contextmanager
 
 from config import settings
+from services.tracing import span
 
 logger = logging.getLogger(__name__)
 
+# Attributes shared by every database call span
+DB_SPAN_ATTRIBUTES = {"db.system": "sqlite"}
+
+
+def normalize_field_name(field_name: str) -> str:
+    """Normalize a field name for lookups ("Passport Number" and "passport_number" match)"""
+    return re.sub(r'[^a-z0-9]+', '_', str(field_name).lower()).strip('_')
+
+
+def _field_index_rows(schema_id: str, fields: Any) -> List[tuple]:
+    """Build schema_fields rows for a schema's field definitions"""
+    if not isinstance(fields, dict):
+        return []
+
+    rows = []
+    for field_name, field_info in fields.items():
+        field_info = field_info if isinstance(field_info, dict) else {}
+        rows.append((
+            schema_id,
+            field_name,
+            normalize_field_name(field_name),
+            str(field_info.get("type", "text")),
+            1 if field_info.get("required") is True else 0
+        ))
+    return rows
+
+
 class DatabaseService:
     """SQLite database service for schema storage"""
 
     def __init__(self, db_path: str = "data/schemas.db"):
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._write_listeners: List[Callable[[List[str], int], None]] = []
+
+        # Connection statistics (a connection is opened per operation, there is no pool)
+        self._stats_lock = threading.Lock()
+        self.connections_opened = 0
+        self.open_connections = 0
+        self.peak_open_connections = 0
+        self.errors = 0
         logger.info(f"Database service initialized with path: {self.db_path.absolute()}")
         self._init_database()
 
@@ -28,7 +66,7 @@ class DatabaseService:
         with self._get_connection() as conn:
             cursor = conn.cursor()
 
-            # Create schemas table
+            # Create schemas table (one row per schema, pointing at its latest version)
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS schemas (
                     id TEXT PRIMARY KEY,
@@ -37,26 +75,103 @@ class DatabaseService:
                     category TEXT DEFAULT 'Other',
                     fields TEXT NOT NULL,  -- JSON string
                     metadata TEXT,         -- JSON string for additional data
+                    version INTEGER NOT NULL DEFAULT 1,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             """)
 
+            # Databases created before versioning lack the version column
+            columns = {row["name"] for row in cursor.execute("PRAGMA table_info(schemas)")}
+            if "version" not in columns:
+                cursor.execute("ALTER TABLE schemas ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+
+            # Create schema versions table (immutable, one row per saved revision)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS schema_versions (
+                    schema_id TEXT NOT NULL,
+                    version INTEGER NOT NULL,
+                    name TEXT NOT NULL,
+                    description TEXT,
+                    category TEXT DEFAULT 'Other',
+                    fields TEXT NOT NULL,  -- JSON string
+                    metadata TEXT,         -- JSON string for additional data
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (schema_id, version)
+                )
+            """)
+
+            # Backfill version history for schemas saved before versioning
+            cursor.execute("""
+                INSERT OR IGNORE INTO schema_versions
+                (schema_id, version, name, description, category, fields, metadata, created_at)
+                SELECT id, version, name, description, category, fields, metadata, updated_at
+                FROM schemas
+            """)
+
             # Create index for better query performance
             cursor.execute("""
                 CREATE INDEX IF NOT EXISTS idx_schemas_category
                 ON schemas(category)
             """)
 
+            # Counter bumped by every schema write so other processes can detect changes cheaply
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS app_meta (
+                    key TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )
+            """)
+            cursor.execute("INSERT OR IGNORE INTO app_meta (key, value) VALUES ('schema_generation', 0)")
+
+            # Normalized field index, kept in sync with the fields JSON of each schema
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS schema_fields (
+                    schema_id TEXT NOT NULL,
+                    field_name TEXT NOT NULL,
+                    normalized_name TEXT NOT NULL,
+                    type TEXT,
+                    required INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (schema_id, field_name)
+                )
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_schema_fields_name
+                ON schema_fields(normalized_name)
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_schema_fields_type
+                ON schema_fields(type)
+            """)
+
+            # Index schemas saved before the field index existed (once)
+            cursor.execute("SELECT value FROM app_meta WHERE key = 'schema_fields_indexed'")
+            if not cursor.fetchone():
+                for row in cursor.execute("SELECT id, fields FROM schemas").fetchall():
+                    try:
+                        fields = json.loads(row["fields"])
+                    except (json.JSONDecodeError, TypeError):
+                        continue
+                    cursor.executemany("""
+                        INSERT OR REPLACE INTO schema_fields
+                        (schema_id, field_name, normalized_name, type, required)
+                        VALUES (?, ?, ?, ?, ?)
+                    """, _field_index_rows(row["id"], fields))
+                cursor.execute("INSERT INTO app_meta (key, value) VALUES ('schema_fields_indexed', 1)")
+
             conn.commit()
             logger.info(f"Database initialized at {self.db_path}")
 
     @contextmanager
-    def _get_connection(self):
+    def _get_connection(self, check_same_thread: bool = True):
         """Get database connection with proper error handling"""
         conn = None
         try:
-            conn = sqlite3.connect(str(self.db_path))
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=check_same_thread)
+            with self._stats_lock:
+                self.connections_opened += 1
+                self.open_connections += 1
+                self.peak_open_connections = max(self.peak_open_connections, self.open_connections)
             conn.row_factory = sqlite3.Row  # Enable column access by name
 
             # Ensure immediate writes and disable caching
@@ -68,65 +183,151 @@ class DatabaseService:
         except Exception as e:
             if conn:
                 conn.rollback()
+            with self._stats_lock:
+                self.errors += 1
             logger.error(f"Database error: {e}")
             raise
         finally:
             if conn:
                 conn.close()
-
-    def save_schema(self, schema_id: str, schema_data: Dict[str, Any]) -> bool:
-        """Save or update a schema"""
+                with self._stats_lock:
+                    self.open_connections -= 1
+
+    def get_connection_stats(self) -> Dict[str, Any]:
+        """Get connection statistics without touching the database"""
+        with self._stats_lock:
+            return {
+                "connections_opened": self.connections_opened,
+                "open_connections": self.open_connections,
+                "peak_open_connections": self.peak_open_connections,
+                "errors": self.errors,
+                "database_size_mb": self.db_path.stat().st_size / (1024 * 1024) if self.db_path.exists() else 0
+            }
+
+    def add_write_listener(self, listener: Callable[[List[str], int], None]):
+        """Register a callback invoked with (schema_ids, schema_generation) after each committed schema write"""
+        self._write_listeners.append(listener)
+
+    def _notify_write(self, schema_ids: List[str], generation: int):
+        """Notify write listeners after a commit"""
+        for listener in self._write_listeners:
+            try:
+                listener(schema_ids, generation)
+            except Exception as e:
+                logger.error(f"Schema write listener failed: {e}")
+
+    def _bump_schema_generation(self, cursor: sqlite3.Cursor) -> int:
+        """Increment the schema generation counter within the caller's transaction"""
+        cursor.execute("""
+            UPDATE app_meta SET value = value + 1
+            WHERE key = 'schema_generation'
+            RETURNING value
+        """)
+        return cursor.fetchone()["value"]
+
+    def get_schema_generation(self) -> int:
+        """Get the current schema generation counter"""
+        with self._get_connection() as conn:
+            row = conn.execute("SELECT value FROM app_meta WHERE key = 'schema_generation'").fetchone()
+            return row["value"] if row else 0
+
+    def open_monitor_connection(self) -> sqlite3.Connection:
+        """
+        Open a long-lived connection for change polling
+        PRAGMA data_version on it changes whenever any other connection commits
+        """
+        conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _write_schema(self, cursor: sqlite3.Cursor, schema_id: str, schema_data: Dict[str, Any]) -> int:
+        """
+        Write a schema as a new version within the caller's transaction
+        The caller must hold the write lock (BEGIN IMMEDIATE) so that the next version
+        number is read and inserted without another writer in between
+        Returns: the new version number
+        """
+        # Prepare data
+        fields_json = json.dumps(schema_data.get("fields", {}))
+        metadata_json = json.dumps({
+            "overall_confidence": schema_data.get("overall_confidence"),
+            "document_quality": schema_data.get("document_quality"),
+            "extraction_difficulty": schema_data.get("extraction_difficulty"),
+            "document_specific_notes": schema_data.get("document_specific_notes", []),
+            "quality_recommendations": schema_data.get("quality_recommendations", [])
+        })
+
+        # Versions are never reused, even if the schema was deleted and recreated
+        cursor.execute(
+            "SELECT COALESCE(MAX(version), 0) + 1 AS next_version FROM schema_versions WHERE schema_id = ?",
+            (schema_id,)
+        )
+        version = cursor.fetchone()["next_version"]
+
+        row = (
+            schema_data.get("name", "Unknown Schema"),
+            schema_data.get("description", ""),
+            schema_data.get("category", "Other"),
+            fields_json,
+            metadata_json
+        )
+
+        cursor.execute("""
+            INSERT INTO schema_versions
+            (schema_id, version, name, description, category, fields, metadata)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (schema_id, version) + row)
+
+        # Insert or move the schema head to the new version (keeps created_at)
+        cursor.execute("""
+            INSERT INTO schemas
+            (id, name, description, category, fields, metadata, version, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(id) DO UPDATE SET
+                name = excluded.name,
+                description = excluded.description,
+                category = excluded.category,
+                fields = excluded.fields,
+                metadata = excluded.metadata,
+                version = excluded.version,
+                updated_at = excluded.updated_at
+        """, (schema_id,) + row + (version,))
+
+        # Refresh the field index
+        cursor.execute("DELETE FROM schema_fields WHERE schema_id = ?", (schema_id,))
+        cursor.executemany("""
+            INSERT INTO schema_fields
+            (schema_id, field_name, normalized_name, type, required)
+            VALUES (?, ?, ?, ?, ?)
+        """, _field_index_rows(schema_id, schema_data.get("fields", {})))
+
+        return version
+
+    @span("db.save_schema", DB_SPAN_ATTRIBUTES)
+    def save_schema(self, schema_id: str, schema_data: Dict[str, Any]) -> Optional[int]:
+        """
+        Save or update a schema as a new immutable version
+        Returns: the new version number, or None on failure
+        """
         try:
             with self._get_connection() as conn:
                 cursor = conn.cursor()
+                cursor.execute("BEGIN IMMEDIATE")
 
-                # Prepare data
-                fields = schema_data.get("fields", {})
-                fields_json = json.dumps(fields)
-                metadata_json = json.dumps({
-                    "overall_confidence": schema_data.get("overall_confidence"),
-                    "document_quality": schema_data.get("document_quality"),
-                    "extraction_difficulty": schema_data.get("extraction_difficulty"),
-                    "document_specific_notes": schema_data.get("document_specific_notes", []),
-                    "quality_recommendations": schema_data.get("quality_recommendations", [])
-                })
-
-                # Debug logging
-                logger.info(f"DB SAVE - Schema {schema_id}: {len(fields)} fields")
-                logger.info(f"DB SAVE - Field names: {list(fields.keys())}")
-                logger.info(f"DB SAVE - Fields JSON length: {len(fields_json)}")
-
-                # Insert or update
-                cursor.execute("""
-                    INSERT OR REPLACE INTO schemas
-                    (id, name, description, category, fields, metadata, updated_at)
-                    VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-                """, (
-                    schema_id,
-                    schema_data.get("name", "Unknown Schema"),
-                    schema_data.get("description", ""),
-                    schema_data.get("category", "Other"),
-                    fields_json,
-                    metadata_json
-                ))
+                version = self._write_schema(cursor, schema_id, schema_data)
+                generation = self._bump_schema_generation(cursor)
 
                 conn.commit()
+                self._notify_write([schema_id], generation)
 
-                # Verify what was actually saved
-                cursor.execute("SELECT fields FROM schemas WHERE id = ?", (schema_id,))
-                saved_row = cursor.fetchone()
-                if saved_row:
-                    saved_fields = json.loads(saved_row["fields"])
-                    logger.info(f"DB SAVE - Verification: {len(saved_fields)} fields actually saved")
-                    logger.info(f"DB SAVE - Saved field names: {list(saved_fields.keys())}")
-
-                logger.info(f"Schema saved: {schema_id}")
-                return True
+                logger.info(f"Schema saved: {schema_id} (version {version}, {len(schema_data.get('fields', {}))} fields)")
+                return version
 
         except Exception as e:
             logger.error(f"Failed to save schema {schema_id}: {e}")
-            return False
+            return None
 
+    @span("db.get_schema", DB_SPAN_ATTRIBUTES)
     def get_schema(self, schema_id: str) -> Optional[Dict[str, Any]]:
         """Get a schema by ID"""
         try:
@@ -150,6 +351,7 @@ class DatabaseService:
                     "description": row["description"],
                     "category": row["category"],
                     "fields": fields,
+                    "version": row["version"],
                     "created_at": row["created_at"],
                     "updated_at": row["updated_at"]
                 }
@@ -163,6 +365,79 @@ class DatabaseService:
             logger.error(f"Failed to get schema {schema_id}: {e}")
             return None
 
+    @span("db.get_schema_version", DB_SPAN_ATTRIBUTES)
+    def get_schema_version(self, schema_id: str, version: int) -> Optional[Dict[str, Any]]:
+        """Get a specific immutable version of a schema"""
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT * FROM schema_versions WHERE schema_id = ? AND version = ?
+                """, (schema_id, version))
+
+                row = cursor.fetchone()
+                if not row:
+                    return None
+
+                # Parse JSON fields
+                fields = json.loads(row["fields"])
+                metadata = json.loads(row["metadata"]) if row["metadata"] else {}
+
+                schema = {
+                    "id": row["schema_id"],
+                    "name": row["name"],
+                    "description": row["description"],
+                    "category": row["category"],
+                    "fields": fields,
+                    "version": row["version"],
+                    "created_at": row["created_at"]
+                }
+
+                # Add metadata fields
+                schema.update(metadata)
+
+                return schema
+
+        except Exception as e:
+            logger.error(f"Failed to get schema {schema_id} version {version}: {e}")
+            return None
+
+    @span("db.get_schema_versions", DB_SPAN_ATTRIBUTES)
+    def get_schema_versions(self, schema_id: str) -> List[Dict[str, Any]]:
+        """List the version history of a schema, newest first"""
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT version, name, category, fields, created_at
+                    FROM schema_versions
+                    WHERE schema_id = ?
+                    ORDER BY version DESC
+                """, (schema_id,))
+
+                versions = []
+                for row in cursor.fetchall():
+                    try:
+                        fields = json.loads(row["fields"])
+                        field_count = len(fields) if isinstance(fields, dict) else 0
+                    except (json.JSONDecodeError, TypeError):
+                        field_count = 0
+
+                    versions.append({
+                        "version": row["version"],
+                        "name": row["name"],
+                        "category": row["category"],
+                        "field_count": field_count,
+                        "created_at": row["created_at"]
+                    })
+
+                return versions
+
+        except Exception as e:
+            logger.error(f"Failed to get versions for schema {schema_id}: {e}")
+            return []
+
+    @span("db.get_all_schemas", DB_SPAN_ATTRIBUTES)
     def get_all_schemas(self) -> Dict[str, Dict[str, Any]]:
         """Get all schemas"""
         try:
@@ -170,7 +445,7 @@ class DatabaseService:
                 cursor = conn.cursor()
                 cursor.execute("""
                     SELECT id, name, description, category,
-                           fields, created_at, updated_at
+                           fields, version, created_at, updated_at
                     FROM schemas
                     ORDER BY updated_at DESC
                 """)
@@ -190,28 +465,115 @@ class DatabaseService:
                         "description": row["description"],
                         "category": row["category"],
                         "field_count": field_count,
+                        "version": row["version"],
                         "created_at": row["created_at"],
                         "updated_at": row["updated_at"]
                     }
 
-                    # Debug logging for each schema during retrieval
-                    logger.info(f"DB RETRIEVE - Schema {row['id']}: {field_count} fields, updated: {row['updated_at']}")
-
                 return schemas
 
         except Exception as e:
             logger.error(f"Failed to get all schemas: {e}")
             return {}
 
+    def iter_schema_export_lines(self, category: Optional[str] = None, batch_size: int = 500) -> Iterator[str]:
+        """
+        Stream every schema as NDJSON, reading rows in keyset batches (id > last id)
+        Each batch uses its own connection, closed before the batch is yielded, so a slow
+        client never holds a read lock; stored field JSON is spliced in as-is
+        """
+        query = """
+            SELECT id, name, description, category, fields, metadata,
+                   version, created_at, updated_at
+            FROM schemas
+            WHERE id > ?
+        """
+        if category:
+            query += " AND category = ?"
+        query += " ORDER BY id LIMIT ?"
+
+        last_id = ""
+        while True:
+            params = (last_id, category, batch_size) if category else (last_id, batch_size)
+            with self._get_connection() as conn:
+                rows = conn.execute(query, params).fetchall()
+            if not rows:
+                break
+
+            lines = []
+            for row in rows:
+                record = {
+                    "id": row["id"],
+                    "name": row["name"],
+                    "description": row["description"],
+                    "category": row["category"],
+                    "version": row["version"],
+                    "created_at": row["created_at"],
+                    "updated_at": row["updated_at"]
+                }
+                if row["metadata"]:
+                    record.update(json.loads(row["metadata"]))
+
+                lines.append(json.dumps(record)[:-1] + ', "fields": ' + row["fields"] + "}\n")
+
+            last_id = rows[-1]["id"]
+            yield "".join(lines)
+            if len(rows) < batch_size:
+                break
+
+    @span("db.import_schemas", DB_SPAN_ATTRIBUTES)
+    def import_schemas(self, records: List[Tuple[int, str, Dict[str, Any]]]) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Upsert a batch of (line_number, schema_id, schema_data) records in a single transaction
+        A failing record is rolled back on its own without aborting the batch
+        Returns: (imported_count, errors)
+        """
+        imported = 0
+        errors = []
+
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("BEGIN IMMEDIATE")
+
+                for line_number, schema_id, schema_data in records:
+                    cursor.execute("SAVEPOINT import_record")
+                    try:
+                        self._write_schema(cursor, schema_id, schema_data)
+                        cursor.execute("RELEASE SAVEPOINT import_record")
+                        imported += 1
+                    except sqlite3.Error as e:
+                        cursor.execute("ROLLBACK TO SAVEPOINT import_record")
+                        cursor.execute("RELEASE SAVEPOINT import_record")
+                        errors.append({"line": line_number, "id": schema_id, "error": str(e)})
+
+                generation = self._bump_schema_generation(cursor)
+                conn.commit()
+                self._notify_write([schema_id for _, schema_id, _ in records], generation)
+
+        except Exception as e:
+            logger.error(f"Failed to import schema batch: {e}")
+            return 0, [
+                {"line": line_number, "id": schema_id, "error": "Batch could not be written"}
+                for line_number, schema_id, _ in records
+            ]
+
+        logger.info(f"Imported {imported} schemas ({len(errors)} failed)")
+        return imported, errors
+
+    @span("db.delete_schema", DB_SPAN_ATTRIBUTES)
     def delete_schema(self, schema_id: str) -> bool:
-        """Delete a schema"""
+        """Delete a schema (version history is kept so pinned versions stay resolvable)"""
         try:
             with self._get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("DELETE FROM schemas WHERE id = ?", (schema_id,))
 
                 if cursor.rowcount > 0:
+                    cursor.execute("DELETE FROM schema_fields WHERE schema_id = ?", (schema_id,))
+                    generation = self._bump_schema_generation(cursor)
                     conn.commit()
+                    self._notify_write([schema_id], generation)
                     logger.info(f"Schema deleted: {schema_id}")
                     return True
                 else:
@@ -222,6 +584,7 @@ class DatabaseService:
             logger.error(f"Failed to delete schema {schema_id}: {e}")
             return False
 
+    @span("db.get_schemas_by_category", DB_SPAN_ATTRIBUTES)
     def get_schemas_by_category(self, category: str) -> Dict[str, Dict[str, Any]]:
         """Get schemas by category"""
         try:
@@ -229,7 +592,7 @@ class DatabaseService:
                 cursor = conn.cursor()
                 cursor.execute("""
                     SELECT id, name, description, category,
-                           fields, created_at, updated_at
+                           fields, version, created_at, updated_at
                     FROM schemas
                     WHERE category = ?
                     ORDER BY updated_at DESC
@@ -250,6 +613,7 @@ class DatabaseService:
                         "description": row["description"],
                         "category": row["category"],
                         "field_count": field_count,
+                        "version": row["version"],
                         "created_at": row["created_at"],
                         "updated_at": row["updated_at"]
                     }
@@ -260,6 +624,105 @@ class DatabaseService:
             logger.error(f"Failed to get schemas by category {category}: {e}")
             return {}
 
+    @span("db.find_schemas_by_field", DB_SPAN_ATTRIBUTES)
+    def find_schemas_by_field(
+        self,
+        field_name: str,
+        field_type: Optional[str] = None,
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """Find schemas that define a field (matched on the normalized field name)"""
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                query = """
+                    SELECT sf.schema_id, s.name, s.category, s.version,
+                           sf.field_name, sf.type, sf.required
+                    FROM schema_fields sf
+                    JOIN schemas s ON s.id = sf.schema_id
+                    WHERE sf.normalized_name = ?
+                """
+                params: list = [normalize_field_name(field_name)]
+                if field_type:
+                    query += " AND sf.type = ?"
+                    params.append(field_type)
+                query += " ORDER BY s.updated_at DESC LIMIT ?"
+                params.append(limit)
+
+                cursor.execute(query, params)
+                return [
+                    {
+                        "schema_id": row["schema_id"],
+                        "schema_name": row["name"],
+                        "category": row["category"],
+                        "version": row["version"],
+                        "field_name": row["field_name"],
+                        "type": row["type"],
+                        "required": bool(row["required"])
+                    }
+                    for row in cursor.fetchall()
+                ]
+
+        except Exception as e:
+            logger.error(f"Failed to find schemas by field {field_name}: {e}")
+            return []
+
+    @span("db.find_similar_schemas", DB_SPAN_ATTRIBUTES)
+    def find_similar_schemas(
+        self,
+        field_names: List[str],
+        min_similarity: float = 0.5,
+        limit: int = 5,
+        exclude_schema_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Find schemas whose field sets overlap the given field names
+        Similarity is the Jaccard index of the normalized field name sets
+        """
+        names = sorted({normalize_field_name(name) for name in field_names} - {""})
+        if not names:
+            return []
+
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT schema_id, name, category, version, shared, field_count,
+                           CAST(shared AS REAL) / (? + field_count - shared) AS similarity
+                    FROM (
+                        SELECT sf.schema_id, s.name, s.category, s.version,
+                               COUNT(DISTINCT sf.normalized_name) AS shared,
+                               (SELECT COUNT(DISTINCT normalized_name) FROM schema_fields
+                                WHERE schema_id = sf.schema_id) AS field_count
+                        FROM schema_fields sf
+                        JOIN schemas s ON s.id = sf.schema_id
+                        WHERE sf.normalized_name IN (SELECT value FROM json_each(?))
+                          AND sf.schema_id != ?
+                        GROUP BY sf.schema_id
+                    )
+                    WHERE similarity >= ?
+                    ORDER BY similarity DESC, shared DESC
+                    LIMIT ?
+                """, (len(names), json.dumps(names), exclude_schema_id or "", min_similarity, limit))
+
+                return [
+                    {
+                        "schema_id": row["schema_id"],
+                        "schema_name": row["name"],
+                        "category": row["category"],
+                        "version": row["version"],
+                        "shared_fields": row["shared"],
+                        "field_count": row["field_count"],
+                        "similarity": round(row["similarity"], 4)
+                    }
+                    for row in cursor.fetchall()
+                ]
+
+        except Exception as e:
+            logger.error(f"Failed to find similar schemas: {e}")
+            return []
+
+    @span("db.get_database_stats", DB_SPAN_ATTRIBUTES)
     def get_database_stats(self) -> Dict[str, Any]:
         """Get database statistics"""
         try:
@@ -270,6 +733,10 @@ class DatabaseService:
                 cursor.execute("SELECT COUNT(*) as total FROM schemas")
                 total_schemas = cursor.fetchone()["total"]
 
+                # Total stored versions
+                cursor.execute("SELECT COUNT(*) as total FROM schema_versions")
+                total_versions = cursor.fetchone()["total"]
+
                 # Schemas by category
                 cursor.execute("""
                     SELECT category, COUNT(*) as count
@@ -280,6 +747,7 @@ class DatabaseService:
 
                 return {
                     "total_schemas": total_schemas,
+                    "total_versions": total_versions,
                     "by_category": by_category,
                     "database_path": str(self.db_path),
                     "database_size_mb": self.db_path.stat().st_size / (1024 * 1024) if self.db_path.exists() else 0
@@ -15,6 +15,8 @@ import fitz  # PyMuPDF
 
 from config import settings
 from validators import FileValidator, InputSanitizer
+from services.metrics import stage
+from services.tracing import span, set_span_attributes
 
 logger = logging.getLogger(__name__)
 
@@ -38,6 +40,7 @@ def determine_file_type(filename: str) -> str:
         raise ValueError(f"Unsupported file type: {extension}")
 
 
+@span("image_to_base64")
 def image_to_base64(image: Image.Image) -> str:
     """Convert PIL image to base64 string with optimization"""
     buffer = BytesIO()
@@ -50,7 +53,7 @@ def image_to_base64(image: Image.Image) -> str:
     max_dim = settings.performance.max_image_dimension
     if image.width > max_dim or image.height > max_dim:
         image.thumbnail((max_dim, max_dim), Image.Resampling.LANCZOS)
-        logger.info(f"Resized image from {image.width}x{image.height} to fit within {max_dim}x{max_dim}")
+        logger.debug(f"Resized image from {image.width}x{image.height} to fit within {max_dim}x{max_dim}")
 
     # Save with compression
     image.save(buffer, format="JPEG", quality=settings.performance.image_compression_quality, optimize=True)
@@ -59,6 +62,7 @@ def image_to_base64(image: Image.Image) -> str:
     return base64.b64encode(img_bytes).decode('utf-8')
 
 
+@span("pdf_to_images")
 def pdf_to_images(pdf_bytes: bytes, page_num: int = 1) -> Image.Image:
     """Convert PDF page to PIL Image with DPI control"""
     doc = fitz.open(stream=pdf_bytes, filetype="pdf")
@@ -78,52 +82,58 @@ def pdf_to_images(pdf_bytes: bytes, page_num: int = 1) -> Image.Image:
     return image
 
 
-async def process_uploaded_document(
-    file: UploadFile,
-    request_id: str
-) -> Tuple[bytes, dict]:
+async def process_uploaded_document(file: UploadFile) -> Tuple[bytes, dict]:
     """
     Reusable function to process uploaded documents with validation
     Returns: (file_data, metadata)
     """
-    logger.info(f"[{request_id}] Processing uploaded document: {file.filename}")
-
-    # Read file data
-    file_data = await file.read()
-
-    # Comprehensive file validation
-    is_valid, error_message, metadata = file_validator.validate_file(file_data, file.filename)
-
-    if not is_valid:
-        logger.warning(f"[{request_id}] File validation failed: {error_message}")
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=error_message
-        )
-
-    logger.info(f"[{request_id}] File validated successfully: {metadata}")
+    logger.debug(f"Processing uploaded document: {file.filename}")
+
+    with span("process_uploaded_document") as current:
+        # Read file data
+        file_data = await file.read()
+
+        # Comprehensive file validation
+        with stage("validation"):
+            is_valid, error_message, metadata = file_validator.validate_file(file_data, file.filename)
+
+        set_span_attributes(current, {
+            "document.size": len(file_data),
+            "document.mime_type": metadata.get("mime_type"),
+            "document.valid": is_valid
+        })
+
+        if not is_valid:
+            logger.warning(f"File validation failed: {error_message}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=error_message
+            )
+
+    logger.debug(f"File validated successfully: {metadata}")
     return file_data, metadata
 
 
 async def prepare_document_for_ai(
     file_data: bytes,
-    metadata: dict,
-    request_id: str
+    metadata: dict
 ) -> Tuple[Image.Image, str]:
     """
     Convert document to image and base64 for AI processing
     Returns: (image, image_base64)
     """
-    logger.info(f"[{request_id}] Converting document to image for AI processing")
+    logger.debug("Converting document to image for AI processing")
 
     # Convert document to image
-    if metadata["file_type"] == "pdf":
-        image = pdf_to_images(file_data, page_num=1)
-    else:
-        image = Image.open(BytesIO(file_data))
+    with stage("render"):
+        if metadata["file_type"] == "pdf":
+            image = pdf_to_images(file_data, page_num=1)
+        else:
+            image = Image.open(BytesIO(file_data))
 
     # Convert image to base64 with optimization
-    image_base64 = image_to_base64(image)
+    with stage("encode"):
+        image_base64 = image_to_base64(image)
 
     return image, image_base64
 
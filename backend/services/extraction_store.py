@@ -0,0 +1,327 @@
+"""
+Extraction store service - persists extraction results off the request path
+"""
+
+import json
+import zlib
+import queue
+import sqlite3
+import logging
+import threading
+from typing import Dict, List, Optional, Any
+
+from config import settings
+from services.database import db_service, DB_SPAN_ATTRIBUTES
+from services.tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+class ExtractionStore:
+    """
+    Stores extraction results in the extractions table of the schema database
+
+    Requests only enqueue a record; a background thread serializes, compresses and
+    writes queued records in batched transactions. Hot fields are kept in a small
+    uncompressed summary JSON and exposed as indexed generated columns.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+        max_queue_size: int = 10000
+    ):
+        self.db_path = str(db_path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=max_queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+        # Statistics
+        self.written = 0
+        self.dropped = 0
+        self.write_errors = 0
+
+        self._init_table()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_table(self):
+        """Create the extractions table and its indexes"""
+        conn = self._connect()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS extractions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    extraction_id TEXT NOT NULL UNIQUE,
+                    request_id TEXT,
+                    file_hash TEXT,
+                    file_type TEXT,
+                    schema_id TEXT,
+                    schema_version INTEGER,
+                    model TEXT,
+                    processing_time REAL,
+                    timings TEXT,          -- JSON string
+                    prompt_tokens INTEGER,
+                    completion_tokens INTEGER,
+                    total_tokens INTEGER,
+                    summary TEXT NOT NULL, -- JSON string with hot fields
+                    result BLOB NOT NULL,  -- zlib-compressed JSON
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    risk_level TEXT GENERATED ALWAYS AS (json_extract(summary, '$.risk_level')) VIRTUAL,
+                    overall_confidence REAL GENERATED ALWAYS AS (json_extract(summary, '$.overall_confidence')) VIRTUAL,
+                    document_type TEXT GENERATED ALWAYS AS (json_extract(summary, '$.document_type')) VIRTUAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_extractions_risk_level ON extractions(risk_level)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_extractions_confidence ON extractions(overall_confidence)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_extractions_schema ON extractions(schema_id, schema_version)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_extractions_file_hash ON extractions(file_hash)")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def start(self):
+        """Start the background writer thread"""
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="extraction-store-writer", daemon=True)
+            self._thread.start()
+            logger.info("Extraction store writer started")
+
+    def stop(self, timeout: float = 10.0):
+        """Flush queued records and stop the writer thread"""
+        with self._start_lock:
+            if not self._thread:
+                return
+            self._queue.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+            logger.info(f"Extraction store writer stopped ({self.written} written, {self.dropped} dropped)")
+
+    def flush(self):
+        """Block until every queued record has been written"""
+        self._queue.join()
+
+    def record(self, entry: Dict[str, Any]) -> bool:
+        """
+        Queue an extraction result for storage without blocking
+        Returns False if the queue is full and the record was dropped
+        """
+        if not self._thread:
+            self.start()
+        try:
+            self._queue.put_nowait(entry)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            logger.warning("Extraction store queue full, dropping record")
+            return False
+
+    def _run(self):
+        """Writer loop: gather a batch, then write it in one transaction"""
+        conn = self._connect()
+        try:
+            stopping = False
+            while not stopping:
+                batch = []
+                try:
+                    item = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    continue
+
+                while True:
+                    if item is None:
+                        stopping = True
+                        self._queue.task_done()
+                    else:
+                        batch.append(item)
+                    if stopping or len(batch) >= self.batch_size:
+                        break
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+
+                if batch:
+                    self._write_batch(conn, batch)
+                    for _ in batch:
+                        self._queue.task_done()
+        finally:
+            conn.close()
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: List[Dict[str, Any]]):
+        """Serialize, compress and insert a batch of records"""
+        try:
+            rows = [self._to_row(entry) for entry in batch]
+            conn.executemany("""
+                INSERT OR IGNORE INTO extractions
+                (extraction_id, request_id, file_hash, file_type, schema_id, schema_version, model,
+                 processing_time, timings, prompt_tokens, completion_tokens, total_tokens, summary, result)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+            conn.commit()
+            self.written += len(rows)
+        except Exception as e:
+            conn.rollback()
+            self.write_errors += len(batch)
+            logger.error(f"Failed to write {len(batch)} extraction records: {e}")
+
+    @staticmethod
+    def _to_row(entry: Dict[str, Any]) -> tuple:
+        """Build an extractions row from a queued record"""
+        result = entry.get("result") or {}
+        structured = (result.get("extracted_data") or {}).get("structured_data") or {}
+        verification = structured.get("document_verification") or {}
+        usage = entry.get("usage") or {}
+
+        summary = {
+            "risk_level": verification.get("risk_level"),
+            "authenticity_score": verification.get("authenticity_score"),
+            "document_type": verification.get("detected_document_type"),
+            "overall_confidence": structured.get("overall_confidence"),
+            "document_quality": structured.get("document_quality"),
+            "is_structured": bool(structured),
+            "validation_passed": (result.get("validation") or {}).get("passed")
+        }
+
+        return (
+            entry["extraction_id"],
+            entry.get("request_id"),
+            entry.get("file_hash"),
+            entry.get("file_type"),
+            entry.get("schema_id"),
+            entry.get("schema_version"),
+            entry.get("model"),
+            entry.get("processing_time"),
+            json.dumps(entry.get("timings") or {}),
+            usage.get("prompt_tokens"),
+            usage.get("completion_tokens"),
+            usage.get("total_tokens"),
+            json.dumps(summary),
+            zlib.compress(json.dumps(result, separators=(",", ":")).encode("utf-8"))
+        )
+
+    @staticmethod
+    def _row_to_summary(row: sqlite3.Row) -> Dict[str, Any]:
+        summary = json.loads(row["summary"])
+        return {
+            "extraction_id": row["extraction_id"],
+            "request_id": row["request_id"],
+            "file_hash": row["file_hash"],
+            "file_type": row["file_type"],
+            "schema_id": row["schema_id"],
+            "schema_version": row["schema_version"],
+            "model": row["model"],
+            "processing_time": row["processing_time"],
+            "timings": json.loads(row["timings"]) if row["timings"] else {},
+            "usage": {
+                "prompt_tokens": row["prompt_tokens"],
+                "completion_tokens": row["completion_tokens"],
+                "total_tokens": row["total_tokens"]
+            },
+            "created_at": row["created_at"],
+            **summary
+        }
+
+    @span("db.extractions.query", DB_SPAN_ATTRIBUTES)
+    def query(
+        self,
+        schema_id: Optional[str] = None,
+        schema_version: Optional[int] = None,
+        risk_level: Optional[str] = None,
+        document_type: Optional[str] = None,
+        file_hash: Optional[str] = None,
+        model: Optional[str] = None,
+        min_confidence: Optional[float] = None,
+        max_confidence: Optional[float] = None,
+        cursor: Optional[int] = None,
+        limit: int = 50
+    ) -> tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        Query stored extraction summaries, newest first, with keyset pagination
+        Returns: (extractions, next_cursor)
+        """
+        conditions = []
+        params: list = []
+        for column, value in (
+            ("schema_id", schema_id),
+            ("schema_version", schema_version),
+            ("risk_level", risk_level),
+            ("document_type", document_type),
+            ("file_hash", file_hash),
+            ("model", model)
+        ):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if min_confidence is not None:
+            conditions.append("overall_confidence >= ?")
+            params.append(min_confidence)
+        if max_confidence is not None:
+            conditions.append("overall_confidence <= ?")
+            params.append(max_confidence)
+        if cursor is not None:
+            conditions.append("id < ?")
+            params.append(cursor)
+
+        query = """
+            SELECT id, extraction_id, request_id, file_hash, file_type, schema_id, schema_version,
+                   model, processing_time, timings, prompt_tokens, completion_tokens, total_tokens,
+                   summary, created_at
+            FROM extractions
+        """
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        conn = self._connect()
+        try:
+            rows = conn.execute(query, params).fetchall()
+        finally:
+            conn.close()
+
+        next_cursor = rows[limit - 1]["id"] if len(rows) > limit else None
+        return [self._row_to_summary(row) for row in rows[:limit]], next_cursor
+
+    @span("db.extractions.get", DB_SPAN_ATTRIBUTES)
+    def get(self, extraction_id: str) -> Optional[Dict[str, Any]]:
+        """Get a stored extraction with its full (decompressed) result"""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM extractions WHERE extraction_id = ?", (extraction_id,)).fetchone()
+        finally:
+            conn.close()
+
+        if not row:
+            return None
+
+        extraction = self._row_to_summary(row)
+        extraction["result"] = json.loads(zlib.decompress(row["result"]))
+        return extraction
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get writer statistics"""
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "write_errors": self.write_errors,
+            "writer_running": bool(self._thread and self._thread.is_alive())
+        }
+
+
+# Global extraction store instance
+extraction_store = ExtractionStore(
+    db_service.db_path,
+    batch_size=settings.performance.extraction_store_batch_size,
+    flush_interval=settings.performance.extraction_store_flush_interval
+)
@@ -0,0 +1,133 @@
+"""
+JSON parser service - tolerant parsing of JSON objects in model responses
+
+Responses are parsed directly when they are pure JSON. Otherwise the outermost JSON
+object is located in a single scan of the text (markdown fences, prose before or after),
+and an object cut off at the end, as when a response hits the token limit, is repaired:
+the unfinished element (an unclosed string, a partial number or key) is dropped and the
+open arrays and objects are closed, so repaired objects only hold complete values.
+Uses orjson when installed.
+"""
+
+import json
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+try:
+    import orjson
+
+    JSON_LIBRARY = "orjson"
+    _loads = orjson.loads
+
+    def dumps_indented(data: Any) -> str:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode()
+except ImportError:
+    JSON_LIBRARY = "json"
+    _loads = json.loads
+
+    def dumps_indented(data: Any) -> str:
+        return json.dumps(data, indent=2)
+
+# Candidate objects tried when text contains braces that do not start valid JSON
+MAX_CANDIDATES = 5
+# Cut points tried, from the end, when repairing a truncated object
+MAX_REPAIR_ATTEMPTS = 10
+
+CLOSERS = {"{": "}", "[": "]"}
+
+
+class ParseResult(NamedTuple):
+    data: Optional[Dict[str, Any]]
+    method: str  # direct, embedded, repaired or failed
+    recovered_fields: List[str]  # fields present in a repaired object
+
+
+def _try_loads(text: str) -> Optional[Dict[str, Any]]:
+    try:
+        data = _loads(text)
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _scan(text: str, start: int) -> Tuple[int, List[Tuple[int, str]], bool]:
+    """Scan the object opening at start
+
+    Returns the end index (exclusive), the cut points where everything before is
+    complete (index, open containers there), and whether the object was closed.
+    """
+    stack: List[str] = []
+    cut_points: List[Tuple[int, str]] = []
+    in_string = False
+    escaped = False
+    for index in range(start, len(text)):
+        char = text[index]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append(char)
+            # Inside nested containers, cutting at the opening would leave an empty value
+            if len(stack) == 1:
+                cut_points.append((index + 1, char))
+        elif char in "}]":
+            if not stack or CLOSERS[stack[-1]] != char:
+                return index + 1, cut_points, False
+            stack.pop()
+            if not stack:
+                return index + 1, cut_points, True
+            cut_points.append((index + 1, "".join(stack)))
+        elif char == ",":
+            cut_points.append((index, "".join(stack)))
+    return len(text), cut_points, False
+
+
+def _close(open_containers: str) -> str:
+    return "".join(CLOSERS[char] for char in reversed(open_containers))
+
+
+def _repair(text: str, start: int, cut_points: List[Tuple[int, str]]) -> Optional[Dict[str, Any]]:
+    """Parse a truncated object by cutting back to a complete element and closing what is open"""
+    for index, open_containers in reversed(cut_points[-MAX_REPAIR_ATTEMPTS:]):
+        data = _try_loads(text[start:index].rstrip().rstrip(",") + _close(open_containers))
+        if data is not None:
+            return data
+    return None
+
+
+def recovered_fields(data: Dict[str, Any]) -> List[str]:
+    """Field names in a parsed response: extracted_fields, schema fields or top-level keys"""
+    for key in ("extracted_fields", "fields", "field_confidence", "extraction_strategy"):
+        if isinstance(data.get(key), dict):
+            return list(data[key])
+    return list(data)
+
+
+def parse_json_response(text: str) -> ParseResult:
+    """Parse the JSON object in a model response, repairing it if it was cut off"""
+    data = _try_loads(text)
+    if data is not None:
+        return ParseResult(data, "direct", [])
+
+    start = text.find("{")
+    for _ in range(MAX_CANDIDATES):
+        if start == -1:
+            break
+        end, cut_points, closed = _scan(text, start)
+        if closed:
+            data = _try_loads(text[start:end])
+            if data is not None:
+                return ParseResult(data, "embedded", [])
+        elif end == len(text):
+            # Reached the end of the text with containers still open: truncated
+            data = _repair(text, start, cut_points)
+            if data:
+                return ParseResult(data, "repaired", recovered_fields(data))
+            break
+        start = text.find("{", start + 1)
+    return ParseResult(None, "failed", [])
@@ -0,0 +1,234 @@
+"""
+LLM cassette service - records provider interactions and replays them offline
+
+LLM_CASSETTE_MODE=record saves every provider call made by make_ai_request_with_retry
+(prompt hash, image hash, model -> raw response text, usage, latency, or the error it
+raised) to a SQLite cassette with zlib-compressed responses. Prompts and images are
+stored only as hashes.
+
+LLM_CASSETTE_MODE=replay serves calls from the cassette instead of the provider, after
+the recorded latency times LLM_CASSETTE_LATENCY_SCALE, so recorded traffic can be
+replayed against a new build: throughput, parsing and retry behaviour are reproduced
+exactly. Calls matching several recordings cycle through them in recording order.
+LLM_CASSETTE_MATCH=prompt ignores the image hash, which lets synthetic documents (for
+example the load test corpus) replay recorded responses and latencies.
+"""
+
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from config import settings
+from services.mock_provider import MockResponse, MockUsage, prompt_text
+
+logger = logging.getLogger(__name__)
+
+OFF = "off"
+RECORD = "record"
+REPLAY = "replay"
+
+
+class CassetteMiss(LookupError):
+    """No recording matches a call in replay mode"""
+
+
+def _replayed_error(error_type: str, message: str) -> Exception:
+    """Rebuild a recorded provider error under its original class name (classify_provider_error uses it)"""
+    return type(error_type, (Exception,), {})(message)
+
+
+def interaction_key(model: str, messages: List[Dict[str, Any]]) -> Tuple[str, str]:
+    """Hashes of the prompt text and of the image sent with it"""
+    text, _ = prompt_text(messages)
+    content = messages[-1].get("content") if messages else None
+    images = [
+        part["image_url"]["url"] for part in content if part.get("type") == "image_url"
+    ] if isinstance(content, list) else []
+    prompt_hash = hashlib.sha256(text.encode()).hexdigest()
+    image_hash = hashlib.sha256("".join(images).encode()).hexdigest() if images else ""
+    return prompt_hash, image_hash
+
+
+class LLMCassette:
+    """Cassette store and the completion functions that record to or replay from it"""
+
+    def __init__(self, path: str, mode: str = OFF, latency_scale: float = 1.0, match: str = "exact"):
+        self.path = Path(path)
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.match = match
+        self._lock = threading.Lock()
+        # Replay index: match key -> recordings in order, and the next one to serve
+        self._index: Optional[Dict[tuple, List[Dict[str, Any]]]] = None
+        self._positions: Dict[tuple, int] = defaultdict(int)
+
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+        self.record_errors = 0
+
+        if self.mode != OFF:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._init_table()
+            logger.info(f"LLM cassette in {self.mode} mode: {self.path}")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_table(self):
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS interactions (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    recorded_at REAL NOT NULL,
+                    model TEXT NOT NULL,
+                    prompt_hash TEXT NOT NULL,
+                    image_hash TEXT NOT NULL,
+                    latency REAL NOT NULL,
+                    response BLOB,          -- zlib-compressed response text
+                    response_model TEXT,
+                    usage TEXT,             -- JSON string
+                    error_type TEXT,        -- exception class name for failed calls
+                    error_message TEXT
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_interactions_key
+                ON interactions(prompt_hash, model, image_hash)
+            """)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def wrap(self, completion_fn: Callable[..., Any]) -> Callable[..., Any]:
+        """The completion function to call in the current mode"""
+        if self.mode == RECORD:
+            return lambda **kwargs: self._record_call(completion_fn, **kwargs)
+        if self.mode == REPLAY:
+            return self.replay_completion
+        return completion_fn
+
+    def _record_call(self, completion_fn: Callable[..., Any], model: str, messages: List[Dict[str, Any]], **kwargs) -> Any:
+        """Call the provider and record the outcome (runs in the worker thread, off the event loop)"""
+        start = time.perf_counter()
+        try:
+            response = completion_fn(model=model, messages=messages, **kwargs)
+        except Exception as e:
+            self._save(model, messages, time.perf_counter() - start, error=e)
+            raise
+        self._save(model, messages, time.perf_counter() - start, response=response)
+        return response
+
+    def _save(self, model: str, messages: List[Dict[str, Any]], latency: float, response: Any = None,
+              error: Optional[Exception] = None):
+        prompt_hash, image_hash = interaction_key(model, messages)
+        if response is not None:
+            usage = response.usage.dict() if getattr(response, "usage", None) else {}
+            row = (
+                zlib.compress((response.choices[0].message.content or "").encode()),
+                getattr(response, "model", model), json.dumps(usage), None, None
+            )
+        else:
+            row = (None, None, None, type(error).__name__, str(error)[:2000])
+        try:
+            conn = self._connect()
+            try:
+                conn.execute("""
+                    INSERT INTO interactions
+                    (recorded_at, model, prompt_hash, image_hash, latency, response, response_model, usage, error_type, error_message)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (time.time(), model, prompt_hash, image_hash, latency, *row))
+                conn.commit()
+            finally:
+                conn.close()
+            with self._lock:
+                self.recorded += 1
+        except sqlite3.Error as e:
+            with self._lock:
+                self.record_errors += 1
+            logger.error(f"Failed to record LLM interaction: {e}")
+
+    def _match_key(self, model: str, prompt_hash: str, image_hash: str) -> tuple:
+        return (prompt_hash, model) if self.match == "prompt" else (prompt_hash, model, image_hash)
+
+    def _load_index(self) -> Dict[tuple, List[Dict[str, Any]]]:
+        index: Dict[tuple, List[Dict[str, Any]]] = defaultdict(list)
+        for entry in self.iter_entries():
+            index[self._match_key(entry["model"], entry["prompt_hash"], entry["image_hash"])].append(entry)
+        logger.info(f"Loaded {sum(len(v) for v in index.values())} LLM recordings for replay")
+        return index
+
+    def replay_completion(self, model: str, messages: List[Dict[str, Any]], **kwargs) -> Any:
+        """Drop-in for litellm.completion that serves the next matching recording"""
+        prompt_hash, image_hash = interaction_key(model, messages)
+        key = self._match_key(model, prompt_hash, image_hash)
+        with self._lock:
+            if self._index is None:
+                self._index = self._load_index()
+            recordings = self._index.get(key)
+            if not recordings:
+                self.misses += 1
+                entry = None
+            else:
+                entry = recordings[self._positions[key] % len(recordings)]
+                self._positions[key] += 1
+                self.replayed += 1
+        if entry is None:
+            raise CassetteMiss(f"No recorded response for model {model} and prompt {prompt_hash[:12]}")
+
+        if self.latency_scale > 0:
+            time.sleep(entry["latency"] * self.latency_scale)
+        if entry["error_type"]:
+            raise _replayed_error(entry["error_type"], entry["error_message"])
+        usage = entry["usage"]
+        return MockResponse(
+            entry["response_model"] or model,
+            entry["response"],
+            MockUsage(usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)) if usage else None
+        )
+
+    def iter_entries(self) -> Iterator[Dict[str, Any]]:
+        """All recordings in recording order, with decompressed responses"""
+        conn = self._connect()
+        try:
+            for row in conn.execute("SELECT * FROM interactions ORDER BY seq"):
+                entry = dict(row)
+                entry["response"] = zlib.decompress(entry["response"]).decode() if entry["response"] is not None else None
+                entry["usage"] = json.loads(entry["usage"]) if entry["usage"] else {}
+                yield entry
+        finally:
+            conn.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cassette statistics"""
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "path": str(self.path) if self.mode != OFF else None,
+                "match": self.match,
+                "latency_scale": self.latency_scale,
+                "recorded": self.recorded,
+                "record_errors": self.record_errors,
+                "replayed": self.replayed,
+                "misses": self.misses
+            }
+
+
+# Global LLM cassette instance
+llm_cassette = LLMCassette(
+    path=settings.ai.llm_cassette_path,
+    mode=settings.ai.llm_cassette_mode,
+    latency_scale=settings.ai.llm_cassette_latency_scale,
+    match=settings.ai.llm_cassette_match
+)
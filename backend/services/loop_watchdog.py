@@ -0,0 +1,228 @@
+"""
+Loop watchdog service - detects callbacks that block the event loop
+
+A background thread schedules a heartbeat on the event loop and waits for it. If the
+heartbeat has not run within the threshold, some callback is holding the loop: the
+watchdog samples the loop thread's stack, looks up the request being handled and
+aggregates the blocking location into a report (see /api/admin/slow-callbacks).
+Unlike asyncio debug mode this costs one thread wake-up per interval and nothing per callback.
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+import weakref
+from collections import Counter, deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Frames from this directory (and not from installed packages) are application code
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _is_app_frame(filename: str) -> bool:
+    return filename.startswith(APP_ROOT) and "site-packages" not in filename
+
+
+def _format_frame(frame: traceback.FrameSummary) -> str:
+    """Format a frame as path:line in function (paths relative to the backend for app code)"""
+    path = os.path.relpath(frame.filename, APP_ROOT) if _is_app_frame(frame.filename) else frame.filename
+    return f"{path}:{frame.lineno} in {frame.name}"
+
+
+class SlowCallbackOffender:
+    """Aggregated blocking events sharing the same location"""
+
+    __slots__ = ("location", "blocking_call", "count", "total_seconds", "max_seconds", "routes", "last_request_id", "last_seen", "stack")
+
+    def __init__(self, location: str, blocking_call: str, stack: List[str]):
+        self.location = location
+        self.blocking_call = blocking_call
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.routes: Counter = Counter()
+        self.last_request_id: Optional[str] = None
+        self.last_seen: Optional[float] = None
+        self.stack = stack
+
+
+class LoopWatchdog:
+    """Watches one event loop from a daemon thread"""
+
+    def __init__(self, threshold_ms: float = 100, max_offenders: int = 200, stack_depth: int = 15):
+        self.threshold = threshold_ms / 1000
+        self.max_offenders = max_offenders
+        self.stack_depth = stack_depth
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+        # Request scope of each task handling a request, for tagging events
+        self._task_scopes: "weakref.WeakKeyDictionary[asyncio.Task, dict]" = weakref.WeakKeyDictionary()
+
+        self._offenders: Dict[Tuple[str, str], SlowCallbackOffender] = {}
+        self._recent: deque = deque(maxlen=50)
+        self.events = 0
+        self.blocked_seconds = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        """Start watching a loop (call from the loop's own thread)"""
+        if self.running:
+            return
+        self._loop = loop
+        self._loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        logger.info(f"Slow callback detection enabled (threshold {self.threshold * 1000:.0f}ms)")
+
+    def stop(self):
+        """Stop the watchdog thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=max(1.0, self.threshold * 2))
+            self._thread = None
+
+    def track_request(self, scope: dict):
+        """Associate the current task with a request scope (call from request handling code)"""
+        if not self.running:
+            return
+        task = asyncio.current_task()
+        if task is not None:
+            self._task_scopes[task] = scope
+
+    def _run(self):
+        while not self._stop.is_set():
+            beat = threading.Event()
+            sent_at = time.perf_counter()
+            try:
+                self._loop.call_soon_threadsafe(beat.set)
+            except RuntimeError:
+                # Loop closed
+                return
+
+            if beat.wait(self.threshold):
+                self._stop.wait(self.threshold)
+                continue
+
+            # The heartbeat is overdue: sample what the loop thread is running right now
+            sample = self._sample()
+            while not beat.wait(self.threshold) and not self._stop.is_set():
+                pass
+            if sample is not None:
+                self._record(sample, time.perf_counter() - sent_at)
+
+    def _sample(self) -> Optional[Dict[str, Any]]:
+        """Capture the loop thread's stack and the request its current task is handling"""
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return None
+        frames = traceback.extract_stack(frame)
+        del frame
+
+        try:
+            task = asyncio.current_task(self._loop)
+        except RuntimeError:
+            task = None
+        scope = self._task_scopes.get(task) if task is not None else None
+        route = scope.get("route") if scope else None
+
+        return {
+            "frames": frames,
+            "request_id": scope.get("state", {}).get("request_id") if scope else None,
+            "route": getattr(route, "path", None) or (scope.get("path") if scope else None)
+        }
+
+    def _record(self, sample: Dict[str, Any], duration: float):
+        """Aggregate a blocking event under its innermost application frame"""
+        frames = sample["frames"]
+        app_frames = [f for f in frames if _is_app_frame(f.filename)]
+        innermost = frames[-1]
+        location = _format_frame(app_frames[-1] if app_frames else innermost)
+        blocking_call = f"{os.path.basename(innermost.filename)}:{innermost.name}"
+        stack = [_format_frame(frame) for frame in frames[-self.stack_depth:]]
+        now = time.time()
+
+        with self._lock:
+            self.events += 1
+            self.blocked_seconds += duration
+            key = (location, blocking_call)
+            offender = self._offenders.get(key)
+            if offender is None:
+                if len(self._offenders) >= self.max_offenders:
+                    # Make room by dropping the offender with the least blocked time
+                    del self._offenders[min(self._offenders, key=lambda k: self._offenders[k].total_seconds)]
+                offender = self._offenders[key] = SlowCallbackOffender(location, blocking_call, stack)
+            offender.count += 1
+            offender.total_seconds += duration
+            offender.max_seconds = max(offender.max_seconds, duration)
+            offender.routes[sample["route"] or "unknown"] += 1
+            offender.last_request_id = sample["request_id"]
+            offender.last_seen = now
+            offender.stack = stack
+            self._recent.append({
+                "timestamp": now,
+                "duration_seconds": round(duration, 4),
+                "location": location,
+                "blocking_call": blocking_call,
+                "request_id": sample["request_id"],
+                "route": sample["route"]
+            })
+
+        logger.warning(
+            f"Event loop blocked for {duration * 1000:.0f}ms at {location} ({blocking_call}), "
+            f"route {sample['route'] or 'unknown'}, request {sample['request_id'] or '-'}"
+        )
+
+    def get_report(self, limit: int = 20) -> Dict[str, Any]:
+        """Top offenders by total blocked time, plus the most recent events"""
+        with self._lock:
+            offenders = sorted(self._offenders.values(), key=lambda o: o.total_seconds, reverse=True)[:limit]
+            return {
+                "enabled": self.running,
+                "threshold_ms": self.threshold * 1000,
+                "events": self.events,
+                "blocked_seconds": round(self.blocked_seconds, 4),
+                "offenders": [
+                    {
+                        "location": o.location,
+                        "blocking_call": o.blocking_call,
+                        "count": o.count,
+                        "total_seconds": round(o.total_seconds, 4),
+                        "max_seconds": round(o.max_seconds, 4),
+                        "routes": dict(o.routes.most_common()),
+                        "last_request_id": o.last_request_id,
+                        "last_seen": o.last_seen,
+                        "stack": o.stack
+                    }
+                    for o in offenders
+                ],
+                "recent": list(self._recent)
+            }
+
+    def reset(self):
+        """Clear collected events"""
+        with self._lock:
+            self._offenders.clear()
+            self._recent.clear()
+            self.events = 0
+            self.blocked_seconds = 0.0
+
+
+# Global loop watchdog instance (started in the application lifespan when enabled)
+loop_watchdog = LoopWatchdog(threshold_ms=settings.monitoring.slow_callback_threshold_ms)
@@ -0,0 +1,224 @@
+"""
+Metrics service - Prometheus metrics and per-stage timing helpers
+
+When PROMETHEUS_MULTIPROC_DIR is set (it must be set before the process starts),
+prometheus_client keeps values in per-process files and /metrics aggregates every
+uvicorn worker through the multiprocess collector.
+"""
+
+import os
+import time
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from opentelemetry.trace import Span
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess
+)
+
+from services.tracing import span
+
+logger = logging.getLogger(__name__)
+
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# Latency buckets from sub-millisecond cache hits up to multi-step AI generation
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+# Payload buckets from small JSON bodies up to the upload limit
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 10485760, 26214400)
+
+# HTTP
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS
+)
+HTTP_REQUEST_SIZE = Histogram(
+    "http_request_size_bytes", "HTTP request body size by route",
+    ["method", "route"], buckets=SIZE_BUCKETS
+)
+HTTP_RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes", "HTTP response body size by route",
+    ["method", "route"], buckets=SIZE_BUCKETS
+)
+
+# Request processing stages (validation, render, encode, ai_call, parse, db)
+STAGE_DURATION = Histogram(
+    "stage_duration_seconds", "Time spent in each request processing stage",
+    ["stage"], buckets=LATENCY_BUCKETS
+)
+
+# AI provider calls
+AI_IN_FLIGHT = Gauge(
+    "ai_requests_in_flight", "AI provider calls currently running", multiprocess_mode="livesum"
+)
+AI_QUEUE_DEPTH = Gauge(
+    "ai_requests_queued", "AI provider calls waiting for an admission slot", multiprocess_mode="livesum"
+)
+AI_QUEUE_WAIT = Histogram(
+    "ai_queue_wait_seconds", "Time AI provider calls waited for an admission slot", buckets=LATENCY_BUCKETS
+)
+AI_PROVIDER_ERRORS = Counter(
+    "ai_provider_errors_total", "AI provider call failures by error type", ["provider", "error_type"]
+)
+AI_TOKENS = Counter(
+    "ai_tokens_total", "Tokens used by AI provider calls", ["model", "kind"]
+)
+AI_PAYLOAD_SIZE = Histogram(
+    "ai_request_payload_bytes", "Prompt plus encoded image size sent to the AI provider", buckets=SIZE_BUCKETS
+)
+AI_RESPONSE_PARSE = Counter(
+    "ai_response_parse_total", "AI responses by how their JSON was parsed (direct, embedded, repaired, failed)", ["method"]
+)
+
+# Caches (hit ratio = hits / (hits + misses))
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Cache lookups by cache and result", ["cache", "result"]
+)
+
+# Runtime
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds", "Delay of the event loop ticker beyond its scheduled wake-up", buckets=LATENCY_BUCKETS
+)
+
+
+class Ewma:
+    """Exponentially weighted moving average (alpha is the weight of the newest sample)"""
+
+    __slots__ = ("alpha", "value", "count")
+
+    def __init__(self, alpha: float = 0.2):
+        self.alpha = alpha
+        self.value: Optional[float] = None
+        self.count = 0
+
+    def add(self, sample: float):
+        self.value = sample if self.value is None else self.alpha * sample + (1 - self.alpha) * self.value
+        self.count += 1
+
+
+class StageTimer:
+    """
+    Accumulated time per stage for a single request
+    Stages that run more than once (e.g. one AI call per generation step) are summed
+    """
+
+    __slots__ = ("started_at", "durations")
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.durations: Dict[str, float] = {}
+
+    def add(self, name: str, seconds: float):
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+    def as_dict(self) -> Dict[str, float]:
+        """Stage durations in seconds, in the order stages first ran"""
+        return {name: round(seconds, 4) for name, seconds in self.durations.items()}
+
+    def server_timing(self) -> str:
+        """Format as a Server-Timing header value (durations in milliseconds)"""
+        entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.durations.items()]
+        entries.append(f"total;dur={(time.perf_counter() - self.started_at) * 1000:.1f}")
+        return ", ".join(entries)
+
+
+# Timer of the request being handled, set by the Server-Timing middleware
+_current_timer: ContextVar[Optional[StageTimer]] = ContextVar("stage_timer", default=None)
+
+
+def start_stage_timer() -> StageTimer:
+    """Start a timer for the current request and make it the target of stage()"""
+    timer = StageTimer()
+    _current_timer.set(timer)
+    return timer
+
+
+def get_stage_timer(request: Any) -> StageTimer:
+    """Get the timer attached to request.state (a detached one if there is none)"""
+    return getattr(request.state, "stage_timer", None) or StageTimer()
+
+
+# Optional callback run at the start of every stage, returning a callback for its end
+# (set by the memory profiler while it collects per-stage peaks)
+_stage_hook: Optional[Callable[[str], Callable[[], None]]] = None
+
+
+def set_stage_hook(hook: Optional[Callable[[str], Callable[[], None]]]):
+    """Install or remove the stage hook"""
+    global _stage_hook
+    _stage_hook = hook
+
+
+def record_stage(name: str, seconds: float):
+    """Record a stage duration in the histogram and the current request's timer"""
+    STAGE_DURATION.labels(name).observe(seconds)
+    timer = _current_timer.get()
+    if timer is not None:
+        timer.add(name, seconds)
+
+
+@contextmanager
+def stage(
+    name: str,
+    span_name: Optional[str] = None,
+    attributes: Optional[Dict[str, Any]] = None
+) -> Iterator[Optional[Span]]:
+    """
+    Time a processing stage into the stage_duration_seconds histogram and the
+    request's StageTimer, inside a tracing span (named span_name, defaulting to the stage name)
+    Usable as a context manager (also around awaits) or as a decorator
+    Yields the span, or None when tracing is disabled
+    """
+    on_exit = _stage_hook(name) if _stage_hook is not None else None
+    start = time.perf_counter()
+    try:
+        with span(span_name or name, attributes) as current:
+            yield current
+    finally:
+        record_stage(name, time.perf_counter() - start)
+        if on_exit is not None:
+            on_exit()
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    """Count a cache hit or miss"""
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def record_token_usage(model: str, usage: Optional[dict]):
+    """Count prompt and completion tokens reported by a provider"""
+    if not usage:
+        return
+    for kind in ("prompt_tokens", "completion_tokens"):
+        count = usage.get(kind)
+        if count:
+            AI_TOKENS.labels(model, kind.removesuffix("_tokens")).inc(count)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """
+    Render metrics in the Prometheus text format
+    Returns: (body, content_type)
+    """
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead():
+    """Drop this worker's live gauges from the multiprocess files on shutdown"""
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
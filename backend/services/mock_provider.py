@@ -0,0 +1,367 @@
+"""
+Mock provider service - offline stand-in for the AI providers
+
+Enabled with ENABLE_MOCK_PROVIDER=true, which registers "mock_*" model ids next to the
+real providers. Calls go through make_ai_request_with_retry like any other model
+(admission queue, timeout, retries, circuit breaker, metrics), but the completion is
+generated locally: schema-shaped JSON for extraction and for each schema generation
+step, after a simulated latency, with configurable error and rate limit rates.
+"""
+
+import re
+import json
+import time
+import random
+import logging
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+MOCK_PROVIDER = "mock"
+
+# Model id -> latency profile ("default" uses the MOCK_LATENCY_* settings)
+MOCK_MODELS = {
+    "Mock (configured latency)": "default",
+    "Mock (no latency)": "instant"
+}
+
+# Fields reported by the mock when the prompt does not name any
+DEFAULT_FIELDS = {
+    "document_number": "text",
+    "full_name": "text",
+    "date_of_birth": "date",
+    "issue_date": "date",
+    "expiry_date": "date",
+    "nationality": "text",
+    "email": "email",
+    "phone": "phone"
+}
+
+SAMPLE_VALUES = {
+    "text": "SAMPLE",
+    "number": 42,
+    "date": "2024-01-15",
+    "email": "jane.doe@example.com",
+    "phone": "+1 555 0100",
+    "url": "https://example.com",
+    "boolean": True
+}
+
+# Roughly what providers charge for one document image
+IMAGE_TOKENS = 765
+
+_rng = random.Random(settings.ai.mock_seed)
+_rng_lock = threading.Lock()
+
+
+class MockRateLimitError(Exception):
+    """Simulated HTTP 429 (classified as rate_limit)"""
+
+
+class MockServiceUnavailableError(Exception):
+    """Simulated HTTP 503 (classified as unavailable)"""
+
+
+class MockUsage:
+    def __init__(self, prompt_tokens: int, completion_tokens: int):
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.total_tokens = prompt_tokens + completion_tokens
+
+    def dict(self) -> Dict[str, int]:
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.total_tokens
+        }
+
+
+class MockMessage:
+    def __init__(self, content: str):
+        self.role = "assistant"
+        self.content = content
+
+
+class MockChoice:
+    def __init__(self, content: str):
+        self.index = 0
+        self.message = MockMessage(content)
+        self.delta = self.message
+        self.finish_reason = "stop"
+
+
+class MockResponse:
+    """The parts of a LiteLLM ModelResponse the AI service reads"""
+
+    def __init__(self, model: str, content: str, usage: Optional[MockUsage]):
+        self.id = f"mock-{time.time_ns()}"
+        self.model = model
+        self.choices = [MockChoice(content)]
+        self.usage = usage
+
+
+def register_mock_models(provider_options: Dict[str, str], model_options: Dict[str, Dict[str, str]]):
+    """Add the mock provider to the provider/model tables when it is enabled"""
+    if settings.ai.enable_mock_provider:
+        provider_options["Mock"] = MOCK_PROVIDER
+        model_options[MOCK_PROVIDER] = dict(MOCK_MODELS)
+
+
+def sample_latency(model: str) -> float:
+    """Draw a latency in seconds from the configured distribution"""
+    if model == "instant":
+        return 0.0
+    median = settings.ai.mock_latency_ms / 1000
+    spread = settings.ai.mock_latency_spread
+    with _rng_lock:
+        if settings.ai.mock_latency_distribution == "fixed":
+            return median
+        if settings.ai.mock_latency_distribution == "uniform":
+            return _rng.uniform(median * (1 - spread), median * (1 + spread))
+        # Log-normal: median latency with a long right tail, like real provider calls
+        return _rng.lognormvariate(0, spread) * median
+
+
+def sample_failure() -> Optional[Exception]:
+    """Decide whether this call fails, using the configured error and rate limit rates"""
+    with _rng_lock:
+        roll = _rng.random()
+    if roll < settings.ai.mock_rate_limit_rate:
+        return MockRateLimitError("Mock provider rate limit exceeded (429)")
+    if roll < settings.ai.mock_rate_limit_rate + settings.ai.mock_error_rate:
+        return MockServiceUnavailableError("Mock provider unavailable (503)")
+    return None
+
+
+def _embedded_json(prompt: str, marker: str) -> Optional[Dict[str, Any]]:
+    """Read the JSON object that follows a marker line in a prompt"""
+    index = prompt.find(marker)
+    if index == -1:
+        return None
+    start = prompt.find("{", index)
+    if start == -1:
+        return None
+    try:
+        value, _ = json.JSONDecoder().raw_decode(prompt, start)
+    except ValueError:
+        return None
+    return value if isinstance(value, dict) else None
+
+
+def _field_types(schema: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """Field name -> type from a schema dict, or the default fields"""
+    fields = (schema or {}).get("fields")
+    if isinstance(fields, dict) and fields:
+        return {
+            name: (info.get("type", "text") if isinstance(info, dict) else "text")
+            for name, info in fields.items()
+        }
+    return dict(DEFAULT_FIELDS)
+
+
+def _prompt_field_types(prompt: str) -> Dict[str, str]:
+    """Field list of an extraction prompt ("- name (type): description" lines)"""
+    fields = dict(re.findall(r"^- (\w+) \((\w+)\):", prompt, re.MULTILINE))
+    return fields or dict(DEFAULT_FIELDS)
+
+
+def _extraction(prompt: str) -> Dict[str, Any]:
+    fields = _prompt_field_types(prompt)
+    return {
+        "document_verification": {
+            "document_type_confidence": 95,
+            "expected_document_type": "mock_document",
+            "detected_document_type": "mock_document",
+            "authenticity_score": 90,
+            "tampering_indicators": {
+                "photo_manipulation": False,
+                "text_alterations": False,
+                "structural_anomalies": False,
+                "digital_artifacts": False,
+                "font_inconsistencies": False
+            },
+            "security_checks": {
+                "mrz_checksum_valid": True,
+                "field_consistency": True,
+                "date_logic_valid": True,
+                "format_compliance": True
+            },
+            "verification_notes": ["Generated by the mock provider"],
+            "risk_level": "low"
+        },
+        "extracted_fields": {
+            name: {
+                "value": SAMPLE_VALUES.get(field_type, "SAMPLE") if field_type != "text" else f"SAMPLE {name.upper()}",
+                "confidence": 90,
+                "extraction_notes": ""
+            }
+            for name, field_type in fields.items()
+        },
+        "overall_confidence": 90,
+        "document_quality": "high",
+        "extraction_issues": []
+    }
+
+
+def _initial_detection() -> Dict[str, Any]:
+    return {
+        "document_type": "Mock Document",
+        "layout_analysis": "Single page with labelled fields",
+        "fields": {
+            name: {
+                "type": field_type,
+                "location": "body",
+                "content_preview": str(SAMPLE_VALUES.get(field_type, "SAMPLE"))
+            }
+            for name, field_type in DEFAULT_FIELDS.items()
+        }
+    }
+
+
+def _review(prompt: str) -> Dict[str, Any]:
+    initial = _embedded_json(prompt, "Initial Schema:")
+    document_type = (initial or {}).get("document_type", "Mock Document")
+    return {
+        "id": re.sub(r"\W+", "_", document_type.lower()).strip("_"),
+        "name": document_type,
+        "description": f"Schema for {document_type} documents",
+        "category": "Other",
+        "fields": {
+            name: {
+                "type": field_type,
+                "required": index < 3,
+                "description": f"The {name.replace('_', ' ')} shown on the document"
+            }
+            for index, (name, field_type) in enumerate(_field_types(initial).items())
+        },
+        "changes_made": []
+    }
+
+
+def _confidence(prompt: str) -> Dict[str, Any]:
+    schema = _embedded_json(prompt, "Refined Schema:")
+    return {
+        "overall_confidence": 88,
+        "document_quality": "high",
+        "extraction_difficulty": "easy",
+        "field_confidence": {
+            name: {
+                "confidence_score": 90,
+                "legibility": "high",
+                "potential_issues": [],
+                "extraction_notes": ""
+            }
+            for name in _field_types(schema)
+        }
+    }
+
+
+def _hints(prompt: str) -> Dict[str, Any]:
+    schema = _embedded_json(prompt, "Schema:")
+    return {
+        "extraction_strategy": {
+            name: {
+                "extraction_hints": [f"Look for the label '{name.replace('_', ' ').title()}'"],
+                "validation_pattern": r"^\d{4}-\d{2}-\d{2}$" if field_type == "date" else "",
+                "common_formats": [str(SAMPLE_VALUES.get(field_type, "SAMPLE"))],
+                "fallback_strategy": "Leave empty with low confidence",
+                "positioning_hints": "Next to its label"
+            }
+            for name, field_type in _field_types(schema).items()
+        },
+        "document_specific_notes": ["Generated by the mock provider"],
+        "quality_recommendations": []
+    }
+
+
+def _single_pass() -> Dict[str, Any]:
+    """Steps 1-4 combined, with the fields as a list"""
+    refined = _review("")
+    hints = _hints("")
+    fields = []
+    for name, field in refined["fields"].items():
+        strategy = hints["extraction_strategy"].get(name, {})
+        fields.append({
+            "name": name,
+            **field,
+            "confidence_score": 90,
+            "legibility": "high",
+            "potential_issues": [],
+            "extraction_hints": strategy.get("extraction_hints", []),
+            "validation_pattern": strategy.get("validation_pattern", ""),
+            "positioning_hints": strategy.get("positioning_hints", "")
+        })
+    return {
+        "document_type": refined["name"],
+        "id": refined["id"],
+        "name": refined["name"],
+        "description": refined["description"],
+        "category": refined["category"],
+        "overall_confidence": 88,
+        "document_quality": "high",
+        "extraction_difficulty": "easy",
+        "fields": fields,
+        "document_specific_notes": hints["document_specific_notes"],
+        "quality_recommendations": hints["quality_recommendations"]
+    }
+
+
+def generate_content(prompt: str) -> str:
+    """Build the JSON answer the prompt asks for"""
+    if prompt.startswith("SINGLE-PASS SCHEMA GENERATION"):
+        data = _single_pass()
+    elif prompt.startswith("STEP 1:"):
+        data = _initial_detection()
+    elif prompt.startswith("STEP 2:"):
+        data = _review(prompt)
+    elif prompt.startswith("STEP 3:"):
+        data = _confidence(prompt)
+    elif prompt.startswith("STEP 4:"):
+        data = _hints(prompt)
+    else:
+        data = _extraction(prompt)
+    return json.dumps(data)
+
+
+def prompt_text(messages: List[Dict[str, Any]]) -> Tuple[str, int]:
+    """Text of the last user message and the number of images it carries"""
+    content = messages[-1].get("content", "") if messages else ""
+    if isinstance(content, str):
+        return content, 0
+    text = "\n".join(part.get("text", "") for part in content if part.get("type") == "text")
+    images = sum(1 for part in content if part.get("type") == "image_url")
+    return text, images
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)"""
+    return max(1, len(text) // 4)
+
+
+def stream_chunks(model: str, content: str, chunk_size: int = 64) -> Iterator[MockResponse]:
+    """Split a completion into streaming chunks (message text in choices[0].delta.content)"""
+    for start in range(0, len(content), chunk_size):
+        yield MockResponse(model, content[start:start + chunk_size], None)
+
+
+def mock_completion(model: str, messages: List[Dict[str, Any]], stream: bool = False, **kwargs) -> Any:
+    """
+    Drop-in for litellm.completion (blocking, meant to run in a worker thread)
+    Raises MockRateLimitError / MockServiceUnavailableError at the configured rates
+    """
+    model_id = model.split("/", 1)[-1]
+    time.sleep(sample_latency(model_id))
+
+    failure = sample_failure()
+    if failure is not None:
+        raise failure
+
+    prompt, images = prompt_text(messages)
+    content = generate_content(prompt)
+    if stream:
+        return stream_chunks(model, content)
+    usage = MockUsage(estimate_tokens(prompt) + images * IMAGE_TOKENS, estimate_tokens(content))
+    return MockResponse(model, content, usage)
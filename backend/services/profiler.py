@@ -0,0 +1,314 @@
+"""
+Profiler service - on-demand sampling profiler and allocation tracking
+
+Both tools are idle unless an admin endpoint arms them: the request hook is a single
+attribute check, and tracemalloc is only running while a memory session collects data.
+
+- CPU: a thread samples every thread's stack with sys._current_frames() and counts
+  collapsed stacks ("thread;outer;...;inner count", the flamegraph.pl input format),
+  either for a fixed time or while the next N requests to a route are in flight.
+- Memory: tracemalloc snapshots are taken before and after the next N requests to a
+  route, with peak traced memory recorded for each pipeline stage in between.
+"""
+
+import os
+import re
+import sys
+import time
+import asyncio
+import logging
+import threading
+import tracemalloc
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+from starlette.routing import compile_path
+
+from services.loop_watchdog import APP_ROOT
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+MAX_PROFILE_SECONDS = 60
+
+# Leaf frames of threads that are waiting for work rather than running it
+IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker")
+}
+
+
+def _short_path(filename: str) -> str:
+    """Shorten a source path to backend- or package-relative form"""
+    if filename.startswith(APP_ROOT) and "site-packages" not in filename:
+        return os.path.relpath(filename, APP_ROOT)
+    match = re.search(r"(?:site-packages|lib/python\d+\.\d+)/(.*)$", filename)
+    return match.group(1) if match else filename
+
+
+def _route_matcher(route: str) -> Callable[[str], bool]:
+    """Match request paths against a route template such as /api/schemas/{schema_id}"""
+    regex, _, _ = compile_path(route)
+    return lambda path: regex.match(path) is not None
+
+
+class SamplingProfiler:
+    """Counts collapsed stacks of all non-idle threads at a fixed interval"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+        self._code_labels: Dict[Any, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self.started_at = self.started_at or time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        self.stopped_at = time.perf_counter()
+
+    def _label(self, code) -> str:
+        label = self._code_labels.get(code)
+        if label is None:
+            label = self._code_labels[code] = f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+        return label
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: re.sub(r"[_-]\d+$", "", thread.name) for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                code = frame.f_code
+                if (code.co_filename.rsplit("/", 1)[-1], code.co_name) in IDLE_LEAVES:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(self._label(frame.f_code))
+                    frame = frame.f_back
+                labels.append(names.get(thread_id, "thread"))
+                self.stacks[";".join(reversed(labels))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        """Collapsed stack lines for flamegraph tools"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+    def report(self, top: int = 30) -> Dict[str, Any]:
+        """Sample counts, the hottest leaf functions and the collapsed stacks"""
+        leaves: Counter = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        total = sum(self.stacks.values())
+        end = self.stopped_at if not self.running and self.stopped_at else time.perf_counter()
+        return {
+            "samples": self.samples,
+            "interval_ms": self.interval * 1000,
+            "duration_seconds": round(end - self.started_at, 3) if self.started_at else 0.0,
+            "stack_samples": total,
+            "top_functions": [
+                {"function": leaf, "samples": count, "percent": round(100 * count / total, 1) if total else 0.0}
+                for leaf, count in leaves.most_common(top)
+            ],
+            "collapsed": [f"{stack} {count}" for stack, count in self.stacks.most_common()]
+        }
+
+
+class RequestSession:
+    """Common state for sessions that cover the next N requests to a route"""
+
+    def __init__(self, route: str, count: int):
+        self.route = route
+        self.count = count
+        self.matches = _route_matcher(route)
+        self.started = 0
+        self.completed = 0
+        self.active = 0
+        self.done = False
+
+    def claim(self, path: str) -> bool:
+        """Check if a request belongs to this session and count it in"""
+        if self.done or self.started >= self.count or not self.matches(path):
+            return False
+        self.started += 1
+        self.active += 1
+        return True
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "route": self.route,
+            "requests": self.count,
+            "started": self.started,
+            "completed": self.completed,
+            "done": self.done
+        }
+
+
+class CpuRequestSession(RequestSession):
+    """Sample stacks only while the selected requests are in flight"""
+
+    def __init__(self, route: str, count: int, interval: float):
+        super().__init__(route, count)
+        self.profiler = SamplingProfiler(interval)
+
+    async def before(self):
+        self.profiler.start()
+
+    async def after(self):
+        self.active -= 1
+        self.completed += 1
+        if self.active == 0:
+            self.profiler.stop()
+            self.done = self.completed >= self.count
+
+
+class MemoryRequestSession(RequestSession):
+    """tracemalloc snapshots around the selected requests, with per-stage peaks"""
+
+    def __init__(self, route: str, count: int, frames: int = 10):
+        super().__init__(route, count)
+        self.frames = frames
+        self.tracing = False
+        self.started_tracing = False
+        self.before_snapshot: Optional[tracemalloc.Snapshot] = None
+        self.after_snapshot: Optional[tracemalloc.Snapshot] = None
+        self.baseline_bytes = 0
+        self.peak_bytes = 0
+        self.stage_peaks: Dict[str, Dict[str, int]] = {}
+
+    def _stage_hook(self, name: str) -> Callable[[], None]:
+        """Measure the peak traced memory reached during one stage (via metrics.stage)"""
+        start_current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+
+        def on_exit():
+            _, peak = tracemalloc.get_traced_memory()
+            self.peak_bytes = max(self.peak_bytes, peak)
+            entry = self.stage_peaks.setdefault(name, {"count": 0, "max_peak_bytes": 0, "max_growth_bytes": 0})
+            entry["count"] += 1
+            entry["max_peak_bytes"] = max(entry["max_peak_bytes"], peak)
+            entry["max_growth_bytes"] = max(entry["max_growth_bytes"], peak - start_current)
+
+        return on_exit
+
+    async def before(self):
+        if not self.tracing:
+            self.tracing = True
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.frames)
+                self.started_tracing = True
+            self.before_snapshot = await asyncio.to_thread(tracemalloc.take_snapshot)
+            self.baseline_bytes = tracemalloc.get_traced_memory()[0]
+            metrics.set_stage_hook(self._stage_hook)
+
+    async def after(self):
+        self.active -= 1
+        self.completed += 1
+        self.peak_bytes = max(self.peak_bytes, tracemalloc.get_traced_memory()[1])
+        if self.active == 0 and self.completed >= self.count:
+            metrics.set_stage_hook(None)
+            self.after_snapshot = await asyncio.to_thread(tracemalloc.take_snapshot)
+            if self.started_tracing:
+                tracemalloc.stop()
+            self.done = True
+
+    def report(self, top: int = 20) -> Dict[str, Any]:
+        """Top allocation sites by growth between the snapshots (CPU heavy, run off the loop)"""
+        ignore = (
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            tracemalloc.Filter(False, "<unknown>")
+        )
+        before = self.before_snapshot.filter_traces(ignore)
+        after = self.after_snapshot.filter_traces(ignore)
+        diffs = after.compare_to(before, "lineno")
+        return {
+            **self.status(),
+            "baseline_bytes": self.baseline_bytes,
+            "peak_bytes": self.peak_bytes,
+            "stages": self.stage_peaks,
+            "top_allocations": [
+                {
+                    "location": f"{_short_path(diff.traceback[0].filename)}:{diff.traceback[0].lineno}",
+                    "size_diff_bytes": diff.size_diff,
+                    "count_diff": diff.count_diff,
+                    "size_bytes": diff.size,
+                    "count": diff.count
+                }
+                for diff in diffs[:top]
+            ]
+        }
+
+
+class ProfilerSessions:
+    """The armed CPU and memory sessions of this worker"""
+
+    def __init__(self):
+        self.cpu: Optional[CpuRequestSession] = None
+        self.memory: Optional[MemoryRequestSession] = None
+        # Checked on every request; True only while a session still wants requests
+        self.armed = False
+
+    def _update_armed(self):
+        self.armed = any(
+            session is not None and not session.done and session.started < session.count
+            for session in (self.cpu, self.memory)
+        )
+
+    def arm_cpu(self, route: str, count: int, interval: float) -> CpuRequestSession:
+        if self.cpu is not None and self.cpu.profiler.running:
+            self.cpu.profiler.stop()
+        self.cpu = CpuRequestSession(route, count, interval)
+        self._update_armed()
+        return self.cpu
+
+    def arm_memory(self, route: str, count: int) -> MemoryRequestSession:
+        if self.memory is not None and not self.memory.done and self.memory.started:
+            raise RuntimeError("A memory session is already collecting data")
+        self.memory = MemoryRequestSession(route, count)
+        self._update_armed()
+        return self.memory
+
+    def claim(self, path: str) -> List[RequestSession]:
+        """Sessions that a starting request belongs to"""
+        claimed = [session for session in (self.cpu, self.memory) if session is not None and session.claim(path)]
+        self._update_armed()
+        return claimed
+
+
+async def profile_for(seconds: float, interval: float) -> Dict[str, Any]:
+    """Sample all threads for a fixed time"""
+    profiler = SamplingProfiler(interval)
+    profiler.start()
+    try:
+        await asyncio.sleep(min(seconds, MAX_PROFILE_SECONDS))
+    finally:
+        profiler.stop()
+    return profiler.report()
+
+
+# Global profiler sessions instance
+profiler_sessions = ProfilerSessions()
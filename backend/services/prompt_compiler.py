@@ -0,0 +1,50 @@
+"""
+Prompt compiler - compact prompts with a cacheable static prefix
+
+Prompts are compiled from static instructions, identical for every request of a kind,
+followed by the request-specific sections (schema fields, earlier step results).
+Keeping the long instructions as an unchanged prefix lets providers that cache prompt
+prefixes reuse them across requests, and embedded JSON is minified. Token counts
+(services/token_counter.py) are computed when read: the static prefix count once per
+instruction text, the count of a whole prompt only for the benchmark and in debug mode.
+"""
+
+import json
+from functools import cached_property, lru_cache
+from typing import Any
+
+from services.token_counter import count_tokens
+
+
+class CompiledPrompt:
+    """Prompt text with lazily counted tokens"""
+
+    def __init__(self, static: str, dynamic: str = ""):
+        self.text = static + dynamic
+        self.static = static
+        self.dynamic = dynamic
+
+    @property
+    def static_tokens(self) -> int:
+        return _static_tokens(self.static)
+
+    @cached_property
+    def tokens(self) -> int:
+        return self.static_tokens + (count_tokens(self.dynamic) if self.dynamic else 0)
+
+
+def compact_json(data: Any) -> str:
+    """JSON without indentation or spaces after separators"""
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+@lru_cache(maxsize=32)
+def _static_tokens(static: str) -> int:
+    return count_tokens(static)
+
+
+def compile_prompt(static: str, *sections: str) -> CompiledPrompt:
+    """Static instructions first, then the non-empty request-specific sections"""
+    static = static.strip()
+    dynamic = "\n\n".join(section.strip() for section in sections if section and section.strip())
+    return CompiledPrompt(static, "\n\n" + dynamic if dynamic else "")
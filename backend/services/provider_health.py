@@ -0,0 +1,157 @@
+"""
+Provider health service - per-provider latency averages and circuit breakers
+"""
+
+import time
+import logging
+import threading
+from typing import Any, Dict, Iterable, Optional, Set
+
+from config import settings
+from services.metrics import Ewma
+
+logger = logging.getLogger(__name__)
+
+# Error types (from classify_provider_error) that mean the provider itself is failing;
+# client-side errors such as bad requests or auth problems do not trip the breaker
+BREAKER_ERROR_TYPES = {"timeout", "connection", "unavailable", "server_error"}
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class ProviderHealth:
+    """Latency EWMA, error counts and circuit state for one AI provider"""
+
+    def __init__(self, alpha: float):
+        self.latency = Ewma(alpha)
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_started_at: Optional[float] = None
+        self.calls = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+
+
+class ProviderHealthRegistry:
+    """
+    Tracks every provider seen by the AI service
+
+    A provider's circuit opens after failure_threshold consecutive provider failures and
+    rejects calls for reset_seconds. It then lets a single trial call through (half open):
+    success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0, alpha: float = 0.2):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.alpha = alpha
+        self._providers: Dict[str, ProviderHealth] = {}
+        # Providers that get an entry; None tracks every provider seen
+        self._tracked: Optional[Set[str]] = None
+        self._lock = threading.Lock()
+
+    def track(self, providers: Iterable[str]):
+        """Only keep health entries for these providers, so unknown names never add one"""
+        with self._lock:
+            self._tracked = set(providers)
+            for provider in list(self._providers):
+                if provider not in self._tracked:
+                    del self._providers[provider]
+
+    def _get(self, provider: str) -> Optional[ProviderHealth]:
+        """Get or create a provider's entry, None for untracked providers (caller holds the lock)"""
+        health = self._providers.get(provider)
+        if health is None:
+            if self._tracked is not None and provider not in self._tracked:
+                return None
+            health = self._providers[provider] = ProviderHealth(self.alpha)
+        return health
+
+    def allow_request(self, provider: str) -> bool:
+        """Check whether a call to the provider may go ahead"""
+        if self.failure_threshold <= 0:
+            return True
+
+        now = time.monotonic()
+        with self._lock:
+            health = self._get(provider)
+            if health is None or health.state == CLOSED:
+                return True
+            if health.state == OPEN and now - health.opened_at >= self.reset_seconds:
+                health.state = HALF_OPEN
+                logger.info(f"Circuit for {provider} half open, allowing a trial call")
+            # A trial that never reported back (e.g. a cancelled request) is replaced after reset_seconds
+            if health.state == HALF_OPEN and (
+                health.trial_started_at is None or now - health.trial_started_at >= self.reset_seconds
+            ):
+                health.trial_started_at = now
+                return True
+            return False
+
+    def record_success(self, provider: str, latency: float):
+        """Record a completed call and its latency"""
+        with self._lock:
+            health = self._get(provider)
+            if health is None:
+                return
+            health.calls += 1
+            health.latency.add(latency)
+            health.consecutive_failures = 0
+            health.trial_started_at = None
+            if health.state != CLOSED:
+                health.state = CLOSED
+                health.opened_at = None
+                logger.info(f"Circuit for {provider} closed")
+
+    def record_failure(self, provider: str, error_type: str):
+        """Record a failed call; provider failures count towards opening the circuit"""
+        with self._lock:
+            health = self._get(provider)
+            if health is None:
+                return
+            health.calls += 1
+            health.failures += 1
+            health.last_error = error_type
+            health.trial_started_at = None
+            if error_type not in BREAKER_ERROR_TYPES:
+                return
+
+            health.consecutive_failures += 1
+            if self.failure_threshold > 0 and (
+                health.state == HALF_OPEN or health.consecutive_failures >= self.failure_threshold
+            ):
+                if health.state != OPEN:
+                    logger.warning(
+                        f"Circuit for {provider} opened after {health.consecutive_failures} consecutive failures"
+                    )
+                health.state = OPEN
+                health.opened_at = time.monotonic()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-provider statistics"""
+        with self._lock:
+            return {
+                provider: {
+                    "circuit": health.state,
+                    "latency_ewma_seconds": round(health.latency.value, 4) if health.latency.value is not None else None,
+                    "calls": health.calls,
+                    "failures": health.failures,
+                    "consecutive_failures": health.consecutive_failures,
+                    "last_error": health.last_error,
+                    "retry_in_seconds": (
+                        round(max(0.0, self.reset_seconds - (time.monotonic() - health.opened_at)), 1)
+                        if health.state == OPEN else None
+                    )
+                }
+                for provider, health in self._providers.items()
+            }
+
+
+# Global provider health instance
+provider_health = ProviderHealthRegistry(
+    failure_threshold=settings.ai.circuit_breaker_threshold,
+    reset_seconds=settings.ai.circuit_breaker_reset_seconds
+)
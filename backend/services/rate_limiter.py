@@ -0,0 +1,150 @@
+"""
+Rate limiter service - GCRA token-bucket limits with in-memory or Redis-compatible state
+"""
+
+import time
+import logging
+from typing import Dict, Optional, Any, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitResult(NamedTuple):
+    """Outcome of a rate limit check"""
+    allowed: bool
+    retry_after: float  # Seconds until the next request would be allowed (0 when allowed)
+
+
+class InMemoryRateLimitBackend:
+    """
+    Per-process GCRA state
+
+    Each key holds a single float, its theoretical arrival time (TAT). A key whose
+    TAT has passed has a full bucket, so it carries no information and is evicted
+    by a sweep that runs at most once per sweep_interval.
+    """
+
+    def __init__(self, sweep_interval: float = 60.0):
+        self.sweep_interval = sweep_interval
+        self._tat: Dict[str, float] = {}
+        self._next_sweep = time.monotonic() + sweep_interval
+        self.evicted = 0
+
+    async def hit(self, key: str, emission_interval: float, capacity: int) -> RateLimitResult:
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self._sweep(now)
+
+        tat = max(self._tat.get(key, now), now)
+        new_tat = tat + emission_interval
+        allow_at = new_tat - emission_interval * capacity
+        if now < allow_at:
+            return RateLimitResult(False, allow_at - now)
+
+        self._tat[key] = new_tat
+        return RateLimitResult(True, 0.0)
+
+    def _sweep(self, now: float):
+        """Drop keys whose bucket has fully refilled"""
+        idle_keys = [key for key, tat in self._tat.items() if tat <= now]
+        for key in idle_keys:
+            del self._tat[key]
+        self.evicted += len(idle_keys)
+        self._next_sweep = now + self.sweep_interval
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"backend": "memory", "tracked_keys": len(self._tat), "evicted_keys": self.evicted}
+
+
+# GCRA as a Redis script: one key per client holding its TAT, expiring when the bucket is full again
+GCRA_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local emission_interval = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if not tat or tat < now then
+    tat = now
+end
+
+local new_tat = tat + emission_interval
+local allow_at = new_tat - emission_interval * capacity
+if now < allow_at then
+    return {0, tostring(allow_at - now)}
+end
+
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+return {1, '0'}
+"""
+
+
+class RedisRateLimitBackend:
+    """
+    GCRA state shared by all workers through a Redis-protocol server
+
+    Works with any async client exposing eval(script, numkeys, *keys_and_args), so a
+    local stand-in can replace Redis. Keys expire on their own once idle. If the server
+    is unreachable, limits fall back to per-process state instead of failing requests.
+    """
+
+    def __init__(self, client: Any, key_prefix: str = "ratelimit:"):
+        self.client = client
+        self.key_prefix = key_prefix
+        self.fallback = InMemoryRateLimitBackend()
+        self.errors = 0
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RedisRateLimitBackend":
+        import redis.asyncio as redis
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    async def hit(self, key: str, emission_interval: float, capacity: int) -> RateLimitResult:
+        try:
+            allowed, retry_after = await self.client.eval(
+                GCRA_SCRIPT, 1, self.key_prefix + key, emission_interval, capacity
+            )
+            return RateLimitResult(bool(int(allowed)), float(retry_after))
+        except Exception as e:
+            self.errors += 1
+            if self.errors == 1 or self.errors % 1000 == 0:
+                logger.warning(f"Shared rate limit backend unavailable, using per-process limits: {e}")
+            return await self.fallback.hit(key, emission_interval, capacity)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "redis",
+            "errors": self.errors,
+            "fallback_tracked_keys": len(self.fallback._tat)
+        }
+
+
+class RateLimiter:
+    """Token bucket of `burst` requests refilled at `requests_per_minute`"""
+
+    def __init__(self, requests_per_minute: int = 100, burst: int = 10, backend: Optional[Any] = None):
+        self.requests_per_minute = requests_per_minute
+        self.burst = max(1, burst)
+        self.emission_interval = 60.0 / requests_per_minute
+        self.backend = backend or InMemoryRateLimitBackend()
+
+    async def hit(self, key: str) -> RateLimitResult:
+        """Record a request for key and decide whether it is allowed"""
+        return await self.backend.hit(key, self.emission_interval, self.burst)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "requests_per_minute": self.requests_per_minute,
+            "burst": self.burst,
+            **self.backend.get_stats()
+        }
+
+
+def create_rate_limit_backend(backend: str = "memory", redis_url: Optional[str] = None) -> Any:
+    """Create the configured rate limit backend"""
+    if backend == "redis":
+        if not redis_url:
+            logger.warning("RATE_LIMIT_BACKEND=redis but REDIS_URL is not set, using in-memory rate limits")
+            return InMemoryRateLimitBackend()
+        return RedisRateLimitBackend.from_url(redis_url)
+    return InMemoryRateLimitBackend()
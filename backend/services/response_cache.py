@@ -0,0 +1,297 @@
+"""
+Response cache service - byte-bounded LRU of pre-serialized HTTP responses
+"""
+
+import gzip
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any, Callable, Iterable, Mapping, Set, Tuple
+
+from config import settings
+from services.metrics import record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+# Bodies smaller than this are not worth a gzip variant (matches the GZip middleware minimum)
+GZIP_MIN_SIZE = 1000
+
+# Request headers that never distinguish cached variants (encoding is handled per entry)
+IGNORED_VARY_HEADERS = {"accept-encoding"}
+
+
+def compute_etag(body: bytes) -> str:
+    """Compute a strong ETag for a response body"""
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def if_none_match_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header value against an ETag (weak comparison)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") == etag.removeprefix("W/") for tag in candidates)
+
+
+class CachedResponse:
+    """A stored response: raw body bytes, an optional gzip variant and the headers to replay"""
+
+    __slots__ = ("key", "status_code", "headers", "body", "gzip_body", "etag", "tags", "created_at", "expires_at")
+
+    def __init__(
+        self,
+        key: str,
+        status_code: int,
+        headers: List[Tuple[bytes, bytes]],
+        body: bytes,
+        gzip_body: Optional[bytes],
+        etag: str,
+        tags: Set[str],
+        created_at: float,
+        expires_at: float
+    ):
+        self.key = key
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+        self.gzip_body = gzip_body
+        self.etag = etag
+        self.tags = tags
+        self.created_at = created_at
+        self.expires_at = expires_at
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + len(self.gzip_body or b"") + sum(len(k) + len(v) for k, v in self.headers)
+
+
+class ResponseCache:
+    """
+    LRU cache of responses bounded by the total bytes it holds
+
+    Entries are keyed by method, path and query, plus the values of any request headers
+    named in the response's Vary header. Each entry can carry tags; invalidating a tag
+    drops every entry with it. A tag can also register a check that runs before a tagged
+    entry is served, so changes made by other worker processes are noticed.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_entry_bytes: int = 1024 * 1024,
+        ttl_seconds: float = 3600,
+        enabled: bool = True
+    ):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled and max_bytes > 0 and ttl_seconds > 0
+
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._vary: Dict[str, Tuple[str, ...]] = {}
+        self._tag_index: Dict[str, Set[str]] = {}
+        self._tag_checks: Dict[str, List[Callable[[], None]]] = {}
+        self._lock = threading.Lock()
+        self._epoch = 0
+        self.total_bytes = 0
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _base_key(method: str, path: str, query: str) -> str:
+        return f"{method}:{path}?{query}"
+
+    @staticmethod
+    def _variant_key(base_key: str, vary: Tuple[str, ...], request_headers: Mapping[str, str]) -> str:
+        if not vary:
+            return base_key
+        return base_key + "|" + "|".join(f"{name}={request_headers.get(name, '')}" for name in vary)
+
+    def add_tag_check(self, tag: str, check: Callable[[], None]):
+        """Register a callback run before serving an entry tagged with tag (it may invalidate the tag)"""
+        self._tag_checks.setdefault(tag, []).append(check)
+
+    def _remove(self, entry: CachedResponse):
+        """Drop an entry and its tag references (caller holds the lock)"""
+        self._entries.pop(entry.key, None)
+        self.total_bytes -= entry.size
+        for tag in entry.tags:
+            keys = self._tag_index.get(tag)
+            if keys is not None:
+                keys.discard(entry.key)
+                if not keys:
+                    del self._tag_index[tag]
+
+    def _lookup(self, key: str, now: float) -> Optional[CachedResponse]:
+        """Find a live entry (caller holds the lock)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= now:
+            self._remove(entry)
+            self.expirations += 1
+            return None
+        return entry
+
+    def get(self, method: str, path: str, query: str, request_headers: Mapping[str, str]) -> Tuple[Optional[CachedResponse], int]:
+        """
+        Look up a cached response for a request
+        Returns: (entry or None, epoch token to pass to store() after a miss)
+        """
+        base_key = self._base_key(method, path, query)
+        now = time.time()
+
+        with self._lock:
+            vary = self._vary.get(base_key, ())
+            entry = self._lookup(self._variant_key(base_key, vary, request_headers), now)
+            checks = [check for tag in entry.tags for check in self._tag_checks.get(tag, ())] if entry else []
+
+        # Checks may invalidate tags, so they run without the lock and the entry is looked up again
+        if checks:
+            for check in checks:
+                try:
+                    check()
+                except Exception as e:
+                    logger.warning(f"Response cache tag check failed: {e}")
+            with self._lock:
+                entry = self._entries.get(entry.key)
+
+        record_cache_lookup("response", entry is not None)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(entry.key)
+                self.hits += 1
+            return entry, self._epoch
+
+    def store(
+        self,
+        method: str,
+        path: str,
+        query: str,
+        request_headers: Mapping[str, str],
+        status_code: int,
+        headers: Iterable[Tuple[bytes, bytes]],
+        body: bytes,
+        vary: Iterable[str] = (),
+        tags: Iterable[str] = (),
+        epoch: Optional[int] = None
+    ) -> Optional[CachedResponse]:
+        """
+        Store a response body and headers
+        Returns the new entry, or None if it was too large or raced with an invalidation
+        """
+        if not self.enabled or len(body) > self.max_entry_bytes:
+            return None
+
+        now = time.time()
+        base_key = self._base_key(method, path, query)
+        vary_names = tuple(sorted({name.strip().lower() for name in vary} - IGNORED_VARY_HEADERS - {""}))
+
+        headers = list(headers)
+        stored_headers = [(k, v) for k, v in headers if k.lower() not in (b"content-length", b"etag")]
+        etag = next((v.decode("latin-1") for k, v in headers if k.lower() == b"etag"), None) or compute_etag(body)
+        stored_headers.append((b"etag", etag.encode("latin-1")))
+
+        gzip_body = gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_SIZE else None
+        if gzip_body is not None and len(gzip_body) >= len(body):
+            gzip_body = None
+        if gzip_body is not None:
+            # Both encodings are served from this entry, so shared caches must key on Accept-Encoding
+            vary_header = ", ".join(
+                v.decode("latin-1") for k, v in stored_headers if k.lower() == b"vary"
+            )
+            if "accept-encoding" not in vary_header.lower():
+                vary_header = f"{vary_header}, Accept-Encoding" if vary_header else "Accept-Encoding"
+            stored_headers = [(k, v) for k, v in stored_headers if k.lower() != b"vary"]
+            stored_headers.append((b"vary", vary_header.encode("latin-1")))
+
+        with self._lock:
+            # A write happened while this response was being built, so it may be stale
+            if epoch is not None and epoch != self._epoch:
+                return None
+
+            key = self._variant_key(base_key, vary_names, request_headers)
+            # Only paths that vary are tracked, so this map stays small
+            if vary_names:
+                self._vary[base_key] = vary_names
+            else:
+                self._vary.pop(base_key, None)
+            existing = self._entries.get(key)
+            if existing is not None:
+                self._remove(existing)
+
+            entry = CachedResponse(
+                key, status_code, stored_headers, body, gzip_body, etag, set(tags), now, now + self.ttl_seconds
+            )
+            self._entries[key] = entry
+            self.total_bytes += entry.size
+            for tag in entry.tags:
+                self._tag_index.setdefault(tag, set()).add(key)
+            self.stores += 1
+
+            while self.total_bytes > self.max_bytes and self._entries:
+                _, oldest = next(iter(self._entries.items()))
+                self._remove(oldest)
+                self.evictions += 1
+
+            return entry if key in self._entries else None
+
+    def invalidate_tags(self, tags: Iterable[str]):
+        """Drop every entry carrying any of the given tags"""
+        with self._lock:
+            self._epoch += 1
+            for tag in tags:
+                for key in list(self._tag_index.get(tag, ())):
+                    entry = self._entries.get(key)
+                    if entry is not None:
+                        self._remove(entry)
+                        self.invalidations += 1
+
+    def clear(self):
+        """Drop all cached responses"""
+        with self._lock:
+            self._epoch += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._vary.clear()
+            self._tag_index.clear()
+            self.total_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations
+            }
+
+
+# Global response cache instance
+response_cache = ResponseCache(
+    max_bytes=settings.performance.response_cache_max_bytes,
+    max_entry_bytes=settings.performance.response_cache_max_entry_bytes,
+    ttl_seconds=settings.performance.cache_ttl_seconds,
+    enabled=settings.performance.enable_response_caching
+)
@@ -0,0 +1,143 @@
+"""
+Runtime monitor service - event loop lag, thread pool usage and process resources
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Any, Dict, Optional
+
+from config import settings
+from services.metrics import EVENT_LOOP_LAG, Ewma
+
+logger = logging.getLogger(__name__)
+
+PROCESS_STARTED_AT = time.time()
+
+
+class LoopLagMonitor:
+    """
+    Background ticker that sleeps for a fixed interval and records how late it wakes up
+    Lag means something held the event loop (blocking calls, heavy CPU work in a coroutine)
+    """
+
+    def __init__(self, interval: float = 0.5, window: int = 120):
+        self.interval = interval
+        self._recent: deque = deque(maxlen=window)
+        self._ewma = Ewma()
+        self._task: Optional[asyncio.Task] = None
+        self.max_lag = 0.0
+
+    def start(self):
+        """Start the ticker on the running event loop"""
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the ticker"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - expected)
+            self._recent.append(lag)
+            self._ewma.add(lag)
+            self.max_lag = max(self.max_lag, lag)
+            EVENT_LOOP_LAG.observe(lag)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get lag statistics in seconds (recent window covers the last window * interval seconds)"""
+        recent = sorted(self._recent)
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "interval_seconds": self.interval,
+            "samples": self._ewma.count,
+            "last_seconds": round(self._recent[-1], 4) if self._recent else None,
+            "ewma_seconds": round(self._ewma.value, 4) if self._ewma.value is not None else None,
+            "recent_p99_seconds": round(recent[min(len(recent) - 1, int(len(recent) * 0.99))], 4) if recent else None,
+            "recent_max_seconds": round(recent[-1], 4) if recent else None,
+            "max_seconds": round(self.max_lag, 4)
+        }
+
+
+def get_executor_stats() -> Dict[str, Any]:
+    """
+    Get thread pool usage: asyncio's default executor (asyncio.to_thread) and the
+    AnyIO worker limiter (sync endpoints and run_in_threadpool)
+    Must be called from the event loop
+    """
+    stats: Dict[str, Any] = {"threads": threading.active_count()}
+
+    # asyncio does not expose executor statistics, so read ThreadPoolExecutor internals
+    executor = getattr(asyncio.get_running_loop(), "_default_executor", None)
+    if executor is None:
+        stats["asyncio_default"] = {"started": False, "max_workers": min(32, (os.cpu_count() or 1) + 4)}
+    else:
+        stats["asyncio_default"] = {
+            "started": True,
+            "max_workers": getattr(executor, "_max_workers", None),
+            "workers": len(getattr(executor, "_threads", ())),
+            "idle_workers": getattr(getattr(executor, "_idle_semaphore", None), "_value", None),
+            "queued": executor._work_queue.qsize() if hasattr(executor, "_work_queue") else None
+        }
+
+    try:
+        from anyio import to_thread
+        limiter = to_thread.current_default_thread_limiter()
+        limiter_stats = limiter.statistics()
+        stats["anyio_threadpool"] = {
+            "total_tokens": limiter.total_tokens,
+            "borrowed_tokens": limiter.borrowed_tokens,
+            "waiting": limiter_stats.tasks_waiting
+        }
+    except Exception as e:
+        stats["anyio_threadpool"] = {"error": str(e)}
+
+    return stats
+
+
+def get_process_stats() -> Dict[str, Any]:
+    """Get resident memory, CPU time and open file counts for this process"""
+    stats: Dict[str, Any] = {
+        "pid": os.getpid(),
+        "uptime_seconds": round(time.time() - PROCESS_STARTED_AT, 1)
+    }
+
+    # Current RSS from /proc on Linux; peak RSS from getrusage elsewhere
+    try:
+        with open("/proc/self/statm") as statm:
+            stats["rss_bytes"] = int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        stats["rss_bytes"] = None
+    try:
+        import resource
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and kilobytes on Linux
+        stats["peak_rss_bytes"] = max_rss if sys.platform == "darwin" else max_rss * 1024
+    except ImportError:
+        stats["peak_rss_bytes"] = None
+
+    cpu = os.times()
+    stats["cpu_user_seconds"] = round(cpu.user, 2)
+    stats["cpu_system_seconds"] = round(cpu.system, 2)
+    try:
+        stats["open_fds"] = len(os.listdir("/proc/self/fd"))
+    except OSError:
+        stats["open_fds"] = None
+    return stats
+
+
+# Global loop lag monitor instance (started in the application lifespan)
+loop_lag_monitor = LoopLagMonitor(interval=settings.monitoring.loop_lag_interval)
@@ -0,0 +1,221 @@
+"""
+Schema cache service - read-through LRU cache in front of DatabaseService schema reads
+"""
+
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any, Hashable, Callable
+
+from config import settings
+from services.database import DatabaseService, db_service
+from services.metrics import record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+
+class SchemaCache:
+    """
+    Bounded LRU cache for schema reads
+
+    Local writes evict affected entries immediately through a DatabaseService write
+    listener. Writes from other worker processes are detected on each read by polling
+    PRAGMA data_version on a long-lived connection, and only when that changes is the
+    schema_generation counter read to decide whether to drop the cache.
+
+    Cached schemas are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, db: DatabaseService, max_size: int = 1024):
+        self.db = db
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._all_schemas: Optional[Dict[str, Dict[str, Any]]] = None
+        self._lock = threading.Lock()
+
+        # Change detection state
+        self._monitor: Optional[sqlite3.Connection] = None
+        self._data_version: Optional[int] = None
+        self._generation: Optional[int] = None
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+        self._invalidation_listeners: List[Callable[[], None]] = []
+
+        db.add_write_listener(self._on_local_write)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def add_invalidation_listener(self, listener: Callable[[], None]):
+        """Register a callback invoked whenever cached schemas are invalidated (local or remote writes)"""
+        self._invalidation_listeners.append(listener)
+
+    def _notify_invalidation(self):
+        for listener in self._invalidation_listeners:
+            try:
+                listener()
+            except Exception as e:
+                logger.error(f"Schema cache invalidation listener failed: {e}")
+
+    def _clear(self):
+        """Drop every cached entry (caller holds the lock)"""
+        if self._entries or self._all_schemas is not None:
+            self.invalidations += 1
+        self._entries.clear()
+        self._all_schemas = None
+        self._notify_invalidation()
+
+    def _sync(self):
+        """Drop cached entries if schemas changed in another connection (caller holds the lock)"""
+        try:
+            if self._monitor is None:
+                self._monitor = self.db.open_monitor_connection()
+                self._data_version = None
+
+            data_version = self._monitor.execute("PRAGMA data_version").fetchone()[0]
+            if data_version == self._data_version:
+                return
+            self._data_version = data_version
+
+            row = self._monitor.execute(
+                "SELECT value FROM app_meta WHERE key = 'schema_generation'"
+            ).fetchone()
+            generation = row[0] if row else 0
+            if generation != self._generation:
+                self._clear()
+                self._generation = generation
+
+        except sqlite3.Error as e:
+            # Fail safe: serve from the database until polling works again
+            logger.warning(f"Schema cache change detection failed: {e}")
+            self._clear()
+            self._generation = None
+            if self._monitor is not None:
+                self._monitor.close()
+                self._monitor = None
+
+    def _on_local_write(self, schema_ids: List[str], generation: int):
+        """Evict written schemas right after a local commit"""
+        with self._lock:
+            for schema_id in schema_ids:
+                self._entries.pop(schema_id, None)
+            self._all_schemas = None
+            self.invalidations += 1
+
+            # Skip the full clear on the next poll when this write is the only change since the last one
+            if self._generation is not None and generation == self._generation + 1:
+                self._generation = generation
+
+            self._notify_invalidation()
+
+    def check_for_changes(self):
+        """Poll for schema writes made by other processes, invalidating if any happened"""
+        with self._lock:
+            self._sync()
+
+    def _get(self, key: Hashable) -> Optional[Any]:
+        """Look up an entry and mark it recently used (caller holds the lock)"""
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+        else:
+            self.misses += 1
+        record_cache_lookup("schema", value is not None)
+        return value
+
+    def _put(self, key: Hashable, value: Any):
+        """Store an entry, evicting the least recently used ones (caller holds the lock)"""
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def get_schema(self, schema_id: str) -> Optional[Dict[str, Any]]:
+        """Get a schema by ID"""
+        if not self.enabled:
+            return self.db.get_schema(schema_id)
+
+        with self._lock:
+            self._sync()
+            schema = self._get(schema_id)
+            generation = self._generation
+        if schema is not None:
+            return schema
+
+        schema = self.db.get_schema(schema_id)
+        if schema is not None:
+            with self._lock:
+                # Don't store a result that raced with an invalidation
+                if self._generation == generation:
+                    self._put(schema_id, schema)
+        return schema
+
+    def get_schema_version(self, schema_id: str, version: int) -> Optional[Dict[str, Any]]:
+        """Get a specific schema version (immutable, so never invalidated by writes)"""
+        if not self.enabled:
+            return self.db.get_schema_version(schema_id, version)
+
+        key = (schema_id, version)
+        with self._lock:
+            schema = self._get(key)
+        if schema is not None:
+            return schema
+
+        schema = self.db.get_schema_version(schema_id, version)
+        if schema is not None:
+            with self._lock:
+                self._put(key, schema)
+        return schema
+
+    def get_all_schemas(self) -> Dict[str, Dict[str, Any]]:
+        """Get all schema summaries (returns a new outer dict each call)"""
+        if not self.enabled:
+            return self.db.get_all_schemas()
+
+        with self._lock:
+            self._sync()
+            schemas = self._all_schemas
+            generation = self._generation
+            record_cache_lookup("schema", schemas is not None)
+            if schemas is not None:
+                self.hits += 1
+                return dict(schemas)
+            self.misses += 1
+
+        schemas = self.db.get_all_schemas()
+        with self._lock:
+            if self._generation == generation:
+                self._all_schemas = schemas
+        return dict(schemas)
+
+    def invalidate(self):
+        """Drop all cached schemas"""
+        with self._lock:
+            self._clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "list_cached": self._all_schemas is not None,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "generation": self._generation
+            }
+
+
+# Global schema cache instance
+schema_cache = SchemaCache(db_service, max_size=settings.performance.schema_cache_size)
@@ -0,0 +1,155 @@
+"""
+Structured logging service - non-blocking log pipeline with request context
+
+Loggers only put records on an in-memory queue; a listener thread formats them
+(plain text or JSON) and writes them to stderr and an optional rotating log file,
+so the event loop never waits on terminal or disk I/O.
+"""
+
+import copy
+import atexit
+import queue
+import random
+import logging
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Dict, Optional
+
+# Request ID of the request being handled, set by the request logging middleware
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+_listener: Optional["DrainingQueueListener"] = None
+_queue_handler: Optional["NonBlockingQueueHandler"] = None
+
+
+class RequestContextFilter(logging.Filter):
+    """Add the current request ID to every record (runs in the calling thread, before queueing)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class DebugSamplingFilter(logging.Filter):
+    """Keep only a fraction of DEBUG records; other levels always pass"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = max(0.0, min(rate, 1.0))
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno != logging.DEBUG or self.rate >= 1.0:
+            return True
+        return random.random() < self.rate
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Queue handler that drops records when the queue is full instead of blocking
+    The message and any traceback are rendered before queueing, so arguments and
+    frames are not shared with the listener thread
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class DrainingQueueListener(QueueListener):
+    """Queue listener whose stop() waits for room in a full queue instead of failing"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+def build_formatter(json_format: bool, text_format: str) -> logging.Formatter:
+    """Create the JSON formatter, or a plain text one when JSON output is off or unavailable"""
+    if json_format:
+        try:
+            try:
+                from pythonjsonlogger.json import JsonFormatter
+            except ImportError:
+                from pythonjsonlogger.jsonlogger import JsonFormatter
+            return JsonFormatter(
+                "%(asctime)s %(levelname)s %(name)s %(request_id)s %(message)s",
+                rename_fields={"asctime": "timestamp", "levelname": "level", "name": "logger"}
+            )
+        except ImportError:
+            logging.getLogger(__name__).warning("python-json-logger is not installed, using plain text logs")
+    return logging.Formatter(text_format)
+
+
+def setup_logging(
+    level: str = "INFO",
+    text_format: str = "%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s",
+    json_format: bool = False,
+    log_file: Optional[str] = None,
+    max_bytes: int = 10 * 1024 * 1024,
+    backup_count: int = 5,
+    debug_sample_rate: float = 1.0,
+    queue_size: int = 10000
+):
+    """
+    Route all logging through a bounded queue drained by a listener thread
+    Replaces any handlers already on the root logger
+    """
+    global _listener, _queue_handler
+
+    stop_logging()
+
+    formatter = build_formatter(json_format, text_format)
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    _queue_handler = NonBlockingQueueHandler(log_queue)
+    _queue_handler.addFilter(DebugSamplingFilter(debug_sample_rate))
+    _queue_handler.addFilter(RequestContextFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(getattr(logging, level.upper(), logging.INFO))
+
+    _listener = DrainingQueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def get_logging_stats() -> Dict[str, Any]:
+    """Get log queue statistics"""
+    if _queue_handler is None:
+        return {"queued": 0, "dropped": 0}
+    return {"queued": _queue_handler.queue.qsize(), "dropped": _queue_handler.dropped}
+
+
+atexit.register(stop_logging)
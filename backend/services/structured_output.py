@@ -0,0 +1,156 @@
+"""
+Structured output service - strict JSON Schema response formats for schema-guided extraction
+
+A stored schema is compiled into a strict JSON Schema of the extraction response
+(document_verification and one extracted_fields entry per schema field) and sent as a
+json_schema response format to providers listed in STRUCTURED_OUTPUT_PROVIDERS, which
+then only return conforming JSON. Freeform extraction, and models that reject the
+format, use the json_object format with the output template in the prompt instead.
+Single-pass schema generation uses a fixed JSON Schema with the fields as a list.
+"""
+
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+JSON_OBJECT_FORMAT = {"type": "json_object"}
+
+# Models that rejected a json_schema response format since startup
+_rejected_models = set()
+_rejected_lock = threading.Lock()
+
+FIELD_VALUE_TYPES = {
+    "number": ["number", "string"],
+    "boolean": ["boolean", "string"]
+}
+
+
+def _object(properties: Dict[str, Any]) -> Dict[str, Any]:
+    """Strict object: every property required, nothing else allowed"""
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False
+    }
+
+
+def _flags(*names: str) -> Dict[str, Any]:
+    return _object({name: {"type": "boolean"} for name in names})
+
+
+_STRING_LIST = {"type": "array", "items": {"type": "string"}}
+_LEVEL = {"type": "string", "enum": ["high", "medium", "low"]}
+
+DOCUMENT_VERIFICATION_SCHEMA = _object({
+    "document_type_confidence": {"type": "number"},
+    "expected_document_type": {"type": "string"},
+    "detected_document_type": {"type": "string"},
+    "authenticity_score": {"type": "number"},
+    "tampering_indicators": _flags(
+        "photo_manipulation", "text_alterations", "structural_anomalies", "digital_artifacts", "font_inconsistencies"
+    ),
+    "security_checks": _flags("mrz_checksum_valid", "field_consistency", "date_logic_valid", "format_compliance"),
+    "verification_notes": _STRING_LIST,
+    "risk_level": {"type": "string", "enum": ["low", "medium", "high"]}
+})
+
+
+def build_extraction_json_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON Schema of the extraction response for a stored schema"""
+    extracted_fields = {
+        field_name: _object({
+            "value": {"type": FIELD_VALUE_TYPES.get(field_info.get("type"), "string")},
+            "confidence": {"type": "number"},
+            "extraction_notes": {"type": "string"}
+        })
+        for field_name, field_info in schema["fields"].items()
+    }
+    return _object({
+        "document_verification": DOCUMENT_VERIFICATION_SCHEMA,
+        "extracted_fields": _object(extracted_fields),
+        "overall_confidence": {"type": "number"},
+        "document_quality": _LEVEL,
+        "extraction_issues": _STRING_LIST
+    })
+
+
+SCHEMA_GENERATION_SCHEMA = _object({
+    "document_type": {"type": "string"},
+    "id": {"type": "string"},
+    "name": {"type": "string"},
+    "description": {"type": "string"},
+    "category": {"type": "string"},
+    "overall_confidence": {"type": "number"},
+    "document_quality": _LEVEL,
+    "extraction_difficulty": {"type": "string", "enum": ["easy", "medium", "hard"]},
+    "fields": {"type": "array", "items": _object({
+        "name": {"type": "string"},
+        "type": {"type": "string", "enum": ["text", "number", "date", "email", "phone", "url", "boolean"]},
+        "required": {"type": "boolean"},
+        "description": {"type": "string"},
+        "confidence_score": {"type": "number"},
+        "legibility": _LEVEL,
+        "potential_issues": _STRING_LIST,
+        "extraction_hints": _STRING_LIST,
+        "validation_pattern": {"type": "string"},
+        "positioning_hints": {"type": "string"}
+    })},
+    "document_specific_notes": _STRING_LIST,
+    "quality_recommendations": _STRING_LIST
+})
+
+
+def _supports_json_schema(model_param: str) -> bool:
+    if model_param.split("/", 1)[0] not in settings.ai.structured_output_providers:
+        return False
+    with _rejected_lock:
+        return model_param not in _rejected_models
+
+
+def _json_schema_format(name: str, json_schema: Dict[str, Any]) -> Dict[str, Any]:
+    return {"type": "json_schema", "json_schema": {"name": name, "schema": json_schema, "strict": True}}
+
+
+def extraction_response_format(schema: Optional[Dict[str, Any]], model_param: str) -> Optional[Dict[str, Any]]:
+    """json_schema response format for a schema-guided extraction, or None to use json_object"""
+    if not schema or not schema.get("fields") or not _supports_json_schema(model_param):
+        return None
+    return _json_schema_format("document_extraction", build_extraction_json_schema(schema))
+
+
+def schema_generation_response_format(model_param: str) -> Optional[Dict[str, Any]]:
+    """json_schema response format for single-pass schema generation, or None to use json_object"""
+    if not _supports_json_schema(model_param):
+        return None
+    return _json_schema_format("schema_generation", SCHEMA_GENERATION_SCHEMA)
+
+
+def is_response_format_rejection(error: Exception) -> bool:
+    """Whether a provider error is a rejection of the json_schema response format"""
+    name = type(error).__name__
+    message = str(error).lower()
+    return (
+        ("BadRequest" in name or "UnsupportedParams" in name)
+        and any(marker in message for marker in ("response_format", "json_schema", "schema"))
+    )
+
+
+def mark_unsupported(model_param: str):
+    """Stop sending json_schema response formats to a model"""
+    with _rejected_lock:
+        _rejected_models.add(model_param)
+    logger.warning(f"{model_param} rejected the json_schema response format, falling back to json_object")
+
+
+def get_structured_output_stats() -> Dict[str, Any]:
+    """Get structured output statistics"""
+    with _rejected_lock:
+        return {
+            "providers": list(settings.ai.structured_output_providers),
+            "rejected_models": sorted(_rejected_models)
+        }
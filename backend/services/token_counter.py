@@ -0,0 +1,43 @@
+"""
+Token counter - local prompt token counts without calling a provider
+
+Uses the cl100k_base encoding bundled with litellm (no download needed), then a
+tiktoken download, and falls back to the 4-characters-per-token estimate when
+neither is available. Counts are for comparing prompt sizes; each provider's own
+tokenizer will differ by a few percent.
+"""
+
+import logging
+from functools import lru_cache
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=1)
+def _get_encoding() -> Optional[Any]:
+    try:
+        from litellm.litellm_core_utils.default_encoding import encoding
+        return encoding
+    except Exception:
+        pass
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"No local tokenizer available, estimating tokens from length: {e}")
+        return None
+
+
+def tokenizer_name() -> str:
+    """Name of the tokenizer count_tokens uses"""
+    encoding = _get_encoding()
+    return encoding.name if encoding is not None else "chars/4"
+
+
+def count_tokens(text: str) -> int:
+    """Number of tokens in text"""
+    encoding = _get_encoding()
+    if encoding is None:
+        return max(1, len(text) // 4) if text else 0
+    return len(encoding.encode(text, disallowed_special=()))
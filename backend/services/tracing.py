@@ -0,0 +1,132 @@
+"""
+Tracing service - OpenTelemetry spans for the request pipeline
+
+Instrumentation only uses the OpenTelemetry API. Spans are recorded once
+setup_tracing() installs an SDK tracer provider (ENABLE_TRACING=true); until then
+span() is a no-op that does not touch OpenTelemetry at all.
+"""
+
+import logging
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from opentelemetry import trace
+
+logger = logging.getLogger(__name__)
+
+_tracer = trace.get_tracer(__name__)
+_enabled = False
+
+# Set when the in-process exporter is used, so recent spans can be inspected offline
+memory_exporter: Optional["RecentSpansExporter"] = None
+
+
+class RecentSpansExporter:
+    """
+    In-process span exporter keeping the most recent finished spans
+    Exposes the same get_finished_spans()/clear() calls as the SDK's InMemorySpanExporter
+    """
+
+    def __init__(self, max_spans: int = 10000):
+        self._spans: deque = deque(maxlen=max_spans)
+
+    def export(self, spans) -> Any:
+        from opentelemetry.sdk.trace.export import SpanExportResult
+        self._spans.extend(spans)
+        return SpanExportResult.SUCCESS
+
+    def get_finished_spans(self) -> List[Any]:
+        return list(self._spans)
+
+    def clear(self):
+        self._spans.clear()
+
+    def shutdown(self):
+        self.clear()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return True
+
+
+def setup_tracing(
+    enabled: bool,
+    sample_rate: float = 1.0,
+    exporter: str = "memory",
+    service_name: str = "ai-doc-extractor"
+) -> bool:
+    """
+    Install the SDK tracer provider with a parent-based ratio sampler
+    Returns True if tracing is active
+    """
+    global _tracer, _enabled, memory_exporter
+
+    if not enabled:
+        return False
+
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SimpleSpanProcessor
+        from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+    except ImportError:
+        logger.warning("ENABLE_TRACING is set but opentelemetry-sdk is not installed, tracing disabled")
+        return False
+
+    # Follow the caller's sampling decision when a traceparent header is present
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": service_name}),
+        sampler=ParentBased(TraceIdRatioBased(sample_rate))
+    )
+
+    if exporter == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            logger.warning("TRACING_EXPORTER=otlp but opentelemetry-exporter-otlp is not installed, tracing disabled")
+            return False
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    elif exporter == "console":
+        provider.add_span_processor(BatchSpanProcessor(ConsoleSpanExporter()))
+    else:
+        memory_exporter = RecentSpansExporter()
+        provider.add_span_processor(SimpleSpanProcessor(memory_exporter))
+
+    trace.set_tracer_provider(provider)
+    _tracer = provider.get_tracer(__name__)
+    _enabled = True
+    logger.info(f"Tracing enabled ({exporter} exporter, sample rate {sample_rate})")
+    return True
+
+
+def tracing_enabled() -> bool:
+    return _enabled
+
+
+def get_tracer() -> trace.Tracer:
+    return _tracer
+
+
+@contextmanager
+def span(name: str, attributes: Optional[Dict[str, Any]] = None) -> Iterator[Optional[trace.Span]]:
+    """
+    Run a block (or, as a decorator, a function) inside a child span
+    Yields the span, or None when tracing is disabled
+    """
+    if not _enabled:
+        yield None
+        return
+
+    with _tracer.start_as_current_span(name, attributes=_clean(attributes)) as current:
+        yield current
+
+
+def set_span_attributes(current: Optional[trace.Span], attributes: Dict[str, Any]):
+    """Set attributes on a span from span(), skipping None values"""
+    if current is not None:
+        current.set_attributes(_clean(attributes))
+
+
+def _clean(attributes: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Drop None values, which are not valid span attributes"""
+    return {key: value for key, value in (attributes or {}).items() if value is not None}
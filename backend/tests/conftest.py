@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+
+# Run from anywhere: the backend modules are imported as top-level packages
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Use litellm's bundled model cost map instead of fetching it at import
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+# Databases and other data/ files are created relative to the working directory
+os.chdir(tempfile.mkdtemp(prefix="backend-tests-"))
@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from services import ai_service
+
+MODEL = "groq/meta-llama/llama-4-scout-17b-16e-instruct"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("timeout", [0.05, 0])
+async def test_waiting_for_a_slot_is_bounded(monkeypatch, timeout):
+    calls = []
+    monkeypatch.setattr(ai_service, "completion", lambda **kwargs: calls.append(kwargs))
+    monkeypatch.setattr(ai_service, "ai_request_semaphore", asyncio.Semaphore(1))
+    monkeypatch.setattr(ai_service.settings.performance, "ai_queue_timeout", timeout)
+    timeouts = ai_service.ai_queue_timeouts
+
+    async with ai_service.ai_request_slot():
+        with pytest.raises(HTTPException) as error:
+            await ai_service.make_ai_request_with_retry("prompt", "", MODEL)
+
+    assert error.value.status_code == 429
+    assert calls == []
+    assert ai_service.ai_queue_timeouts == timeouts + 1
+    assert ai_service.get_queued_ai_requests() == 0
+
+
+@pytest.mark.asyncio
+async def test_waiter_gets_the_released_slot(monkeypatch):
+    monkeypatch.setattr(ai_service, "ai_request_semaphore", asyncio.Semaphore(1))
+    monkeypatch.setattr(ai_service.settings.performance, "ai_queue_timeout", 1.0)
+
+    async def hold():
+        async with ai_service.ai_request_slot():
+            await asyncio.sleep(0.05)
+
+    async def wait():
+        async with ai_service.ai_request_slot():
+            return True
+
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+    assert await wait()
+    await holder
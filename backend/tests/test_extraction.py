@@ -0,0 +1,74 @@
+import io
+import json
+
+import litellm
+from fastapi.testclient import TestClient
+from PIL import Image
+
+import main
+from services import ai_service
+from services.database import db_service
+
+MODEL = "groq_meta-llama/llama-4-scout-17b-16e-instruct"
+SCHEMA = {
+    "name": "Identity Card",
+    "category": "Government",
+    "fields": {"full_name": {"type": "text", "required": True}, "age": {"type": "number", "required": False}}
+}
+
+
+def document() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (200, 100), "white").save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def test_truncated_json_schema_reply_is_repaired_with_app_lifespan(monkeypatch):
+    reply = json.dumps({
+        "extracted_fields": {
+            "full_name": {"value": "Jane Doe", "confidence": 95, "extraction_notes": ""},
+            "age": {"value": 42, "confidence": 90, "extraction_notes": ""}
+        }
+    })
+    calls = []
+
+    def completion(**kwargs):
+        calls.append(kwargs)
+        return litellm.completion(mock_response=reply[:reply.index('"age"') + 20], **kwargs)
+
+    monkeypatch.setattr(ai_service, "completion", completion)
+    db_service.save_schema("identity_card", SCHEMA)
+
+    with TestClient(main.app) as client:
+        assert litellm.enable_json_schema_validation is False
+        response = client.post(
+            "/api/extract",
+            files={"file": ("card.png", document(), "image/png")},
+            data={"model": MODEL, "schema_id": "identity_card"}
+        )
+
+    assert response.status_code == 200
+    metadata = response.json()["metadata"]
+    assert len(calls) == 1
+    assert metadata["response_format"] == "json_schema"
+    assert metadata["finish_reason"] == "stop"
+    assert metadata["json_parse"] == "repaired"
+    assert metadata["recovered_fields"] == ["full_name", "age"]
+    assert metadata["prompt_tokens"]["provider"] is not None
+    assert metadata["prompt_tokens"]["static"] > 0
+
+
+def test_unlisted_model_is_rejected_before_any_provider_call(monkeypatch):
+    calls = []
+    monkeypatch.setattr(ai_service, "completion", lambda **kwargs: calls.append(kwargs))
+
+    with TestClient(main.app) as client:
+        for model in ("x_random-model", "groq_not-a-listed-model"):
+            response = client.post(
+                "/api/extract", files={"file": ("card.png", document(), "image/png")}, data={"model": model}
+            )
+            assert response.status_code == 400
+        stats = client.get("/api/status").json()["providers"]
+
+    assert calls == []
+    assert "x" not in stats
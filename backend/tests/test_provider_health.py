@@ -0,0 +1,25 @@
+from services.provider_health import ProviderHealthRegistry, OPEN
+
+
+def test_only_tracked_providers_get_entries():
+    registry = ProviderHealthRegistry(failure_threshold=1)
+    registry.track(["groq"])
+
+    for provider in ("groq", "random-1", "random-2"):
+        assert registry.allow_request(provider)
+        registry.record_success(provider, 0.1)
+        registry.record_failure(provider, "timeout")
+
+    assert list(registry.get_stats()) == ["groq"]
+    assert registry.get_stats()["groq"]["circuit"] == OPEN
+    assert registry.allow_request("random-1")
+
+
+def test_track_drops_entries_of_untracked_providers():
+    registry = ProviderHealthRegistry()
+    registry.record_success("groq", 0.1)
+    registry.record_success("unknown", 0.1)
+
+    registry.track(["groq", "mistral"])
+
+    assert list(registry.get_stats()) == ["groq"]
@@ -0,0 +1,93 @@
+import fakeredis
+import pytest
+
+from services import rate_limiter
+from services.rate_limiter import InMemoryRateLimitBackend, RedisRateLimitBackend, RateLimiter
+
+
+class FakeClock:
+    """Stands in for the time module so GCRA state can be stepped exactly"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, "time", clock)
+    return clock
+
+
+@pytest.mark.asyncio
+async def test_burst_then_refill_at_the_emission_interval(clock):
+    limiter = RateLimiter(requests_per_minute=60, burst=3)
+
+    assert [(await limiter.hit("client")).allowed for _ in range(3)] == [True, True, True]
+    denied = await limiter.hit("client")
+    assert not denied.allowed
+    assert denied.retry_after == pytest.approx(1.0)
+
+    clock.now += 1.0
+    assert (await limiter.hit("client")).allowed
+    assert not (await limiter.hit("client")).allowed
+
+    # Idle for a whole bucket: the full burst is available again, but no more
+    clock.now += 10.0
+    assert [(await limiter.hit("client")).allowed for _ in range(4)] == [True, True, True, False]
+    # Other keys have their own bucket
+    assert (await limiter.hit("other")).allowed
+
+
+@pytest.mark.asyncio
+async def test_sweep_evicts_only_keys_with_a_full_bucket(clock):
+    backend = InMemoryRateLimitBackend(sweep_interval=5.0)
+    await backend.hit("idle", 1.0, 3)
+    await backend.hit("busy", 1.0, 3)
+
+    clock.now += 4.0
+    for _ in range(3):
+        await backend.hit("busy", 1.0, 3)
+    # The sweep only runs once sweep_interval has passed
+    assert backend.get_stats()["tracked_keys"] == 2
+
+    clock.now += 1.0
+    await backend.hit("new", 1.0, 3)
+    assert backend.get_stats() == {"backend": "memory", "tracked_keys": 2, "evicted_keys": 1}
+    assert "idle" not in backend._tat
+
+
+@pytest.mark.asyncio
+async def test_redis_script_shares_limits_between_workers():
+    server = fakeredis.FakeServer()
+    workers = [RedisRateLimitBackend(fakeredis.FakeAsyncRedis(server=server)) for _ in range(2)]
+
+    results = [await workers[i % 2].hit("client", 60.0, 3) for i in range(4)]
+
+    assert [result.allowed for result in results] == [True, True, True, False]
+    assert 59.0 < results[-1].retry_after <= 60.0
+    # The key expires once the bucket would be full again
+    ttl = await workers[0].client.pttl("ratelimit:client")
+    assert 179_000 < ttl <= 180_000
+    assert all(worker.errors == 0 for worker in workers)
+
+
+@pytest.mark.asyncio
+async def test_redis_errors_fall_back_to_per_process_limits():
+    server = fakeredis.FakeServer()
+    backend = RedisRateLimitBackend(fakeredis.FakeAsyncRedis(server=server))
+    assert (await backend.hit("client", 60.0, 2)).allowed
+
+    server.connected = False
+    results = [await backend.hit("client", 60.0, 2) for _ in range(3)]
+
+    assert [result.allowed for result in results] == [True, True, False]
+    assert backend.get_stats() == {"backend": "redis", "errors": 3, "fallback_tracked_keys": 1}
+
+    server.connected = True
+    # Back on the shared state, which still holds the request made before the outage
+    assert (await backend.hit("client", 60.0, 2)).allowed
+    assert not (await backend.hit("client", 60.0, 2)).allowed
@@ -0,0 +1,28 @@
+import json
+
+from fastapi.testclient import TestClient
+
+import main
+from services.database import db_service
+
+
+def test_one_large_chunk_is_written_in_batches_of_batch_size(monkeypatch):
+    batch_sizes = []
+    import_schemas = db_service.import_schemas
+
+    def record_batch(records):
+        batch_sizes.append(len(records))
+        return import_schemas(records)
+
+    monkeypatch.setattr(db_service, "import_schemas", record_batch)
+    body = "".join(
+        json.dumps({"id": f"import_{index}", "name": f"Import {index}", "fields": {"number": {"type": "text"}}}) + "\n"
+        for index in range(7)
+    )
+
+    with TestClient(main.app) as client:
+        response = client.post("/api/schemas/import?batch_size=2", content=body.encode())
+
+    assert response.status_code == 200
+    assert response.json()["imported"] == 7
+    assert batch_sizes == [2, 2, 2, 1]
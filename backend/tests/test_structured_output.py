@@ -0,0 +1,87 @@
+import json
+
+import litellm
+import pytest
+
+from services import ai_service
+from services.provider_health import provider_health
+from services.structured_output import extraction_response_format
+
+MODEL = "groq/llama-3.1-8b-instant"
+SCHEMA = {"fields": {"full_name": {"type": "text"}, "age": {"type": "number"}}}
+
+
+async def request_with_reply(monkeypatch, reply: str, validation: bool):
+    """Run make_ai_request_with_retry with a json_schema format against a canned litellm reply"""
+    calls = []
+
+    def completion(**kwargs):
+        calls.append(kwargs)
+        return litellm.completion(mock_response=reply, **kwargs)
+
+    monkeypatch.setattr(ai_service, "completion", completion)
+    monkeypatch.setattr(litellm, "enable_json_schema_validation", validation)
+    monkeypatch.setattr(ai_service.settings.ai, "retry_delay", 0)
+    response_format = extraction_response_format(SCHEMA, MODEL)
+    assert response_format["type"] == "json_schema"
+
+    def fallback_prompt():
+        raise AssertionError("fallback prompt built without a rejection")
+
+    failures = provider_health.get_stats().get("groq", {}).get("failures", 0)
+    response = await ai_service.make_ai_request_with_retry(
+        "prompt", "", MODEL, response_format=response_format, fallback_prompt=fallback_prompt
+    )
+    assert provider_health.get_stats()["groq"]["failures"] == failures
+    return response, calls
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("validation", [False, True])
+async def test_non_matching_json_schema_reply_is_returned(monkeypatch, validation):
+    reply = json.dumps({"extracted_fields": {"full_name": {"value": "Jane Doe"}}})
+    response, calls = await request_with_reply(monkeypatch, reply, validation)
+
+    assert len(calls) == 1
+    assert response["content"] == reply
+    assert response["response_format"] == "json_schema"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("validation", [False, True])
+async def test_truncated_json_schema_reply_is_repaired(monkeypatch, validation):
+    reply = json.dumps({
+        "extracted_fields": {
+            "full_name": {"value": "Jane Doe", "confidence": 95, "extraction_notes": ""},
+            "age": {"value": 42, "confidence": 90, "extraction_notes": ""}
+        }
+    })
+    truncated = reply[:reply.index('"age"') + 20]
+    response, calls = await request_with_reply(monkeypatch, truncated, validation)
+    parsed = ai_service.parse_ai_response(response["content"])
+
+    assert len(calls) == 1
+    assert parsed.method == "repaired"
+    assert parsed.recovered_fields == ["full_name", "age"]
+    assert parsed.data["extracted_fields"]["full_name"]["value"] == "Jane Doe"
+
+
+@pytest.mark.asyncio
+async def test_rejected_json_schema_format_builds_fallback_prompt(monkeypatch):
+    calls = []
+    model = "groq/rejects-json-schema"
+
+    def completion(**kwargs):
+        calls.append(kwargs)
+        if kwargs["response_format"]["type"] == "json_schema":
+            raise litellm.BadRequestError("response_format json_schema is not supported", model, "groq")
+        return litellm.completion(mock_response="{}", **kwargs)
+
+    monkeypatch.setattr(ai_service, "completion", completion)
+    response = await ai_service.make_ai_request_with_retry(
+        "prompt", "", model, response_format=extraction_response_format(SCHEMA, model),
+        fallback_prompt=lambda: "fallback prompt"
+    )
+
+    assert response["response_format"] == "json_object"
+    assert [call["messages"][0]["content"][0]["text"] for call in calls] == ["prompt", "fallback prompt"]
@@ -4,12 +4,15 @@ Input validation and sanitization utilities
 
 import os
 import hashlib
+import unicodedata
 import magic
 from typing import Optional, Tuple, BinaryIO
 from PIL import Image
 import fitz  # PyMuPDF
 from io import BytesIO
 
+from services.tracing import span
+
 class FileValidator:
     """Validate and sanitize uploaded files"""
 
@@ -25,6 +28,7 @@ class FileValidator:
         self.max_file_size = max_file_size_mb * 1024 * 1024  # Convert to bytes
         self.max_image_dimension = max_image_dimension
 
+    @span("FileValidator.validate_file_size")
     def validate_file_size(self, file_data: bytes) -> Tuple[bool, Optional[str]]:
         """Validate file size"""
         if len(file_data) > self.max_file_size:
@@ -32,6 +36,7 @@ class FileValidator:
             return False, f"File size {size_mb:.1f}MB exceeds maximum of {self.max_file_size / (1024 * 1024):.0f}MB"
         return True, None
 
+    @span("FileValidator.validate_file_extension")
     def validate_file_extension(self, filename: str) -> Tuple[bool, Optional[str]]:
         """Validate file extension"""
         if not filename or '.' not in filename:
@@ -47,6 +52,7 @@ class FileValidator:
 
         return True, None
 
+    @span("FileValidator.validate_mime_type")
     def validate_mime_type(self, file_data: bytes, filename: str) -> Tuple[bool, Optional[str]]:
         """Validate MIME type using python-magic"""
         try:
@@ -74,6 +80,7 @@ class FileValidator:
         except Exception as e:
             return False, f"Could not determine file type: {str(e)}"
 
+    @span("FileValidator.validate_pdf")
     def validate_pdf(self, file_data: bytes) -> Tuple[bool, Optional[str]]:
         """Validate PDF file integrity"""
         try:
@@ -104,6 +111,7 @@ class FileValidator:
         except Exception as e:
             return False, f"Invalid or corrupted PDF: {str(e)}"
 
+    @span("FileValidator.validate_image")
     def validate_image(self, file_data: bytes) -> Tuple[bool, Optional[str]]:
         """Validate image file and check dimensions"""
         try:
@@ -165,6 +173,7 @@ class FileValidator:
 
         return filename
 
+    @span("FileValidator.calculate_file_hash")
     def calculate_file_hash(self, file_data: bytes) -> str:
         """Calculate SHA-256 hash of file for deduplication"""
         return hashlib.sha256(file_data).hexdigest()
@@ -244,9 +253,9 @@ class InputSanitizer:
         # Strip whitespace
         value = value.strip()
 
-        # Remove control characters
-        import unicodedata
-        value = ''.join(ch for ch in value if unicodedata.category(ch)[0] != 'C')
+        # Remove control characters (printable strings contain none, so skip the per-character scan)
+        if not value.isprintable():
+            value = ''.join(ch for ch in value if unicodedata.category(ch)[0] != 'C')
 
         return value
 